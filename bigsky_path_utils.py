@@ -1,47 +1,56 @@
+"""
+Compatibility wrappers over the `paths` package, which does the actual
+root discovery (env var, cached hint, SSD volumes, ~/BigSkyAg, cloud
+sync). Kept so existing scripts keep importing from here; the copies at
+the project root and in scripts/ are identical.
+"""
+
 from pathlib import Path
 import shutil
 import datetime
+import sys
+
+# The paths and config packages live at the project root, next to (or one
+# level above) this file. Appended, not inserted: the root also holds older
+# copies of some scripts/ modules, which mustn't shadow the current ones.
+_PROJECT_ROOT = Path(__file__).resolve().parent
+if not (_PROJECT_ROOT / "paths").is_dir():
+    _PROJECT_ROOT = _PROJECT_ROOT.parent
+if str(_PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(_PROJECT_ROOT))
 
-# Default structure for Big Sky Ag and white-label users
-DEFAULT_REQUIRED_SUBFOLDERS = ["00_Admin", "DropZone"]
+from paths import (  # noqa: E402
+    DEFAULT_REQUIRED_SUBFOLDERS,
+    DEGRADED_VOLUMES,
+    CloudRootRejected,
+    Target,
+    clear_root_cache,
+    resolve_root,
+)
 
 # 📦 Universal AgentOps – detects ANY valid agent folder
-def find_agent_root(required_folders=None):
+def find_agent_root(required_folders=None, heavy_io=False):
     """
-    Scans all mounted drives to find a folder with the required structure.
+    Finds a folder with the required structure on any mounted drive.
     Used for white-label AgentOps setups.
     """
-    volumes = Path("/Volumes")
-    required = required_folders or DEFAULT_REQUIRED_SUBFOLDERS
-
-    for vol in volumes.iterdir():
-        if vol.is_dir():
-            for sub in vol.iterdir():
-                if sub.is_dir():
-                    if all((sub / r).exists() for r in required):
-                        return sub.resolve()
-    raise FileNotFoundError("❌ No valid agent folder found on any mounted drive.")
+    required = tuple(required_folders or DEFAULT_REQUIRED_SUBFOLDERS)
+    return resolve_root(Target(folder=None, required=required), heavy_io=heavy_io)
 
 # 🏷️ Big Sky Ag – legacy compatibility
-def find_bigsky_root():
+def find_bigsky_root(heavy_io=False):
     """
-    Looks specifically for the 'BigSkyAg' folder on mounted drives.
-    Used by original BigSky scripts.
+    Finds the 'BigSkyAg' folder: $BIGSKY_ROOT, the cached hint, mounted
+    drives, ~/BigSkyAg, then cloud sync as a last resort.
     """
-    volumes = Path("/Volumes")
-    for vol in volumes.iterdir():
-        if vol.is_dir():
-            candidate = vol / "BigSkyAg"
-            if all((candidate / r).exists() for r in DEFAULT_REQUIRED_SUBFOLDERS):
-                return candidate.resolve()
-    raise FileNotFoundError("❌ No valid BigSkyAg folder found on any mounted drive.")
+    return resolve_root(heavy_io=heavy_io)
 
-# 📂 Get subfolder inside Big Sky Ag
-def get_bigsky_subfolder(subfolder: str) -> Path:
+def get_bigsky_subfolder(subfolder: str, heavy_io=False) -> Path:
     """
     Returns the absolute path to a subfolder inside BigSkyAg root.
+    Pass heavy_io=True from backup/restore jobs to refuse cloud-synced roots.
     """
-    root = find_bigsky_root()
+    root = find_bigsky_root(heavy_io=heavy_io)
     path = root / subfolder
     if not path.exists():
         raise FileNotFoundError(f"❌ Subfolder not found: {path}")
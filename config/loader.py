@@ -1,29 +1,33 @@
 from __future__ import annotations
-import os, json
+import copy, hashlib, os, json, threading
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-# YAML support is optional; we degrade gracefully if not installed
-try:
-    import yaml  # type: ignore
-except Exception:
-    yaml = None  # noqa
+# yaml and tomllib are imported only when a file actually has to be parsed;
+# with a valid snapshot (see _Snapshot) short-lived scripts never load them.
 
-# TOML: Python 3.11+ has tomllib; else try tomli if present
-try:
-    import tomllib  # type: ignore
-except Exception:
-    tomllib = None  # noqa
+_ROOT_CACHE: Dict[Path, Path] = {}
 
 def project_root(start: Optional[Path] = None) -> Path:
-    p = (start or Path(__file__)).resolve()
+    start = start or Path(__file__)
+    if start in _ROOT_CACHE:
+        return _ROOT_CACHE[start]
+    p = start.resolve()
+    root = Path(__file__).resolve().parents[2]
+    q = p
     for _ in range(6):
-        if (p / ".git").exists() or (p / ".projectroot").exists():
-            return p
-        p = p.parent
-    return Path(__file__).resolve().parents[2]
+        if (q / ".git").exists() or (q / ".projectroot").exists():
+            root = q
+            break
+        q = q.parent
+    _ROOT_CACHE[start] = root
+    return root
 
-BASE_DIR = project_root(Path(__file__))
+def __getattr__(name: str) -> Any:
+    # BASE_DIR is resolved on first use rather than at import
+    if name == "BASE_DIR":
+        return project_root(Path(__file__))
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def load_env(dotenv: Optional[Path] = None) -> None:
     """
@@ -31,7 +35,7 @@ def load_env(dotenv: Optional[Path] = None) -> None:
     """
     try:
         from dotenv import load_dotenv  # type: ignore
-        load_dotenv(dotenv_path=str(dotenv or (BASE_DIR / ".env")), override=False)
+        load_dotenv(dotenv_path=str(dotenv or (project_root(Path(__file__)) / ".env")), override=False)
     except Exception:
         # best-effort only
         pass
@@ -43,7 +47,10 @@ def get_env(key: str, default: Optional[str] = None, required: bool = False) ->
     return "" if val is None else str(val)
 
 def _read_yaml(p: Path) -> Dict[str, Any]:
-    if yaml is None:
+    # YAML support is optional; we degrade gracefully if not installed
+    try:
+        import yaml  # type: ignore
+    except Exception:
         raise RuntimeError("PyYAML not installed; cannot read YAML config.")
     with p.open("r", encoding="utf-8") as f:
         return yaml.safe_load(f) or {}
@@ -53,7 +60,10 @@ def _read_json(p: Path) -> Dict[str, Any]:
         return json.load(f)
 
 def _read_toml(p: Path) -> Dict[str, Any]:
-    if tomllib is None:
+    # TOML: Python 3.11+ has tomllib; else try tomli if present
+    try:
+        import tomllib  # type: ignore
+    except Exception:
         try:
             import tomli as tomllib  # type: ignore
         except Exception:
@@ -61,49 +71,293 @@ def _read_toml(p: Path) -> Dict[str, Any]:
     with p.open("rb") as f:
         return tomllib.load(f) or {}
 
-def load_config(path: Optional[Path] = None, defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+# Parsed files keyed on path, valid while (mtime_ns, size) is unchanged
+_FILE_CACHE: Dict[Path, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_FILE_CACHE_LOCK = threading.Lock()
+
+ENV_PREFIX = "PAULYOPS__"
+
+# Layers load_config can merge, in order. status_flags and env change what
+# every existing caller sees, so they are opt-in.
+LAYERS = ("defaults", "file", "status_flags", "env")
+DEFAULT_LAYERS = ("defaults", "file")
+
+def _signature(p: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _parse(p: Path) -> Dict[str, Any]:
+    if p.suffix in (".yaml", ".yml"):
+        return _read_yaml(p)
+    if p.suffix == ".json":
+        return _read_json(p)
+    # common location if you put config under [tool.paulyops]
+    raw = _read_toml(p)
+    return raw.get("tool", {}).get("paulyops", raw)
+
+def _sha256(p: Path) -> str:
+    with p.open("rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class _Snapshot:
     """
-    Loads config from YAML/JSON/TOML into a dict.
-    Search order if path not provided: config/app.yaml, app.yaml, config/app.json, app.json, pyproject.toml
+    Parsed config files persisted across processes in
+    <project>/config/.config_snapshot.json, so a launchd job that starts,
+    reads its config and exits doesn't import yaml or parse anything.
+
+    Each entry keeps the source's (mtime_ns, size) and sha256. A matching
+    stat is trusted outright; a different stat (e.g. a touch, or a git
+    checkout) is checked against the hash, and only a changed hash means
+    a re-parse. Files whose data isn't plain JSON (YAML dates, TOML
+    datetimes, non-string keys) are simply not snapshotted. PAULYOPS_CONFIG_SNAPSHOT=0
+    turns it off.
     """
-    candidates = []
+
+    VERSION = 1
+
+    def __init__(self) -> None:
+        self.enabled = os.getenv("PAULYOPS_CONFIG_SNAPSHOT", "1") != "0"
+        self._files: Optional[Dict[str, Any]] = None
+        self._dirty = False
+
+    @property
+    def path(self) -> Path:
+        return project_root(Path(__file__)) / "config" / ".config_snapshot.json"
+
+    def _load(self) -> Dict[str, Any]:
+        if self._files is None:
+            try:
+                with self.path.open("r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                self._files = raw.get("files", {}) if raw.get("version") == self.VERSION else {}
+            except (OSError, ValueError, AttributeError):
+                self._files = {}
+        return self._files
+
+    def get(self, p: Path, signature: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        entry = self._load().get(str(p))
+        if entry is None:
+            return None
+        if (entry["mtime_ns"], entry["size"]) != tuple(signature):
+            try:
+                if entry["sha256"] != _sha256(p):
+                    return None
+            except OSError:
+                return None
+            entry["mtime_ns"], entry["size"] = signature
+            self._dirty = True
+        return entry["data"]
+
+    def put(self, p: Path, signature: Tuple[int, int], data: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        try:
+            if json.loads(json.dumps(data)) != data:
+                return  # e.g. int keys would come back as strings
+            digest = _sha256(p)
+        except (TypeError, ValueError, OSError):
+            return
+        self._load()[str(p)] = {"mtime_ns": signature[0], "size": signature[1],
+                                "sha256": digest, "data": data}
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self._dirty = False
+        tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        try:
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump({"version": self.VERSION, "files": self._files}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # Read-only checkout: the snapshot only saves time
+
+_SNAPSHOT = _Snapshot()
+
+def _read_cached(p: Path, signature: Tuple[int, int]) -> Dict[str, Any]:
+    """Parse p at most once per (mtime, size); callers get their own copy."""
+    with _FILE_CACHE_LOCK:
+        hit = _FILE_CACHE.get(p)
+        if hit is None or hit[0] != signature:
+            data = _SNAPSHOT.get(p, signature)
+            if data is None:
+                data = _parse(p) or {}
+                _SNAPSHOT.put(p, signature, data)
+            hit = (signature, data)
+            _FILE_CACHE[p] = hit
+    return copy.deepcopy(hit[1])
+
+def deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """New dict: override's keys win, nested dicts are merged rather than replaced."""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+_DEFAULT_SOURCES: Dict[str, List[Path]] = {}
+
+def config_candidates(path: Optional[Path] = None) -> List[Path]:
     if path:
-        candidates = [Path(path)]
-    else:
-        candidates = [
-            BASE_DIR / "config" / "app.yaml",
-            BASE_DIR / "app.yaml",
-            BASE_DIR / "config" / "app.yml",
-            BASE_DIR / "config" / "app.json",
-            BASE_DIR / "app.json",
-            BASE_DIR / "pyproject.toml",
+        return [Path(path)]
+    if "config" in _DEFAULT_SOURCES:
+        return _DEFAULT_SOURCES["config"]
+    base = project_root(Path(__file__))
+    return _DEFAULT_SOURCES.setdefault("config", [
+        base / "config" / "app.yaml",
+        base / "app.yaml",
+        base / "config" / "app.yml",
+        base / "config" / "app.json",
+        base / "app.json",
+        base / "pyproject.toml",
+    ])
+
+def status_flag_files() -> List[Path]:
+    """Project defaults first, then the per-machine copy (see config/status_flags.py)."""
+    if "status_flags" not in _DEFAULT_SOURCES:
+        _DEFAULT_SOURCES["status_flags"] = [
+            project_root(Path(__file__)) / "config" / "status_flags.json",
+            Path.home() / "PaulyOps" / "config" / "status_flags.json",
         ]
+    return _DEFAULT_SOURCES["status_flags"]
 
-    data: Dict[str, Any] = {}
-    for p in candidates:
-        if not p.exists():
+def env_overrides(environ: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    PAULYOPS__backup__retention__daily=7 -> {"backup": {"retention": {"daily": 7}}}.
+    Values are read as JSON when they parse (numbers, true/false, lists), else as strings.
+    """
+    out: Dict[str, Any] = {}
+    environ = os.environ if environ is None else environ
+    for key in [k for k in environ if k.startswith(ENV_PREFIX)]:
+        raw = environ[key]
+        parts = [k.lower() for k in key[len(ENV_PREFIX):].split("__") if k]
+        if not parts:
             continue
-        if p.suffix in (".yaml", ".yml"):
-            data = _read_yaml(p)
-            break
-        if p.suffix == ".json":
-            data = _read_json(p)
-            break
-        if p.suffix == ".toml" or p.name == "pyproject.toml":
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        node = out
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+            if not isinstance(node, dict):
+                break
+        else:
+            node[parts[-1]] = value
+    return out
+
+def _check_layers(layers) -> None:
+    unknown = [layer for layer in layers if layer not in LAYERS]
+    if unknown:
+        raise ValueError(f"Unknown config layers {unknown}; choose from {', '.join(LAYERS)}")
+
+def config_sources(path: Optional[Path] = None,
+                   layers: Tuple[str, ...] = DEFAULT_LAYERS) -> List[Tuple[Path, Tuple[int, int]]]:
+    """The files load_config would read right now, with their (mtime_ns, size)."""
+    sources = []
+    if "file" in layers:
+        for p in config_candidates(path):
+            sig = _signature(p)
+            if sig is not None:
+                sources.append((p, sig))
+                break
+    if "status_flags" in layers:
+        for p in status_flag_files():
+            sig = _signature(p)
+            if sig is not None:
+                sources.append((p, sig))
+    return sources
+
+def load_config(path: Optional[Path] = None, defaults: Optional[Dict[str, Any]] = None,
+                layers: Tuple[str, ...] = DEFAULT_LAYERS) -> Dict[str, Any]:
+    """
+    Loads config from YAML/JSON/TOML into a dict.
+    Search order if path not provided: config/app.yaml, app.yaml, config/app.json, app.json, pyproject.toml
+
+    `layers` picks what is deep-merged, in this order: "defaults", the
+    config "file", "status_flags" (status_flags.json, under
+    "status_flags") and "env" (PAULYOPS__* variables). Only defaults and
+    the file are used unless a caller asks for more, e.g.
+    load_config(layers=LAYERS). Files are parsed once per change (see
+    _read_cached), so repeated calls cost a few stats, and a fresh
+    process reuses the parsed files from the snapshot (see _Snapshot).
+    """
+    _check_layers(layers)
+    data: Dict[str, Any] = copy.deepcopy(defaults) if defaults and "defaults" in layers else {}
+    flag_files = status_flag_files()
+    for p, sig in config_sources(path, layers):
+        if p in flag_files:
+            data = deep_merge(data, {"status_flags": _read_cached(p, sig)})
+        else:
+            data = deep_merge(data, _read_cached(p, sig))
+    with _FILE_CACHE_LOCK:
+        _SNAPSHOT.save()
+    if "env" in layers:
+        data = deep_merge(data, env_overrides())
+    return data
+
+class ConfigWatcher:
+    """
+    Opt-in hot reload for long-running processes (the backup daemon): a
+    daemon thread stats the config sources every `interval` seconds and,
+    when one changed, reloads and calls each callback with the new config.
+    Short-lived scripts should just call load_config().
+
+        watcher = ConfigWatcher(on_change=lambda cfg: app.update(cfg)).start()
+        watcher.config   # always the latest
+    """
+
+    def __init__(self, path: Optional[Path] = None, interval: float = 2.0,
+                 on_change: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 layers: Tuple[str, ...] = DEFAULT_LAYERS):
+        _check_layers(layers)
+        self.path = path
+        self.interval = interval
+        self.layers = tuple(layers)
+        self.callbacks: List[Callable[[Dict[str, Any]], None]] = [on_change] if on_change else []
+        self._sources = config_sources(path, self.layers)
+        self.config = load_config(path, layers=self.layers)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ConfigWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def check(self) -> bool:
+        """Reload if a source changed; True if it did."""
+        sources = config_sources(self.path, self.layers)
+        if sources == self._sources:
+            return False
+        try:
+            config = load_config(self.path, layers=self.layers)
+        except Exception as e:  # Half-written file: keep the old config, retry next tick
+            print(f"Warning: Could not reload config: {e}")
+            return False
+        self._sources, self.config = sources, config
+        for callback in self.callbacks:
             try:
-                raw = _read_toml(p)
-                # common location if you put config under [tool.paulyops]
-                data = raw.get("tool", {}).get("paulyops", raw)
-            except Exception:
-                raise
-            break
+                callback(config)
+            except Exception as e:
+                print(f"Warning: Config reload callback failed: {e}")
+        return True
 
-    if defaults:
-        # defaults only fill missing keys
-        merged = defaults.copy()
-        merged.update(data or {})
-        return merged
-    return data or {}
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
 
 def path_in_project(*parts: str) -> Path:
-    return (BASE_DIR.joinpath(*parts)).resolve()
+    return (project_root(Path(__file__)).joinpath(*parts)).resolve()
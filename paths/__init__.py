@@ -0,0 +1,32 @@
+"""
+Root discovery for BigSkyAg and white-label AgentOps trees.
+
+    from paths import resolve_root, Target
+    root = resolve_root()                                  # BigSkyAg
+    root = resolve_root(heavy_io=True)                     # backup/restore: no cloud roots
+    root = resolve_root(Target(folder=None, required=("00_Admin", "DropZone")))
+
+bigsky_path_utils.py (root, scripts/ and legacy copies) wraps this.
+"""
+
+from .mounts import DEGRADED_VOLUMES, mount_generation, probe_volumes
+from .resolver import (
+    CloudRootRejected,
+    Resolution,
+    Resolver,
+    clear_root_cache,
+    default_resolver,
+    resolve_root,
+)
+from .strategies import (
+    BIGSKY,
+    DEFAULT_REQUIRED_SUBFOLDERS,
+    CloudStrategy,
+    EnvStrategy,
+    HintStrategy,
+    HomeStrategy,
+    Strategy,
+    Target,
+    VolumeStrategy,
+    is_cloud_path,
+)
@@ -0,0 +1,22 @@
+"""python -m paths [--agent] [--heavy-io]: show which root is used and what each strategy cost."""
+
+import argparse
+import sys
+
+from . import BIGSKY, DEFAULT_REQUIRED_SUBFOLDERS, Target, default_resolver
+
+parser = argparse.ArgumentParser(description="Resolve the BigSkyAg / agent root")
+parser.add_argument("--agent", action="store_true", help="Any folder with the required subfolders")
+parser.add_argument("--heavy-io", action="store_true", help="Resolve as a backup job would (no cloud roots)")
+parser.add_argument("--forget", action="store_true", help="Drop the cached hint first")
+args = parser.parse_args()
+
+resolver = default_resolver()
+if args.forget:
+    resolver.forget()
+target = Target(folder=None, required=DEFAULT_REQUIRED_SUBFOLDERS) if args.agent else BIGSKY
+try:
+    print(f"✅ {resolver.resolve(target, heavy_io=args.heavy_io).describe()}")
+except (FileNotFoundError, RuntimeError) as e:
+    print(str(e))
+    sys.exit(1)
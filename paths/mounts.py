@@ -0,0 +1,110 @@
+"""
+Mount-table change detection and parallel, deadline-bounded volume probing.
+"""
+
+import hashlib
+import os
+import queue
+import select
+import threading
+import time
+from pathlib import Path
+
+VOLUMES = Path("/Volumes")
+MOUNTINFO = Path("/proc/self/mountinfo")
+PROBE_TIMEOUT = float(os.getenv("BIGSKY_PROBE_TIMEOUT", "3"))
+
+# Volumes that errored or didn't answer in time during the last probe: {volume: reason}
+DEGRADED_VOLUMES = {}
+
+
+class MountGeneration:
+    """
+    Token that changes whenever something is mounted or unmounted.
+
+    On Linux the kernel flags /proc/self/mountinfo (POLLPRI) when the mount
+    table changes, so while nothing happened the check is one poll() call
+    and the file isn't read. Elsewhere (macOS) mounting or unmounting adds
+    or removes a directory in /Volumes, which changes its mtime.
+    """
+
+    def __init__(self, volumes=None):
+        self.volumes = Path(volumes) if volumes else VOLUMES
+        self._lock = threading.Lock()
+        self._token = None
+        self._file = None
+        self._poll = None
+        if MOUNTINFO.exists() and hasattr(select, "poll"):
+            try:
+                self._file = open(MOUNTINFO, "rb")
+                self._poll = select.poll()
+                self._poll.register(self._file, select.POLLPRI | select.POLLERR)
+            except OSError:
+                self._file = self._poll = None
+
+    def current(self) -> str:
+        with self._lock:
+            if self._poll is not None:
+                if self._token is None or self._poll.poll(0):
+                    self._file.seek(0)
+                    self._token = "mountinfo:" + hashlib.sha1(self._file.read()).hexdigest()
+                return self._token
+            try:
+                st = self.volumes.stat()
+                return f"volumes:{st.st_ino}:{st.st_mtime_ns}"
+            except OSError:
+                return "volumes:none"
+
+
+_generation = None
+
+
+def mount_generation() -> str:
+    """Current mount-table token (shared watcher, created on first use)."""
+    global _generation
+    if _generation is None:
+        _generation = MountGeneration()
+    return _generation.current()
+
+
+def probe_volumes(probe, volumes=None, timeout=None):
+    """
+    Run probe(volume) for every entry in /Volumes at once and return the
+    first non-None answer. Each probe runs in a daemon thread, so a mount
+    stuck in a stat() can't block the caller beyond `timeout` seconds or
+    keep the interpreter from exiting; volumes that error or don't answer
+    in time are recorded in DEGRADED_VOLUMES and reported.
+    """
+    timeout = PROBE_TIMEOUT if timeout is None else timeout
+    DEGRADED_VOLUMES.clear()
+    try:
+        entries = list(Path(volumes or VOLUMES).iterdir())
+    except OSError:
+        return None
+    results = queue.Queue()
+
+    def run(vol):
+        try:
+            results.put((vol, probe(vol) if vol.is_dir() else None, None))
+        except OSError as e:
+            results.put((vol, None, e))
+
+    for vol in entries:
+        threading.Thread(target=run, args=(vol,), name=f"probe:{vol.name}", daemon=True).start()
+    pending = set(entries)
+    deadline = time.monotonic() + timeout
+    while pending:
+        try:
+            vol, found, error = results.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        pending.discard(vol)
+        if error is not None:
+            DEGRADED_VOLUMES[str(vol)] = f"error: {error}"
+            print(f"⚠️ Skipping volume {vol}: {error}")
+        elif found is not None:
+            return found
+    for vol in pending:
+        DEGRADED_VOLUMES[str(vol)] = f"no answer within {timeout:g}s"
+        print(f"⚠️ Skipping volume {vol}: no answer within {timeout:g}s (sleeping or network mount?)")
+    return None
@@ -0,0 +1,161 @@
+"""
+Ordered root resolution over the strategies in paths.strategies.
+
+The order and locations come from the `paths` section of the project
+config (see config/loader.load_config), e.g.:
+
+    paths:
+      strategies: [env, hint, volumes, home, cloud]
+      env_var: BIGSKY_ROOT
+      home: ~/BigSkyAg
+      cloud: ["~/Library/CloudStorage/GoogleDrive-me@example.com/My Drive/BigSkyAg"]
+      probe_timeout: 3
+      allow_cloud_for_heavy_io: false
+
+Every strategy is timed, and a root found by anything but env/hint is
+recorded as the hint for the next lookup.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .mounts import DEGRADED_VOLUMES
+from .strategies import (
+    BIGSKY,
+    ROOT_ENV,
+    CloudStrategy,
+    EnvStrategy,
+    HintStrategy,
+    HomeStrategy,
+    Target,
+    VolumeStrategy,
+    is_cloud_path,
+)
+
+DEFAULT_ORDER = ("env", "hint", "volumes", "home", "cloud")
+ALLOW_CLOUD_ENV = "BIGSKY_ALLOW_CLOUD_ROOT"
+SLOW_STRATEGY_MS = 500
+
+
+class CloudRootRejected(RuntimeError):
+    """The only root available is cloud-synced and the job does heavy I/O."""
+
+
+@dataclass
+class Resolution:
+    root: Path
+    strategy: str
+    cloud: bool
+    timings: List[Tuple[str, float, str]] = field(default_factory=list)  # (strategy, ms, outcome)
+
+    def describe(self) -> str:
+        steps = ", ".join(f"{name} {ms:.1f}ms {outcome}" for name, ms, outcome in self.timings)
+        return f"{self.root} via {self.strategy}{' (cloud)' if self.cloud else ''} [{steps}]"
+
+
+class Resolver:
+    def __init__(self, strategies=None, allow_cloud_for_heavy_io=False):
+        self.strategies = list(strategies) if strategies is not None else [
+            EnvStrategy(), HintStrategy(), VolumeStrategy(), HomeStrategy(), CloudStrategy()]
+        self.allow_cloud_for_heavy_io = allow_cloud_for_heavy_io
+        self.last = None
+
+    @classmethod
+    def from_config(cls, config=None):
+        if config is None:
+            try:
+                from config.loader import load_config
+                config = load_config()
+            except Exception as e:
+                print(f"Warning: Could not load paths config: {e}")
+                config = {}
+        section = config.get("paths") or {}
+        build = {
+            "env": lambda: EnvStrategy(section.get("env_var", ROOT_ENV)),
+            "hint": lambda: HintStrategy(section.get("hint_file")),
+            "volumes": lambda: VolumeStrategy(section.get("volumes"), section.get("probe_timeout")),
+            "home": lambda: HomeStrategy(section.get("home")),
+            "cloud": lambda: CloudStrategy(section.get("cloud")),
+        }
+        strategies = []
+        for name in section.get("strategies", DEFAULT_ORDER):
+            if name not in build:
+                print(f"Warning: Unknown path strategy '{name}' ignored")
+                continue
+            strategies.append(build[name]())
+        return cls(strategies, bool(section.get("allow_cloud_for_heavy_io", False)))
+
+    def _hint(self) -> Optional[HintStrategy]:
+        return next((s for s in self.strategies if isinstance(s, HintStrategy)), None)
+
+    def resolve(self, target: Target = BIGSKY, heavy_io=False, allow_cloud=None) -> Resolution:
+        """
+        First root any strategy finds. With heavy_io (backup, restore,
+        upload) cloud-synced roots are passed over unless allow_cloud, the
+        config or BIGSKY_ALLOW_CLOUD_ROOT=1 permits them.
+        """
+        if allow_cloud is None:
+            allow_cloud = self.allow_cloud_for_heavy_io or os.getenv(ALLOW_CLOUD_ENV) == "1"
+        timings = []
+        rejected = None
+        for strategy in self.strategies:
+            start = time.perf_counter()
+            try:
+                root = strategy.locate(target)
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                if ms > SLOW_STRATEGY_MS:
+                    print(f"⚠️ Root lookup: '{strategy.name}' took {ms / 1000:.1f}s")
+            if root is None:
+                timings.append((strategy.name, ms, "miss"))
+                continue
+            cloud = strategy.cloud or is_cloud_path(root)
+            if cloud and heavy_io and not allow_cloud:
+                timings.append((strategy.name, ms, "rejected (cloud)"))
+                rejected = rejected or root
+                continue
+            timings.append((strategy.name, ms, "found"))
+            hint = self._hint()
+            if hint is not None and strategy.name not in ("env", "hint"):
+                hint.record(target, root)
+            self.last = Resolution(root, strategy.name, cloud, timings)
+            return self.last
+        if rejected is not None:
+            raise CloudRootRejected(
+                f"❌ Only a cloud-synced {target.label} was found ({rejected}); heavy I/O there "
+                f"fights the sync client. Mount the SSD, or set {ALLOW_CLOUD_ENV}=1 to use it anyway.")
+        message = f"❌ No valid {target.label} found ({', '.join(s.name for s in self.strategies)} tried)."
+        if DEGRADED_VOLUMES:
+            message += " Unresponsive: " + ", ".join(sorted(DEGRADED_VOLUMES))
+        raise FileNotFoundError(message)
+
+    def forget(self) -> None:
+        hint = self._hint()
+        if hint is not None:
+            hint.forget()
+
+
+_default = None
+
+
+def default_resolver() -> Resolver:
+    """The config-driven resolver, built once per process."""
+    global _default
+    if _default is None:
+        _default = Resolver.from_config()
+    return _default
+
+
+def resolve_root(target: Target = BIGSKY, heavy_io=False, allow_cloud=None) -> Path:
+    return default_resolver().resolve(target, heavy_io, allow_cloud).root
+
+
+def clear_root_cache() -> None:
+    """Forget cached roots (memory and hint file), e.g. after moving the BigSkyAg folder."""
+    if _default is not None:
+        _default.forget()
+    else:
+        HintStrategy().forget()
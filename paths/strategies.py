@@ -0,0 +1,199 @@
+"""
+Places a BigSkyAg (or white-label agent) root can be found.
+
+Each strategy answers locate(target) with a Path or None; the resolver
+tries them in order. `cloud` marks strategies whose roots live in a
+sync client's folder, which heavy I/O jobs must not use by default.
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .mounts import VOLUMES, mount_generation, probe_volumes
+
+DEFAULT_REQUIRED_SUBFOLDERS = ("00_Admin", "DropZone")
+ROOT_ENV = "BIGSKY_ROOT"
+HINT_PATH = Path(os.getenv("BIGSKY_ROOT_HINT", str(Path.home() / ".bigsky_root_hint.json")))
+
+# Folders owned by sync clients (Google Drive, iCloud Drive, Dropbox, OneDrive)
+CLOUD_DIRS = (
+    Path.home() / "Library" / "CloudStorage",
+    Path.home() / "Library" / "Mobile Documents",
+    Path.home() / "Google Drive",
+    Path.home() / "Dropbox",
+    Path.home() / "OneDrive",
+)
+
+
+@dataclass(frozen=True)
+class Target:
+    """A folder holding the required subfolders, named `folder` (None: any name)."""
+    folder: Optional[str] = "BigSkyAg"
+    required: Tuple[str, ...] = DEFAULT_REQUIRED_SUBFOLDERS
+
+    @property
+    def key(self) -> str:
+        return f"{self.folder or '*'}:{','.join(self.required)}"
+
+    @property
+    def label(self) -> str:
+        return f"{self.folder} folder" if self.folder else "agent folder"
+
+    def matches(self, path: Path) -> bool:
+        return path.is_dir() and all((path / r).exists() for r in self.required)
+
+
+BIGSKY = Target()
+
+
+def is_cloud_path(path) -> bool:
+    """True if path is inside a sync client's folder."""
+    path = os.path.abspath(os.path.expanduser(str(path)))
+    return any(path == d or path.startswith(d + os.sep) for d in map(str, CLOUD_DIRS))
+
+
+class Strategy:
+    name = "strategy"
+    cloud = False
+
+    def locate(self, target: Target) -> Optional[Path]:
+        raise NotImplementedError
+
+
+class EnvStrategy(Strategy):
+    """An explicit root in an environment variable. A bad value is an error, not a miss."""
+    name = "env"
+
+    def __init__(self, var=ROOT_ENV):
+        self.var = var
+
+    def locate(self, target):
+        value = os.getenv(self.var)
+        if not value:
+            return None
+        path = Path(value).expanduser()
+        if not target.matches(path):
+            raise FileNotFoundError(f"❌ {self.var}={value} is not a valid {target.label} "
+                                    f"(needs {', '.join(target.required)})")
+        return path.resolve()
+
+
+class HintStrategy(Strategy):
+    """
+    The root found last time, kept in memory and in a small JSON file and
+    trusted only while the mount table is the one it was found under. A
+    hit from memory costs one poll(); from the file, a few stats.
+    """
+    name = "hint"
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else HINT_PATH
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def locate(self, target):
+        generation = mount_generation()
+        with self._lock:
+            hit = self._memory.get(target.key)
+        if hit is not None and hit[1] == generation:
+            return hit[0]
+        hint = self._load().get(target.key)
+        if hint and hint.get("mounts") == generation:
+            root = Path(hint["root"])
+            if target.matches(root):
+                with self._lock:
+                    self._memory[target.key] = (root, generation)
+                return root
+        return None
+
+    def record(self, target: Target, root: Path) -> None:
+        generation = mount_generation()
+        with self._lock:
+            self._memory[target.key] = (root, generation)
+        hints = self._load()
+        hints[target.key] = {"root": str(root), "mounts": generation}
+        tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(hints, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # The hint only saves time; never fail a lookup over it
+
+    def forget(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+class VolumeStrategy(Strategy):
+    """External drives under /Volumes, probed in parallel with a deadline."""
+    name = "volumes"
+
+    def __init__(self, volumes=None, timeout=None):
+        self.volumes = Path(volumes) if volumes else VOLUMES
+        self.timeout = timeout
+
+    def locate(self, target):
+        def probe(vol):
+            if target.folder:
+                candidate = vol / target.folder
+                return candidate.resolve() if target.matches(candidate) else None
+            for sub in vol.iterdir():
+                if target.matches(sub):
+                    return sub.resolve()
+            return None
+        return probe_volumes(probe, self.volumes, self.timeout)
+
+
+class HomeStrategy(Strategy):
+    """A local, non-synced copy in the home folder (~/BigSkyAg)."""
+    name = "home"
+
+    def __init__(self, path=None):
+        self.path = Path(path).expanduser() if path else None
+
+    def locate(self, target):
+        if not target.folder:
+            return None
+        candidate = self.path or Path.home() / target.folder
+        return candidate.resolve() if target.matches(candidate) else None
+
+
+class CloudStrategy(Strategy):
+    """A sync client's copy (Google Drive "My Drive", iCloud Drive) – last resort."""
+    name = "cloud"
+    cloud = True
+
+    def __init__(self, paths=None):
+        self.paths = [Path(p).expanduser() for p in paths] if paths else None
+
+    def candidates(self, target):
+        if self.paths:
+            return list(self.paths)
+        storage = Path.home() / "Library" / "CloudStorage"
+        found = sorted(storage.glob(f"GoogleDrive-*/My Drive/{target.folder}")) if storage.is_dir() else []
+        found.append(Path.home() / "Library" / "Mobile Documents" / "com~apple~CloudDocs" / target.folder)
+        return found
+
+    def locate(self, target):
+        if not target.folder:
+            return None
+        for candidate in self.candidates(target):
+            if target.matches(candidate):
+                return candidate.resolve()
+        return None
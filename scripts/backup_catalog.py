@@ -0,0 +1,285 @@
+"""
+SQLite catalog of every member in every BigSkyAg backup archive.
+
+Instead of opening each zip in 00_Admin/Backups and Backups/archive to find
+a file, the catalog keeps one row per archive member (path, size, mtime,
+CRC and, when the backup manifest knows it, SHA-256) with indexes on path,
+mtime and hash. Only an archive's central directory is read when it is
+indexed, and sync() skips archives whose size and mtime are unchanged and
+follows archives that rotation moved to another folder by name, so keeping
+it current costs a stat per archive.
+
+    python backup_catalog.py sync ~/PaulyOps/Backups ~/PaulyOps/Backups/archive
+    python backup_catalog.py find --prefix 00_Admin/Reports/ --since 2025-06-01
+    python backup_catalog.py find --sha256 9f86d08...
+    python backup_catalog.py versions 00_Admin/Reports/weekly.xlsx
+"""
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from zipfile import BadZipFile
+
+from backup_manifest import DUPLICATES_NAME, ENC_SUFFIX, META_PREFIX, PARTS_SUFFIX
+from backup_split import open_archive
+
+CATALOG_PATH = Path(os.getenv("BACKUP_CATALOG_PATH",
+                              str(Path.home() / "PaulyOps" / "Backups" / "backup_catalog.db")))
+ARCHIVE_GLOBS = ("BigSkyAg_Backup_*.zip", "BigSkyAg_Backup_*.zip" + ENC_SUFFIX,
+                 "BigSkyAg_Backup_*" + PARTS_SUFFIX)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    id        INTEGER PRIMARY KEY,
+    name      TEXT NOT NULL,
+    path      TEXT NOT NULL UNIQUE,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    kind      TEXT,
+    parent    TEXT,
+    indexed   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    archive_id    INTEGER NOT NULL REFERENCES archives(id) ON DELETE CASCADE,
+    path          TEXT NOT NULL,
+    size          INTEGER NOT NULL,
+    compress_size INTEGER NOT NULL,
+    mtime         REAL NOT NULL,
+    crc           INTEGER NOT NULL,
+    sha256        TEXT,
+    PRIMARY KEY (archive_id, path)
+);
+CREATE INDEX IF NOT EXISTS members_path ON members(path);
+CREATE INDEX IF NOT EXISTS members_mtime ON members(mtime);
+CREATE INDEX IF NOT EXISTS members_sha256 ON members(sha256);
+CREATE INDEX IF NOT EXISTS archives_name ON archives(name);
+"""
+
+
+def _to_timestamp(value):
+    """Accept a unix time, datetime or ISO date string; return unix seconds."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class BackupCatalog:
+    """Connection to the catalog database; usable as a context manager."""
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # --- indexing ------------------------------------------------------------
+
+    def add_archive(self, archive_path, files=None, st=None) -> int:
+        """
+        Index (or re-index) one archive from its central directory. A split
+        archive is indexed through its .parts.json manifest.
+
+        `files` is the manifest returned by the backup run ({arcname:
+        [size, mtime_ns, sha256]}); it supplies hashes and exact mtimes for
+        the members it covers. Returns the number of members recorded.
+        """
+        archive_path = Path(archive_path).resolve()
+        st = st or archive_path.stat()
+        files = files or {}
+        kind = parent = None
+        rows = []
+        duplicates = {}
+        with open_archive(archive_path) as zipf:
+            for zinfo in zipf.infolist():
+                if zinfo.filename.startswith(META_PREFIX):
+                    if zinfo.filename == META_PREFIX + "chain.json":
+                        chain = json.loads(zipf.read(zinfo))
+                        kind, parent = chain.get("kind"), chain.get("parent")
+                    elif zinfo.filename == DUPLICATES_NAME:
+                        duplicates = json.loads(zipf.read(zinfo))
+                    continue
+                if zinfo.is_dir():
+                    continue
+                entry = files.get(zinfo.filename)
+                if entry and entry[0] == zinfo.file_size:
+                    mtime, sha256 = entry[1] / 1e9, entry[2]
+                else:
+                    mtime, sha256 = time.mktime(zinfo.date_time + (0, 0, -1)), None
+                rows.append((zinfo.filename, zinfo.file_size, zinfo.compress_size,
+                             mtime, zinfo.CRC, sha256))
+        # Identical copies stored once: same bytes, no space of their own
+        stored = {row[0]: row for row in rows}
+        for name, source in duplicates.items():
+            row = stored.get(source)
+            if row is not None:
+                entry = files.get(name)
+                mtime = entry[1] / 1e9 if entry else row[3]
+                rows.append((name, row[1], 0, mtime, row[4], row[5]))
+
+        with self.db:
+            self.db.execute("DELETE FROM archives WHERE path = ?", (str(archive_path),))
+            cur = self.db.execute(
+                "INSERT INTO archives (name, path, size, mtime_ns, kind, parent, indexed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (archive_path.name, str(archive_path), st.st_size, st.st_mtime_ns, kind, parent,
+                 datetime.now().isoformat(timespec="seconds")))
+            archive_id = cur.lastrowid
+            self.db.executemany(
+                "INSERT OR REPLACE INTO members (archive_id, path, size, compress_size, mtime, crc, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((archive_id, *row) for row in rows))
+        return len(rows)
+
+    def forget(self, archive_path) -> None:
+        with self.db:
+            self.db.execute("DELETE FROM archives WHERE path = ?",
+                            (str(Path(archive_path).resolve()),))
+
+    def sync(self, dirs) -> dict:
+        """
+        Bring the catalog in line with the archives currently in `dirs`:
+        index new or rewritten archives, follow moved ones, drop deleted ones.
+        """
+        stats = {"indexed": 0, "moved": 0, "removed": 0, "unchanged": 0}
+        dirs = [Path(d).resolve() for d in dirs if Path(d).is_dir()]
+        known = {row["path"]: row for row in self.db.execute("SELECT * FROM archives")}
+        present = set()
+        for directory in dirs:
+            for archive in (a for pattern in ARCHIVE_GLOBS for a in directory.glob(pattern)):
+                st = archive.stat()
+                path = str(archive)
+                present.add(path)
+                row = known.get(path)
+                if row and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns:
+                    stats["unchanged"] += 1
+                    continue
+                moved = next((r for r in known.values()
+                              if r["name"] == archive.name and r["size"] == st.st_size
+                              and r["mtime_ns"] == st.st_mtime_ns and not os.path.exists(r["path"])),
+                             None)
+                if moved is not None:
+                    with self.db:
+                        self.db.execute("UPDATE archives SET path = ? WHERE id = ?", (path, moved["id"]))
+                    del known[moved["path"]]
+                    stats["moved"] += 1
+                    continue
+                try:
+                    self.add_archive(archive, st=st)
+                    stats["indexed"] += 1
+                except RuntimeError as e:
+                    # An encrypted archive with no backup key configured on this host
+                    print(f"⚠️ {archive.name} not indexed: {e}")
+                except (OSError, BadZipFile) as e:
+                    print(f"⚠️ Could not index {archive.name}: {e}")
+
+        dir_names = {str(d) for d in dirs}
+        for path in known:
+            if path not in present and os.path.dirname(path) in dir_names and not os.path.exists(path):
+                self.forget(path)
+                stats["removed"] += 1
+        return stats
+
+    # --- queries -------------------------------------------------------------
+
+    def find(self, prefix=None, since=None, until=None, sha256=None, limit=None) -> list:
+        """
+        Members matching every given filter, newest file version first.
+        since/until bound the file's mtime (unix time, datetime or ISO date).
+        """
+        clauses, params = [], []
+        if prefix:
+            # Range scan on the path index instead of LIKE
+            clauses.append("m.path >= ? AND m.path < ?")
+            params += [prefix, prefix + "\U0010ffff"]
+        if since is not None:
+            clauses.append("m.mtime >= ?")
+            params.append(_to_timestamp(since))
+        if until is not None:
+            clauses.append("m.mtime < ?")
+            params.append(_to_timestamp(until))
+        if sha256:
+            clauses.append("m.sha256 = ?")
+            params.append(sha256.lower())
+        sql = ("SELECT a.name AS archive, a.path AS archive_path, a.kind, m.path, m.size, "
+               "m.compress_size, m.mtime, m.crc, m.sha256 "
+               "FROM members m JOIN archives a ON a.id = m.archive_id")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY m.mtime DESC, a.name DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def versions(self, path) -> list:
+        """Distinct versions of one file (by CRC and size), each with the archives holding it."""
+        rows = self.db.execute(
+            "SELECT m.size, m.crc, MAX(m.sha256) AS sha256, MAX(m.mtime) AS mtime, "
+            "GROUP_CONCAT(a.name, ' ') AS archives "
+            "FROM members m JOIN archives a ON a.id = m.archive_id "
+            "WHERE m.path = ? GROUP BY m.size, m.crc ORDER BY mtime DESC", (path,))
+        return [dict(row) for row in rows]
+
+
+def update_catalog(dirs, archive_path=None, files=None) -> None:
+    """Index a just-written archive and sync `dirs`; failures only warn."""
+    try:
+        with BackupCatalog() as catalog:
+            if archive_path is not None:
+                catalog.add_archive(archive_path, files)
+            catalog.sync(dirs)
+    except Exception as e:
+        print(f"Warning: Could not update backup catalog: {e}")
+
+
+def _print_members(rows) -> None:
+    for row in rows:
+        mtime = datetime.fromtimestamp(row["mtime"]).strftime("%Y-%m-%d %H:%M")
+        sha = (row["sha256"] or "-")[:12]
+        print(f"{row['archive']}  {mtime}  {row['size']:>12,}  {row['crc']:08x}  {sha}  {row['path']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the BigSkyAg backup catalog")
+    parser.add_argument("--db", default=str(CATALOG_PATH), help="Catalog database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_sync = sub.add_parser("sync", help="Index new archives and drop deleted ones")
+    p_sync.add_argument("dirs", nargs="+")
+    p_find = sub.add_parser("find", help="Find members by path prefix, mtime range or hash")
+    p_find.add_argument("--prefix")
+    p_find.add_argument("--since", help="ISO date/time, inclusive")
+    p_find.add_argument("--until", help="ISO date/time, exclusive")
+    p_find.add_argument("--sha256")
+    p_find.add_argument("--limit", type=int, default=200)
+    p_versions = sub.add_parser("versions", help="List the distinct backed-up versions of a file")
+    p_versions.add_argument("path")
+    args = parser.parse_args()
+
+    with BackupCatalog(args.db) as catalog:
+        if args.command == "sync":
+            print(catalog.sync(args.dirs))
+        elif args.command == "find":
+            _print_members(catalog.find(args.prefix, args.since, args.until, args.sha256, args.limit))
+        else:
+            for v in catalog.versions(args.path):
+                mtime = datetime.fromtimestamp(v["mtime"]).strftime("%Y-%m-%d %H:%M")
+                print(f"{mtime}  {v['size']:>12,}  {v['crc']:08x}  {(v['sha256'] or '-')[:12]}  {v['archives']}")
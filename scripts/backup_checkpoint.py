@@ -0,0 +1,199 @@
+"""
+Resumable zip archives for BigSkyAg backups.
+
+An archive is written to <name>.partial. Every CHECKPOINT_INTERVAL seconds
+the file is fsynced and <name>.partial.checkpoint.json records the members
+written so far: their ZipInfo fields, the offset where they end, and the
+manifest entry ([size, mtime_ns, sha256]) of the file each came from.
+
+If the SSD is unmounted or the machine sleeps mid-run, the next run
+truncates the partial archive back to the last checkpoint, rebuilds the
+central directory from the recorded members and carries on: files whose
+size and mtime still match are kept as they are, changed ones are dropped
+from the directory and archived again. Only a finished archive that reads
+back cleanly (verify_backup, all members) is renamed to its final name.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from zipfile import ZipFile, ZipInfo
+
+from verify_backup import save_result, verify_archive
+
+PARTIAL_SUFFIX = ".partial"
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+CHECKPOINT_INTERVAL = 60.0
+
+# ZipInfo attributes needed to rewrite a member's central directory record
+_ZINFO_FIELDS = (
+    "filename", "date_time", "compress_type", "create_system", "create_version",
+    "extract_version", "flag_bits", "external_attr", "header_offset", "CRC",
+    "compress_size", "file_size",
+)
+
+
+def partial_path(final_path) -> str:
+    return str(final_path) + PARTIAL_SUFFIX
+
+
+def checkpoint_path(partial) -> str:
+    return str(partial) + CHECKPOINT_SUFFIX
+
+
+def load_checkpoint(partial):
+    """Return the checkpoint recorded for a partial archive, or None."""
+    try:
+        with open(checkpoint_path(partial), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def discard_partial(partial) -> None:
+    for path in (partial, checkpoint_path(partial)):
+        Path(path).unlink(missing_ok=True)
+
+
+def _matches(state, meta) -> bool:
+    return bool(state) and all(state.get(k) == v for k, v in meta.items())
+
+
+def adopt_partial(backup_dir, final_path, meta):
+    """
+    Move the newest interrupted archive that matches `meta` (same source,
+    kind and parent) onto final_path's partial name, so a run started on a
+    later date still resumes it. Other partial archives are deleted.
+    """
+    target = partial_path(final_path)
+    partials = sorted(Path(backup_dir).glob("BigSkyAg_Backup_*" + PARTIAL_SUFFIX),
+                      key=lambda p: p.stat().st_mtime, reverse=True)
+    adopted = _matches(load_checkpoint(target), meta)
+    for partial in partials:
+        if str(partial) == target:
+            continue
+        if not adopted and _matches(load_checkpoint(partial), meta):
+            os.replace(checkpoint_path(partial), checkpoint_path(target))
+            os.replace(partial, target)
+            adopted = True
+            continue
+        print(f"🗑️  Removing stale partial backup: {partial.name}")
+        discard_partial(partial)
+
+
+class ResumableArchive:
+    """
+    A ZipFile over <final>.partial that resumes from its checkpoint.
+
+    `files` maps arcnames to manifest entries for the members already in the
+    archive; on resume it starts out as the checkpointed members. Pass
+    member_done as the ParallelZipWriter on_member hook, then call commit()
+    once the archive is complete.
+    """
+
+    def __init__(self, final_path, meta, interval=CHECKPOINT_INTERVAL):
+        self.final_path = str(final_path)
+        self.partial = partial_path(final_path)
+        self.meta = dict(meta)
+        self.interval = interval
+        self.files = {}
+        self._last_save = time.monotonic()
+
+        state = load_checkpoint(self.partial)
+        if (_matches(state, self.meta) and os.path.exists(self.partial)
+                and os.path.getsize(self.partial) >= state["end_offset"]):
+            self.fp = open(self.partial, "r+b")
+            self.fp.seek(state["end_offset"])
+            self.fp.truncate()
+            self.zipf = ZipFile(self.fp, "w")
+            for values in state["members"]:
+                zinfo = ZipInfo(values[0], tuple(values[1]))
+                for field, value in zip(_ZINFO_FIELDS[2:], values[2:]):
+                    setattr(zinfo, field, value)
+                self.zipf.filelist.append(zinfo)
+                self.zipf.NameToInfo[zinfo.filename] = zinfo
+            self.files = dict(state["files"])
+        else:
+            discard_partial(self.partial)
+            self.fp = open(self.partial, "w+b")
+            self.zipf = ZipFile(self.fp, "w")
+        self.resumed = dict(self.files)
+
+    def member_done(self, member) -> None:
+        """Record a written member; checkpoint if the interval has passed."""
+        if member.st is not None:
+            self.files[member.zinfo.filename] = [member.st.st_size, member.st.st_mtime_ns,
+                                                 member.sha256]
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save()
+
+    def drop(self, arcname: str) -> None:
+        """Remove a resumed member from the directory; its bytes become dead space."""
+        zinfo = self.zipf.NameToInfo.pop(arcname, None)
+        if zinfo is not None:
+            self.zipf.filelist.remove(zinfo)
+        self.files.pop(arcname, None)
+
+    def save(self) -> None:
+        """
+        fsync the archive and record the members written so far. Only members
+        with a manifest entry in `files` are kept: the checkpoint ends where the
+        first other one (a duplicate stored after all, __backup__/ metadata)
+        starts, so a resume writes those again instead of adding a second copy.
+        """
+        zipf = self.zipf
+        self.fp.flush()
+        os.fsync(self.fp.fileno())
+        # start_dir only advances once a member is complete
+        end_offset = min((z.header_offset for z in zipf.filelist if z.filename not in self.files),
+                         default=zipf.start_dir)
+        members = [z for z in zipf.filelist if z.header_offset < end_offset]
+        state = {
+            **self.meta,
+            "archive": os.path.basename(self.final_path),
+            "saved": datetime.now().isoformat(timespec="seconds"),
+            "end_offset": end_offset,
+            "members": [[getattr(z, f) for f in _ZINFO_FIELDS] for z in members],
+            "files": {z.filename: self.files[z.filename] for z in members},
+        }
+        path = checkpoint_path(self.partial)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._last_save = time.monotonic()
+
+    def abort(self) -> None:
+        """Leave the partial archive and its checkpoint for the next run."""
+        try:
+            self.save()
+        except OSError:
+            pass  # Drive gone: the previous checkpoint still stands
+        self.zipf.fp = None  # Detach so ZipFile never writes a central directory
+        try:
+            self.fp.close()
+        except OSError:
+            pass
+
+    def size(self) -> int:
+        return os.path.getsize(self.final_path)
+
+    def commit(self, verify=True) -> None:
+        """Finish the archive, check it, and rename it into place."""
+        self.zipf.close()
+        self.fp.flush()
+        os.fsync(self.fp.fileno())
+        self.fp.close()
+        result = verify_archive(self.partial) if verify else None
+        if result is not None and not result["ok"]:
+            discard_partial(self.partial)
+            bad = result.get("error") or ", ".join(name for name, _ in result["bad"][:5])
+            raise ValueError(f"{self.final_path} failed verification: {bad}")
+        os.replace(self.partial, self.final_path)
+        Path(checkpoint_path(self.partial)).unlink(missing_ok=True)
+        if result is not None:
+            save_result(result, archive_path=self.final_path)
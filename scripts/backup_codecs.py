@@ -0,0 +1,118 @@
+"""
+Per-file-type codec selection for BigSkyAg backup archives.
+
+Already-compressed formats (JPEG, TIFF, zip, video, ...) are stored as-is,
+known text formats get the configured codec, and anything else is probed
+with a small entropy sample so random-looking data isn't compressed for
+nothing. The policy is read from the `backup.compression` section of the
+project config (see config/loader.load_config), e.g.:
+
+    backup:
+      compression:
+        default: deflate:6         # store | deflate[:level] | bzip2[:level] | lzma
+        entropy_threshold: 7.5     # bits/byte above which a probe stores
+        codecs:
+          .csv: lzma
+          .log: bzip2:9
+        store_extensions: [.jpg, .zip]
+"""
+
+import math
+from collections import Counter
+from pathlib import Path
+from zipfile import ZIP_BZIP2, ZIP_DEFLATED, ZIP_LZMA, ZIP_STORED
+
+CODECS = {
+    "store": ZIP_STORED,
+    "deflate": ZIP_DEFLATED,
+    "bzip2": ZIP_BZIP2,
+    "lzma": ZIP_LZMA,
+}
+
+STORE_EXTENSIONS = {
+    # images
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".heif", ".tif", ".tiff",
+    # archives and compressed streams
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst", ".lz4", ".dmg",
+    # audio/video
+    ".mp3", ".m4a", ".aac", ".mp4", ".mov", ".m4v", ".avi", ".mkv",
+    # compressed documents
+    ".pdf", ".docx", ".xlsx", ".pptx", ".key", ".pages", ".numbers",
+}
+
+COMPRESS_EXTENSIONS = {
+    ".txt", ".md", ".csv", ".tsv", ".json", ".yaml", ".yml", ".toml", ".xml",
+    ".html", ".htm", ".css", ".js", ".ts", ".tsx", ".py", ".sh", ".command",
+    ".sql", ".log", ".ini", ".cfg", ".geojson", ".kml", ".svg",
+}
+
+DEFAULT_SPEC = "deflate:6"
+DEFAULT_ENTROPY_THRESHOLD = 7.5
+SAMPLE_BYTES = 16 * 1024
+MIN_COMPRESS_SIZE = 64
+
+
+def parse_codec(spec: str):
+    """Turn 'deflate:9' into (ZIP_DEFLATED, 9). The level is optional."""
+    name, _, level = str(spec).strip().lower().partition(":")
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec '{name}' (expected one of {', '.join(CODECS)})")
+    return CODECS[name], int(level) if level else None
+
+
+def byte_entropy(sample: bytes) -> float:
+    """Shannon entropy of a byte sample in bits per byte (0-8)."""
+    if not sample:
+        return 0.0
+    total = len(sample)
+    return -sum(n / total * math.log2(n / total) for n in Counter(sample).values())
+
+
+class CodecPolicy:
+    """Pick (compress_type, compresslevel) for each file."""
+
+    def __init__(self, default=DEFAULT_SPEC, codecs=None, store_extensions=None,
+                 entropy_threshold=DEFAULT_ENTROPY_THRESHOLD, sample_bytes=SAMPLE_BYTES):
+        self.default = parse_codec(default)
+        self.by_extension = {ext: self.default for ext in COMPRESS_EXTENSIONS}
+        store = set(STORE_EXTENSIONS if store_extensions is None else store_extensions)
+        self.by_extension.update({ext.lower(): (ZIP_STORED, None) for ext in store})
+        for ext, spec in (codecs or {}).items():
+            self.by_extension[ext.lower()] = parse_codec(spec)
+        self.entropy_threshold = float(entropy_threshold)
+        self.sample_bytes = int(sample_bytes)
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Build the policy from backup.compression in the project config."""
+        if config is None:
+            try:
+                from config.loader import load_config
+                config = load_config()
+            except Exception as e:
+                print(f"Warning: Could not load backup compression config: {e}")
+                config = {}
+        section = (config.get("backup") or {}).get("compression") or {}
+        return cls(
+            default=section.get("default", DEFAULT_SPEC),
+            codecs=section.get("codecs"),
+            store_extensions=section.get("store_extensions"),
+            entropy_threshold=section.get("entropy_threshold", DEFAULT_ENTROPY_THRESHOLD),
+            sample_bytes=section.get("sample_bytes", SAMPLE_BYTES),
+        )
+
+    def choose(self, path, size: int):
+        """Return (compress_type, compresslevel) for a file of the given size."""
+        if size < MIN_COMPRESS_SIZE:
+            return ZIP_STORED, None
+        known = self.by_extension.get(Path(path).suffix.lower())
+        if known is not None:
+            return known
+        try:
+            with open(path, "rb") as f:
+                sample = f.read(self.sample_bytes)
+        except OSError:
+            return self.default
+        if byte_entropy(sample) >= self.entropy_threshold:
+            return ZIP_STORED, None
+        return self.default
@@ -0,0 +1,399 @@
+"""
+Encrypted BigSkyAg backups (.zip.enc) for data-at-rest protection.
+
+The zip is encrypted as it is written, not in a second pass: the archive
+stream is cut into frames of FRAME_SIZE bytes and each frame is sealed
+with AES-256-GCM on a small thread pool while the compression workers
+keep going, so reading, compressing, encrypting and writing overlap and
+the archive's bytes are only written once. The commit then opens the
+file again and decompresses a sample of the members to check their CRCs
+(backup.encryption.verify: sample, full or none); a frame that doesn't
+authenticate or a member that doesn't match fails the backup. The file is:
+
+    header   MAGIC, 2-byte length, JSON (algorithm, frame size, key id, salt)
+    frames   ciphertext + 16-byte tag per frame; every frame but the last
+             holds exactly FRAME_SIZE bytes, the last fewer (possibly none)
+
+Each archive encrypts with its own key, derived by HKDF-SHA256 from the
+backup key and a random salt in the header, and frame n uses nonce n, so
+no nonce is ever reused under a key. Every frame authenticates the header
+digest, its index and whether it is the last, so reordered, altered or
+truncated files fail to decrypt. Frames have a fixed size, so the file
+can be read at random like a plain zip: backup_split.open_archive()
+recognizes the header, so restore, verify and the catalog work on
+encrypted archives and read only the frames they need.
+
+The 32-byte key is the base64 or hex value of BACKUP_ENCRYPTION_KEY, or
+the contents of the file BACKUP_ENCRYPTION_KEY_FILE or
+backup.encryption.key_file names. Keys never go in the config itself.
+Needs the `cryptography` package; nothing else imports it unless an
+encrypted archive is written or read.
+
+    python backup_crypto.py genkey > ~/.bigsky_backup.key
+    python backup_crypto.py verify BigSkyAg_Backup_2025-06-03.zip.enc
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import json
+import os
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import bigsky_path_utils  # noqa: F401  (puts the project root on sys.path for config.loader)
+from backup_manifest import ENC_SUFFIX
+
+MAGIC = b"BSKYENC1"
+ALGORITHM = "AES-256-GCM"
+FRAME_SIZE = 1024 * 1024
+TAG_SIZE = 16
+KEY_SIZE = 32
+ENCRYPT_WORKERS = 2
+VERIFY_MODES = ("sample", "full", "none")
+_FRAME_AAD = struct.Struct(">QB")
+
+
+def _aesgcm():
+    try:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    except ImportError:
+        raise RuntimeError("Encrypted backups need the cryptography package: pip install cryptography")
+    return AESGCM
+
+
+def _parse_key(text) -> bytes:
+    if isinstance(text, bytes) and len(text) == KEY_SIZE:
+        return text
+    value = text.decode("ascii", "replace") if isinstance(text, bytes) else text
+    value = value.strip()
+    for decode in (bytes.fromhex, base64.b64decode, base64.urlsafe_b64decode):
+        try:
+            key = decode(value)
+        except (ValueError, binascii.Error):
+            continue
+        if len(key) == KEY_SIZE:
+            return key
+    raise ValueError(f"Backup encryption key must be {KEY_SIZE} bytes, as hex or base64")
+
+
+class EncryptionSettings:
+    """Whether backups are encrypted, and with which key."""
+
+    def __init__(self, enabled=False, key_file=None, frame_size=FRAME_SIZE, workers=ENCRYPT_WORKERS,
+                 verify="sample"):
+        if verify not in VERIFY_MODES:
+            raise ValueError(f"backup.encryption.verify must be one of {', '.join(VERIFY_MODES)}")
+        self.enabled = bool(enabled)
+        self.key_file = key_file
+        self.frame_size = int(frame_size)
+        self.workers = int(workers)
+        self.verify = verify
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Build the settings from backup.encryption in the project config."""
+        if config is None:
+            # Not inside the try: without config.loader the key_file setting would be
+            # silently ignored and archives opened with the wrong key source
+            from config.loader import load_config
+            try:
+                config = load_config()
+            except Exception as e:
+                print(f"Warning: Could not load backup encryption config: {e}")
+                config = {}
+        section = (config.get("backup") or {}).get("encryption") or {}
+        return cls(
+            enabled=section.get("enabled", False),
+            key_file=section.get("key_file"),
+            frame_size=section.get("frame_kb", FRAME_SIZE // 1024) * 1024,
+            workers=section.get("workers", ENCRYPT_WORKERS),
+            verify=section.get("verify", "sample"),
+        )
+
+    def load_key(self) -> bytes:
+        """The backup key from the environment or the key file; raises if there is none."""
+        value = os.getenv("BACKUP_ENCRYPTION_KEY")
+        if value:
+            return _parse_key(value)
+        key_file = os.getenv("BACKUP_ENCRYPTION_KEY_FILE") or self.key_file
+        if key_file:
+            with open(os.path.expanduser(key_file), "rb") as f:
+                return _parse_key(f.read())
+        raise RuntimeError("No backup encryption key: set BACKUP_ENCRYPTION_KEY or BACKUP_ENCRYPTION_KEY_FILE")
+
+
+def key_id(key: bytes) -> str:
+    """Short fingerprint stored in the header, so a wrong key is reported as such."""
+    return hashlib.sha256(b"bigsky-backup-key" + key).hexdigest()[:16]
+
+
+def _file_key(key: bytes, salt: bytes) -> bytes:
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    return HKDF(algorithm=hashes.SHA256(), length=KEY_SIZE, salt=salt,
+                info=b"bigsky-backup-archive").derive(key)
+
+
+def _nonce(index: int) -> bytes:
+    return index.to_bytes(12, "big")
+
+
+def encrypted_path(final_path) -> Path:
+    return Path(str(final_path) + ENC_SUFFIX)
+
+
+def read_header(fp) -> tuple:
+    """(header dict, header bytes) from the start of an encrypted archive."""
+    if fp.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not an encrypted BigSkyAg backup")
+    (length,) = struct.unpack(">H", fp.read(2))
+    raw = fp.read(length)
+    return json.loads(raw), MAGIC + struct.pack(">H", length) + raw
+
+
+class EncryptedStreamWriter:
+    """
+    Write-only, non-seekable file object that encrypts everything written
+    to it in frames on a thread pool and appends them to path in order.
+    """
+
+    def __init__(self, path, key: bytes, frame_size=FRAME_SIZE, workers=ENCRYPT_WORKERS):
+        self.path = Path(path)
+        self.frame_size = int(frame_size)
+        salt = os.urandom(16)
+        header = json.dumps({"algorithm": ALGORITHM, "kdf": "HKDF-SHA256", "frame_size": self.frame_size,
+                             "key_id": key_id(key), "salt": salt.hex()}).encode("utf-8")
+        self.header = MAGIC + struct.pack(">H", len(header)) + header
+        self._aad = hashlib.sha256(self.header).digest()
+        self._cipher = _aesgcm()(_file_key(key, salt))
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._max_pending = workers * 2
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._frames = 0
+        self._offset = 0
+        self._fp = open(self.path, "wb")
+        self._fp.write(self.header)
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation("encrypted archives are written as a stream")
+
+    def tell(self) -> int:
+        return self._offset
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        self._offset += len(view)
+        while view:
+            if not self._buffer and len(view) >= self.frame_size:
+                # Whole frame straight from the caller's buffer: one copy instead of two
+                self._submit(bytes(view[:self.frame_size]), last=False)
+                view = view[self.frame_size:]
+                continue
+            n = min(len(view), self.frame_size - len(self._buffer))
+            self._buffer += view[:n]
+            view = view[n:]
+            if len(self._buffer) == self.frame_size:
+                self._submit(bytes(self._buffer), last=False)
+                self._buffer.clear()
+        return len(data)
+
+    def _submit(self, frame: bytes, last: bool) -> None:
+        while len(self._pending) >= self._max_pending:
+            self._fp.write(self._pending.popleft().result())
+        aad = self._aad + _FRAME_AAD.pack(self._frames, last)
+        self._pending.append(self._pool.submit(self._cipher.encrypt, _nonce(self._frames), frame, aad))
+        self._frames += 1
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        """Seal the final frame, write everything out and fsync."""
+        self._submit(bytes(self._buffer), last=True)
+        self._buffer.clear()
+        while self._pending:
+            self._fp.write(self._pending.popleft().result())
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._fp.close()
+        self._pool.shutdown()
+
+    def abandon(self) -> None:
+        for future in self._pending:
+            future.cancel()
+        self._pool.shutdown()
+        self._fp.close()
+        self.path.unlink(missing_ok=True)
+
+
+class EncryptedArchiveReader(io.RawIOBase):
+    """Seekable read-only view of the plaintext of an encrypted archive."""
+
+    def __init__(self, path, key: bytes = None):
+        self.path = Path(path)
+        self._fp = open(self.path, "rb")
+        header, raw = read_header(self._fp)
+        if header.get("algorithm") != ALGORITHM:
+            raise ValueError(f"{self.path.name}: unsupported algorithm {header.get('algorithm')}")
+        key = key if key is not None else EncryptionSettings.from_config().load_key()
+        if header["key_id"] != key_id(key):
+            raise ValueError(f"{self.path.name} was encrypted with a different key ({header['key_id']})")
+        self.header = header
+        self._start = len(raw)
+        self._aad = hashlib.sha256(raw).digest()
+        self._cipher = _aesgcm()(_file_key(key, bytes.fromhex(header["salt"])))
+        self.frame_size = header["frame_size"]
+        body = os.fstat(self._fp.fileno()).st_size - self._start
+        if body < TAG_SIZE:
+            raise ValueError(f"{self.path.name} is truncated")
+        self.frames = (body - TAG_SIZE) // (self.frame_size + TAG_SIZE) + 1
+        self.size = body - self.frames * TAG_SIZE
+        self._pos = 0
+        self._cached = (None, b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def frame(self, index: int) -> bytes:
+        """Decrypt and authenticate one frame."""
+        if self._cached[0] == index:
+            return self._cached[1]
+        from cryptography.exceptions import InvalidTag
+        self._fp.seek(self._start + index * (self.frame_size + TAG_SIZE))
+        last = index == self.frames - 1
+        data = self._fp.read(self.frame_size + TAG_SIZE)
+        try:
+            plain = self._cipher.decrypt(_nonce(index), data, self._aad + _FRAME_AAD.pack(index, last))
+        except InvalidTag:
+            raise ValueError(f"{self.path.name}: frame {index} failed authentication "
+                             f"(corrupt, truncated or tampered)") from None
+        self._cached = (index, plain)
+        return plain
+
+    def readinto(self, buffer) -> int:
+        if self._pos >= self.size:
+            return 0
+        index, skip = divmod(self._pos, self.frame_size)
+        data = self.frame(index)[skip:skip + len(buffer)]
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def close(self) -> None:
+        if not self._fp.closed:
+            self._fp.close()
+        super().close()
+
+
+def verify_encrypted(path, key: bytes = None) -> dict:
+    """Authenticate every frame of an encrypted archive without unpacking it."""
+    reader = EncryptedArchiveReader(path, key)
+    try:
+        for index in range(reader.frames):
+            reader.frame(index)
+    finally:
+        reader.close()
+    return {"frames": reader.frames, "size": reader.size, "key_id": reader.header["key_id"]}
+
+
+def is_encrypted(path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class EncryptedArchive:
+    """
+    Encrypted counterpart of backup_checkpoint.ResumableArchive: same
+    zipf / member_done / abort / commit interface. Written as one stream
+    to <archive>.zip.enc.tmp and renamed into place once verified; never
+    resumed, since the stream can't be reopened for appending.
+    """
+
+    def __init__(self, final_path, key: bytes, settings=None):
+        settings = settings or EncryptionSettings()
+        self.verify = settings.verify
+        self.final_path = encrypted_path(final_path)
+        self.tmp_path = self.final_path.with_name(self.final_path.name + ".tmp")
+        self.resumed = {}
+        self.writer = EncryptedStreamWriter(self.tmp_path, key, settings.frame_size, settings.workers)
+        from zipfile import ZipFile
+        self.zipf = ZipFile(self.writer, "w")
+
+    def member_done(self, member) -> None:
+        pass
+
+    def drop(self, arcname: str) -> None:
+        raise RuntimeError("encrypted archives are never resumed")
+
+    def abort(self) -> None:
+        self.zipf.fp = None  # Detach so ZipFile never writes a central directory
+        self.writer.abandon()
+
+    def size(self) -> int:
+        return self.final_path.stat().st_size
+
+    def commit(self, verify=None) -> None:
+        """
+        Write the central directory, seal the stream, verify and rename into
+        place. verify (default: the settings' mode) decompresses a sample of
+        the members, authenticating the frames they sit in, unless it is
+        "full"; "none" skips the check.
+        """
+        self.zipf.close()
+        self.writer.close()
+        verify = {True: "full", False: "none", None: self.verify}.get(verify, verify)
+        if verify != "none":
+            from verify_backup import DEFAULT_SAMPLE, save_result, verify_archive
+            result = verify_archive(self.tmp_path, sample=DEFAULT_SAMPLE if verify == "sample" else None)
+            if not result["ok"]:
+                self.tmp_path.unlink(missing_ok=True)
+                bad = result.get("error") or ", ".join(name for name, _ in result["bad"][:5])
+                raise ValueError(f"{self.final_path.name} failed verification: {bad}")
+        os.replace(self.tmp_path, self.final_path)
+        if verify != "none":
+            save_result(result, archive_path=self.final_path)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Encrypted BigSkyAg backups")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("genkey", help="Print a new random key (base64)")
+    verify = sub.add_parser("verify", help="Authenticate every frame of an encrypted archive")
+    verify.add_argument("archive")
+    args = parser.parse_args()
+
+    if args.command == "genkey":
+        print(base64.b64encode(os.urandom(KEY_SIZE)).decode("ascii"))
+        sys.exit(0)
+    try:
+        info = verify_encrypted(args.archive)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ {Path(args.archive).name}: {info['frames']} frames, "
+          f"{info['size'] / (1024 ** 2):.1f} MB authenticated (key {info['key_id']})")
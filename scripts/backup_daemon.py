@@ -0,0 +1,340 @@
+"""
+Optional long-lived backup agent that keeps indexes warm between runs.
+
+Every report, health check and prune script starts cold: it finds the
+BigSkyAg volume, reads the config, lists the backup folders and loads the
+manifest again. Started once (e.g. from a LaunchAgent), the daemon holds
+all of that in memory and answers over a local UNIX socket, so a status
+query costs a round trip instead of a scan. Nothing depends on it: the
+scripts call try_call(), and when no daemon is listening they do the work
+themselves as before.
+
+Cached values are checked against a stat of what they were built from
+(the backup folders' mtimes, the manifest's size and mtime) on every
+request, so a backup or prune that ran without the daemon's knowledge is
+picked up on the next query. The config is held by a config.loader
+ConfigWatcher, which reloads it in the background when its files change.
+
+The protocol is one JSON request per connection, one line each way:
+
+    {"op": "retention", "args": {"backup_dir": "...", "archive_subdir": "archive"}}
+    {"ok": true, "result": {...}}
+
+    python backup_daemon.py serve
+    python backup_daemon.py status
+    python backup_daemon.py stop
+"""
+
+import json
+import os
+import socket
+import time
+from pathlib import Path
+
+SOCKET_PATH = Path(os.getenv("BACKUP_DAEMON_SOCKET", str(Path.home() / "PaulyOps" / "backup_daemon.sock")))
+CLIENT_TIMEOUT = 2.0
+CONFIG_POLL = 2.0
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening, or it didn't answer in time."""
+
+
+class DaemonError(Exception):
+    """The daemon answered, but the request failed there."""
+
+
+def call(op: str, timeout=CLIENT_TIMEOUT, socket_path=None, **args):
+    """Run one request on the daemon and return its result."""
+    path = str(socket_path or SOCKET_PATH)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(json.dumps({"op": op, "args": args}).encode("utf-8") + b"\n")
+            data = b""
+            while not data.endswith(b"\n"):
+                block = sock.recv(65536)
+                if not block:
+                    break
+                data += block
+    except OSError as e:  # missing socket, refused, timed out
+        raise DaemonUnavailable(str(e)) from None
+    try:
+        reply = json.loads(data)
+    except ValueError:
+        raise DaemonUnavailable("Incomplete reply from the backup daemon") from None
+    if not reply.get("ok"):
+        raise DaemonError(reply.get("error", "unknown error"))
+    return reply.get("result")
+
+
+def try_call(op: str, **args):
+    """call(), or None when the daemon isn't running or fails (callers do the work themselves)."""
+    try:
+        return call(op, **args)
+    except (DaemonUnavailable, DaemonError):
+        return None
+
+
+# --- daemon side -------------------------------------------------------------
+
+def _signature(*paths) -> tuple:
+    sig = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+
+class BackupState:
+    """Everything the daemon keeps warm, each entry rebuilt when its signature changes."""
+
+    def __init__(self, root=None, backup_dir=None):
+        self._root = Path(root) if root else None
+        self._backup_dir = Path(backup_dir) if backup_dir else None
+        self._cache = {}
+        self._catalog = None
+        self._watcher = None
+        self.started = time.time()
+        self.requests = 0
+
+    def _cached(self, key, signature, build):
+        hit = self._cache.get(key)
+        if hit is not None and hit[0] == signature:
+            return hit[1]
+        value = build()
+        self._cache[key] = (signature, value)
+        return value
+
+    def invalidate(self) -> dict:
+        dropped = len(self._cache)
+        self._cache.clear()
+        if self._root is not None and not self._root.is_dir():
+            self._root = None
+        return {"dropped": dropped}
+
+    # --- locations ---------------------------------------------------------
+
+    def root(self) -> Path:
+        """The BigSkyAg root, resolved once and re-resolved if its volume goes away."""
+        if self._root is None or not self._root.is_dir():
+            from bigsky_path_utils import find_bigsky_root
+            self._root = Path(find_bigsky_root())
+        return self._root
+
+    def backup_dir(self, backup_dir=None) -> Path:
+        if backup_dir:
+            return Path(backup_dir)
+        if self._backup_dir is None:
+            return self.root() / "00_Admin" / "Backups"
+        return self._backup_dir
+
+    def watch_config(self, interval=CONFIG_POLL) -> None:
+        """Keep the config in memory, reloaded in the background when its files change."""
+        try:
+            from config.loader import ConfigWatcher
+            self._watcher = ConfigWatcher(interval=interval,
+                                          on_change=lambda config: print("🛰️  Config reloaded")).start()
+        except Exception as e:
+            print(f"Warning: Could not watch config, loading it per request: {e}")
+
+    def close(self) -> None:
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def config(self) -> dict:
+        if self._watcher is not None:
+            return self._watcher.config  # Shared with every request: read, don't modify
+        try:
+            from config.loader import load_config
+            return load_config()
+        except Exception as e:
+            print(f"Warning: Could not load config: {e}")
+            return {}
+
+    # --- backups -----------------------------------------------------------
+
+    def _plan(self, backup_dir, archive_subdir):
+        from backup_manifest import CHAIN_NAME
+        from backup_retention import RetentionPolicy, plan_retention
+        backup_dir = self.backup_dir(backup_dir)
+        signature = _signature(backup_dir, backup_dir / archive_subdir, backup_dir / CHAIN_NAME)
+        policy = RetentionPolicy.from_config(self.config())
+        key = ("plan", str(backup_dir), archive_subdir, tuple(vars(policy).items()))
+        return self._cached(key, signature, lambda: plan_retention(backup_dir, policy, archive_subdir))
+
+    def retention(self, backup_dir=None, archive_subdir="archive") -> dict:
+        plan = self._plan(backup_dir, archive_subdir)
+        return {"pending": plan.pending, "summary": plan.summary(), "describe": plan.describe()}
+
+    def latest_backup(self, backup_dir=None, archive_subdir="archive"):
+        from backup_retention import scan_backups
+        backup_dir = self.backup_dir(backup_dir)
+        signature = _signature(backup_dir, backup_dir / archive_subdir)
+
+        def build():
+            backups = scan_backups(backup_dir, archive_subdir)
+            if not backups:
+                return None
+            newest = backups[0]
+            st = newest.path.stat()
+            return {"name": newest.name, "path": str(newest.path), "location": newest.location,
+                    "size": st.st_size, "mtime": st.st_mtime, "split": newest.split}
+        return self._cached(("latest", str(backup_dir), archive_subdir), signature, build)
+
+    def manifest(self, backup_dir=None) -> dict:
+        from backup_manifest import MANIFEST_NAME, load_manifest
+        backup_dir = self.backup_dir(backup_dir)
+        return self._cached(("manifest", str(backup_dir)), _signature(backup_dir / MANIFEST_NAME),
+                            lambda: load_manifest(backup_dir))
+
+    def manifest_summary(self, backup_dir=None) -> dict:
+        from backup_manifest import MANIFEST_NAME
+        backup_dir = self.backup_dir(backup_dir)
+
+        def build():
+            manifest = self.manifest(backup_dir)
+            files = manifest.get("files") or {}
+            return {"archive": manifest.get("archive"), "created": manifest.get("created"),
+                    "files": len(files), "bytes": sum(e[0] for e in files.values())}
+        return self._cached(("manifest_summary", str(backup_dir)),
+                            _signature(backup_dir / MANIFEST_NAME), build)
+
+    def manifest_entry(self, path: str, backup_dir=None):
+        return (self.manifest(backup_dir).get("files") or {}).get(path)
+
+    def catalog(self):
+        if self._catalog is None:
+            from backup_catalog import BackupCatalog
+            self._catalog = BackupCatalog()
+        return self._catalog
+
+    def status(self, backup_dir=None, archive_subdir="archive") -> dict:
+        from storage_providers import load_upload_status
+        try:
+            root = str(self.root())
+        except Exception as e:  # Volume not mounted: still report the backups
+            root = f"unavailable ({e})"
+        return {
+            "root": root,
+            "backup_dir": str(self.backup_dir(backup_dir)),
+            "latest": self.latest_backup(backup_dir, archive_subdir),
+            "retention": self.retention(backup_dir, archive_subdir)["summary"],
+            "manifest": self.manifest_summary(backup_dir),
+            "upload": load_upload_status(),
+        }
+
+    def ping(self) -> dict:
+        return {"pid": os.getpid(), "uptime_s": round(time.time() - self.started, 1),
+                "requests": self.requests, "cached": len(self._cache)}
+
+    def handle(self, op: str, args: dict):
+        handlers = {
+            "ping": self.ping,
+            "status": self.status,
+            "root": lambda: str(self.root()),
+            "config": lambda section=None: self.config().get(section) if section else self.config(),
+            "latest_backup": self.latest_backup,
+            "retention": self.retention,
+            "manifest": self.manifest_summary,
+            "manifest_entry": self.manifest_entry,
+            "catalog_find": lambda **kw: self.catalog().find(**kw),
+            "catalog_versions": lambda path: self.catalog().versions(path),
+            "invalidate": self.invalidate,
+        }
+        if op not in handlers:
+            raise ValueError(f"Unknown op: {op}")
+        self.requests += 1
+        return handlers[op](**args)
+
+
+def serve(socket_path=None, state=None) -> None:
+    """Answer requests until a "stop" request (or SIGTERM/Ctrl-C), one at a time."""
+    import socketserver
+
+    path = Path(socket_path or SOCKET_PATH)
+    state = state or BackupState()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        try:
+            call("ping", socket_path=path, timeout=0.5)
+            raise RuntimeError(f"A backup daemon is already listening on {path}")
+        except DaemonUnavailable:
+            path.unlink()  # Left over from a daemon that died
+
+    class Handler(socketserver.StreamRequestHandler):
+        timeout = 5
+
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline())
+            except (OSError, ValueError):
+                return
+            op = request.get("op")
+            if op == "stop":
+                reply = {"ok": True, "result": "stopping"}
+                self.server.stopping = True
+            else:
+                try:
+                    reply = {"ok": True, "result": state.handle(op, request.get("args") or {})}
+                except Exception as e:
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply, default=str).encode("utf-8") + b"\n")
+
+    old_umask = os.umask(0o077)  # Socket readable by this user only
+    try:
+        server = socketserver.UnixStreamServer(str(path), Handler)
+    finally:
+        os.umask(old_umask)
+    server.stopping = False
+    state.watch_config()
+    print(f"🛰️  Backup daemon listening on {path} (pid {os.getpid()})")
+    try:
+        while not server.stopping:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.close()
+        server.server_close()
+        path.unlink(missing_ok=True)
+        print("🛰️  Backup daemon stopped")
+
+
+def _terminate(*_):
+    raise KeyboardInterrupt
+
+
+if __name__ == "__main__":
+    import argparse
+    import signal
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    # The root (for config.loader) goes last: its older script copies mustn't shadow scripts/
+    if str(Path(__file__).resolve().parent.parent) not in sys.path:
+        sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+    parser = argparse.ArgumentParser(description="Warm-cache backup daemon")
+    parser.add_argument("command", choices=["serve", "status", "ping", "stop", "invalidate"])
+    parser.add_argument("--backup-dir", default=None, help="Backup folder (default: <BigSkyAg>/00_Admin/Backups)")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        signal.signal(signal.SIGTERM, _terminate)
+        serve(state=BackupState(backup_dir=args.backup_dir))
+        sys.exit(0)
+    try:
+        extra = {"backup_dir": args.backup_dir} if args.backup_dir and args.command == "status" else {}
+        print(json.dumps(call(args.command, **extra), indent=1, default=str))
+    except DaemonUnavailable as e:
+        print(f"❌ Backup daemon not running ({e})")
+        sys.exit(1)
+    except DaemonError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,65 @@
+"""
+Intra-archive deduplication of byte-identical files.
+
+The tree holds plenty of exact copies (`X.py` next to `X 2.py`, reports
+saved twice, files dropped into DropZone again). A zip backup stores each
+distinct content once: files are grouped by size as the walk finds them,
+and only a file whose size was already seen is hashed, along with the
+earlier files of that size the first time one is needed. A file whose
+hash matches an earlier member is not compressed or written again;
+__backup__/duplicates.json maps its path to the member holding its bytes,
+and restore_backup writes the copy from there.
+
+Files under DEDUP_MIN_SIZE aren't worth a hash and a map entry and are
+archived as usual.
+"""
+
+from backup_manifest import file_sha256
+
+DEDUP_MIN_SIZE = 4096
+
+
+class DuplicateFinder:
+    """Finds files whose content is already in the archive being written."""
+
+    def __init__(self, min_size=DEDUP_MIN_SIZE):
+        self.min_size = min_size
+        self.by_size = {}      # size -> [[arcname, path, sha256 or None], ...]
+        self.duplicates = {}   # arcname -> arcname of the member holding its bytes
+        self.bytes_saved = 0
+
+    def add_known(self, arcname: str, size: int, sha256: str) -> None:
+        """Register a member already in the archive (e.g. resumed from a checkpoint)."""
+        if size >= self.min_size:
+            self.by_size.setdefault(size, []).append([arcname, None, sha256])
+
+    def check(self, path, arcname: str, size: int):
+        """
+        Return (source arcname, sha256) if path duplicates a file already
+        registered; otherwise register it as the holder of its content
+        and return (None, sha256 or None).
+        """
+        if size < self.min_size:
+            return None, None
+        group = self.by_size.setdefault(size, [])
+        if not group:
+            group.append([arcname, path, None])
+            return None, None
+        sha256 = file_sha256(path)
+        for candidate in group:
+            if candidate[2] is None:
+                try:
+                    candidate[2] = file_sha256(candidate[1])
+                except OSError:
+                    candidate[2] = ""  # Vanished: never matches
+            if candidate[2] == sha256:
+                self.duplicates[arcname] = candidate[0]
+                self.bytes_saved += size
+                return candidate[0], sha256
+        group.append([arcname, path, sha256])
+        return None, sha256
+
+    def discard(self, arcname: str, size: int) -> None:
+        """Forget a duplicate whose source didn't end up archived with the hashed bytes."""
+        if self.duplicates.pop(arcname, None) is not None:
+            self.bytes_saved -= size
@@ -0,0 +1,189 @@
+"""
+gitignore-style exclusion rules for BigSkyAg backups.
+
+Patterns follow .gitignore syntax: `*`, `?`, `[...]` and `**` globs, a
+trailing `/` for directories only, a leading or inner `/` to anchor a pattern
+to the directory that declares it, and `!` to re-include. Later patterns
+win. Any directory may add rules for its own subtree with a `.backupignore`
+file.
+
+Rules compile once: plain names (`.DS_Store`, `node_modules/`) go into a
+set, `*.ext` patterns into a suffix tuple, anchored literal paths
+(`/00_Admin/Backups/`) into a prefix trie, and everything else into one
+combined regex. When negations are present the rules are evaluated as a
+single ordered regex instead, so "last match wins" still holds.
+backup_walk.scan_tree applies the rules while walking, so excluded
+subtrees are never descended into.
+"""
+
+import re
+
+IGNORE_FILE = ".backupignore"
+
+DEFAULT_EXCLUDES = [
+    "/00_Admin/Backups/",  # Don't backup the backup folder (zips, chunks, snapshots)
+    "/.backup_journal/",  # Change journal kept by backup_journal's watcher
+    ".git/",  # Don't backup git folder (can be large)
+    ".DS_Store",  # macOS system files
+    "Thumbs.db",  # Windows system files
+    "*.tmp",  # Temporary files
+    "*.temp",  # Temporary files
+    "*.log",  # Log files (optional)
+    "__pycache__/",  # Python cache
+    "*.pyc",  # Python compiled files
+    "node_modules/",  # Node.js modules
+    ".Trash/",  # Trash folder
+    "*~",  # Editor backup files
+]
+
+_WILDCARDS = re.compile(r"[*?\[\\]")
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate one gitignore glob (without anchoring) into a regex body."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pattern.startswith("**", i):
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pattern.find("]", i + 2)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j + 1
+                continue
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class Rule:
+    """One parsed pattern, relative to the directory `base` that declared it."""
+
+    def __init__(self, pattern: str, base: str = ""):
+        line = pattern
+        self.negate = line.startswith("!")
+        if self.negate:
+            line = line[1:]
+        elif line.startswith(("\\!", "\\#")):
+            line = line[1:]
+        self.dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        self.anchored = "/" in line
+        self.body = line.lstrip("/")
+        self.base = base
+        self.literal = not _WILDCARDS.search(self.body)
+
+        head = "^" + (re.escape(base + "/") if base else "")
+        if not self.anchored:
+            head += "(?:.*/)?"
+        tail = "/.*$" if self.dir_only else "(?:/.*)?$"
+        self.regex = head + _glob_to_regex(self.body) + tail
+
+
+def parse_patterns(lines, base: str = "") -> list:
+    """Parse gitignore lines, skipping blanks and comments."""
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n").rstrip()
+        if line and not line.startswith("#"):
+            rules.append(Rule(line, base))
+    return rules
+
+
+def load_ignore_file(path) -> list:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.readlines()
+    except OSError:
+        return []
+
+
+class ExclusionMatcher:
+    """Compiled set of rules; excluded() takes a '/'-separated relative path."""
+
+    def __init__(self, patterns=None, rules=None):
+        self.rules = list(rules or []) + parse_patterns(DEFAULT_EXCLUDES if patterns is None else patterns)
+        self._compile()
+
+    def child(self, rel_dir: str, lines) -> "ExclusionMatcher":
+        """Matcher for a subtree whose directory carries its own ignore file."""
+        extra = parse_patterns(lines, base=rel_dir)
+        return ExclusionMatcher(patterns=[], rules=self.rules + extra) if extra else self
+
+    def _compile(self) -> None:
+        self._ordered = None
+        self._names = set()
+        self._dir_names = set()
+        self._suffixes = ()
+        self._trie = {}
+        self._regex = None
+
+        if any(r.negate for r in self.rules):
+            # Reverse order so the first alternative that matches is the last rule
+            alternatives = [f"(?P<r{i}>{r.regex})" for i, r in reversed(list(enumerate(self.rules)))]
+            self._ordered = re.compile("|".join(alternatives))
+            return
+
+        suffixes, rest = [], []
+        for rule in self.rules:
+            if rule.base:
+                rest.append(rule)
+            elif not rule.anchored and rule.literal:
+                (self._dir_names if rule.dir_only else self._names).add(rule.body)
+            elif (not rule.anchored and not rule.dir_only and rule.body.startswith("*")
+                  and not _WILDCARDS.search(rule.body[1:])):
+                suffixes.append(rule.body[1:])
+            elif rule.anchored and rule.literal:
+                node = self._trie
+                for part in rule.body.split("/"):
+                    node = node.setdefault(part, {})
+                node[None] = node.get(None, True) and rule.dir_only
+            else:
+                rest.append(rule)
+        self._suffixes = tuple(suffixes)
+        if rest:
+            self._regex = re.compile("|".join(f"(?:{r.regex})" for r in rest))
+
+    def excluded(self, rel_path: str, is_dir: bool = False) -> bool:
+        subject = rel_path + "/" if is_dir else rel_path
+        if self._ordered is not None:
+            m = self._ordered.match(subject)
+            return bool(m) and not self.rules[int(m.lastgroup[1:])].negate
+
+        parts = rel_path.split("/")
+        last = len(parts) - 1
+        node = self._trie
+        for i, part in enumerate(parts):
+            if part in self._names:
+                return True
+            if part in self._dir_names and (is_dir or i < last):
+                return True
+            if self._suffixes and part.endswith(self._suffixes):
+                return True
+            if node is not None:
+                node = node.get(part)
+                if node is not None and None in node and (not node[None] or is_dir or i < last):
+                    return True
+        return bool(self._regex and self._regex.match(subject))
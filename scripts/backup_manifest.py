@@ -0,0 +1,151 @@
+"""
+Manifest and chain bookkeeping for incremental BigSkyAg backups.
+
+The manifest remembers path, size, mtime and SHA-256 for every file in the
+last backup so the next run only archives what changed. The chain file
+records which archives are full anchors and which incrementals depend on
+them, so pruning never removes a base that a newer backup still needs.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+MANIFEST_NAME = "backup_manifest.json"
+CHAIN_NAME = "backup_chain.json"
+META_PREFIX = "__backup__/"
+DUPLICATES_NAME = META_PREFIX + "duplicates.json"
+PARTS_SUFFIX = ".parts.json"
+ENC_SUFFIX = ".enc"
+HASH_BLOCK = 1024 * 1024
+
+
+def file_sha256(path) -> str:
+    """Return the hex SHA-256 of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path: Path, data) -> None:
+    """Write JSON next to its destination and rename it into place."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_manifest(backup_dir) -> dict:
+    """Load the manifest of the previous run, or an empty one."""
+    path = Path(backup_dir) / MANIFEST_NAME
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"archive": None, "created": None, "files": {}}
+
+
+def save_manifest(backup_dir, archive_name: str, files: dict) -> None:
+    """Persist the manifest once the archive it describes is complete."""
+    _write_json_atomic(Path(backup_dir) / MANIFEST_NAME, {
+        "archive": archive_name,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "files": files,
+    })
+
+
+def parts_manifest_name(archive_name: str) -> str:
+    """Name of the parts manifest a split archive is published under (see backup_split)."""
+    return Path(archive_name).stem + PARTS_SUFFIX
+
+
+def archive_exists(backup_dir, archive_name: str) -> bool:
+    """True if the archive exists as a single zip, encrypted, or as a complete split set."""
+    backup_dir = Path(backup_dir)
+    return ((backup_dir / archive_name).exists()
+            or (backup_dir / (archive_name + ENC_SUFFIX)).exists()
+            or (backup_dir / parts_manifest_name(archive_name)).exists())
+
+
+def incremental_name(backup_dir, today: str, now=None) -> str:
+    """
+    A name no other archive in backup_dir has, for an incremental taken
+    today: BigSkyAg_Backup_<date>_incremental_<HHMMSS>.zip, with -2, -3 ...
+    appended if that second is taken too. Several incrementals a day each
+    keep their own file instead of overwriting (and parenting) each other.
+    """
+    stem = f"BigSkyAg_Backup_{today}_incremental_{(now or datetime.now()):%H%M%S}"
+    name, n = stem + ".zip", 1
+    while (archive_exists(backup_dir, name)
+           or archive_exists(Path(backup_dir) / "archive", name)):
+        n += 1
+        name = f"{stem}-{n}.zip"
+    return name
+
+
+def entry_unchanged(entry, st) -> bool:
+    """True when a manifest entry [size, mtime_ns, sha256] still matches a stat result."""
+    return bool(entry) and entry[0] == st.st_size and entry[1] == st.st_mtime_ns
+
+
+def load_chain(backup_dir) -> list:
+    """Load the chain entries, oldest first."""
+    path = Path(backup_dir) / CHAIN_NAME
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("archives", [])
+    except (OSError, ValueError):
+        return []
+
+
+def save_chain(backup_dir, chain: list) -> None:
+    _write_json_atomic(Path(backup_dir) / CHAIN_NAME, {"archives": chain})
+
+
+def record_archive(backup_dir, name: str, kind: str, parent=None) -> dict:
+    """Append (or replace) a chain entry for a freshly written archive."""
+    if parent == name:
+        raise ValueError(f"Backup {name} can't be its own parent")
+    chain = [e for e in load_chain(backup_dir) if e["name"] != name]
+    entry = {
+        "name": name,
+        "kind": kind,
+        "parent": parent,
+        "created": datetime.now().isoformat(timespec="seconds"),
+    }
+    chain.append(entry)
+    save_chain(backup_dir, chain)
+    return entry
+
+
+def needs_full_backup(backup_dir, manifest: dict, full_every_days: int) -> bool:
+    """
+    A full backup anchors the chain when there is no usable previous run,
+    the previous archive is gone, or the last full is too old.
+    """
+    if not manifest.get("archive") or not manifest.get("files"):
+        return True
+    if not archive_exists(backup_dir, manifest["archive"]):
+        return True
+    fulls = [e for e in load_chain(backup_dir) if e["kind"] == "full"]
+    if not fulls:
+        return True
+    last_full = datetime.fromisoformat(fulls[-1]["created"])
+    return (datetime.now() - last_full).days >= full_every_days
+
+
+def chain_dependencies(chain: list, names) -> set:
+    """Return `names` plus every archive they transitively depend on."""
+    parents = {e["name"]: e.get("parent") for e in chain}
+    keep = set()
+    for name in names:
+        while name and name not in keep:
+            keep.add(name)
+            name = parents.get(name)
+    return keep
@@ -0,0 +1,294 @@
+"""
+Parallel compression pipeline for BigSkyAg zip backups.
+
+Files are cut into fixed-size blocks that a thread pool reads and compresses
+concurrently (zlib, bz2 and lzma all release the GIL while they work). A
+single writer — the calling thread — appends the results to the ZipFile in
+submission order, so archives are deterministic and valid ZIP64.
+
+Deflate members are compressed pigz-style: every block is its own raw
+deflate segment primed with the previous 32 KB as a dictionary and ended
+with a sync flush, so the concatenation is one valid deflate stream and
+large files scale across cores too. bzip2/lzma streams can't be
+concatenated, so those members are compressed whole by a single worker (or
+streamed by the writer when they would blow the in-flight budget).
+
+Peak memory is bounded by `inflight_bytes`: the writer drains finished
+blocks before submitting more work once the budget is reached.
+
+This relies on the same ZipFile internals zipfile itself uses to write
+members (start_dir, filelist, _writecheck, _get_compressor), mirroring
+ZipFile.mkdir and _ZipWriteFile.close. On a Python whose zipfile lacks
+them, every member is streamed through the public ZipFile.open instead:
+slower, since nothing runs in parallel, but the archive is the same.
+"""
+
+import hashlib
+import os
+import struct
+import time
+import zipfile
+import zlib
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from zipfile import ZIP64_LIMIT, ZIP_DEFLATED, ZIP_LZMA, ZIP_STORED, ZipFile, ZipInfo
+
+BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_INFLIGHT = 256 * 1024 * 1024
+DICT_SIZE = 32 * 1024
+STREAM_BLOCK = 1024 * 1024
+
+_MASK_USE_DATA_DESCRIPTOR = 0x08
+_MASK_COMPRESS_OPTION_1 = 0x02
+
+# zipfile internals the block writer needs (see module docstring)
+_ZIP_INTERNALS = (hasattr(zipfile, "_get_compressor") and hasattr(zipfile, "_DD_SIGNATURE")
+                  and hasattr(ZipFile, "_writecheck"))
+# Where ZipFile.open(zinfo, "w") reads the compression level (public since Python 3.13)
+_LEVEL_ATTR = "compress_level" if hasattr(ZipInfo, "compress_level") else "_compresslevel"
+
+
+def zipinfo_from_stat(arcname: str, st) -> ZipInfo:
+    """Build a ZipInfo from an existing stat result instead of stat-ing again."""
+    arcname = arcname.replace(os.sep, "/").lstrip("/")
+    date_time = time.localtime(st.st_mtime)[0:6]
+    if date_time[0] < 1980:
+        date_time = (1980, 1, 1, 0, 0, 0)
+    zinfo = ZipInfo(arcname, date_time)
+    zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+    zinfo.file_size = st.st_size
+    return zinfo
+
+
+def _compress_block(path, offset, length, compress_type, level, last):
+    """
+    Read one block of a file and compress it. Runs on a worker thread.
+    Returns (raw, payload, read_seconds, compress_seconds).
+    """
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        prefix = b""
+        if compress_type == ZIP_DEFLATED and offset:
+            start = max(0, offset - DICT_SIZE)
+            f.seek(start)
+            prefix = f.read(offset - start)
+        else:
+            f.seek(offset)
+        raw = f.read(length)
+    t1 = time.perf_counter()
+
+    if compress_type == ZIP_STORED:
+        payload = raw
+    elif compress_type == ZIP_DEFLATED:
+        kwargs = {"zdict": prefix} if prefix else {}
+        c = zlib.compressobj(-1 if level is None else level, zlib.DEFLATED, -15, **kwargs)
+        payload = c.compress(raw) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    else:
+        c = zipfile._get_compressor(compress_type, level)
+        payload = c.compress(raw) + c.flush()
+    return raw, payload, t1 - t0, time.perf_counter() - t1
+
+
+class Member:
+    """Write state for one archive member; sha256 is set once it is written."""
+
+    def __init__(self, path, zinfo, blocks, hash_content, st=None):
+        self.path = path
+        self.zinfo = zinfo
+        self.st = st
+        self.blocks = blocks
+        self.error = None
+        self.sha256 = None
+        self._digest = hashlib.sha256() if hash_content else None
+        self._crc = 0
+        self._raw_size = 0
+        self._compress_size = 0
+        self._zip64 = False
+        self._started = False
+
+
+class ParallelZipWriter:
+    """
+    Compress members on a thread pool and write them in submission order.
+    on_member(member) is called on the writer thread as each member lands.
+    """
+
+    def __init__(self, zipf, workers=None, inflight_bytes=DEFAULT_INFLIGHT,
+                 block_size=BLOCK_SIZE, hash_content=True, progress=None, on_member=None):
+        self.zipf = zipf
+        self.progress = progress
+        self.on_member = on_member
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.inflight_bytes = max(inflight_bytes, block_size)
+        self.block_size = block_size
+        self.hash_content = hash_content
+        self.pending = deque()
+        self.inflight = 0
+
+    def add(self, path, arcname, st=None, compress_type=ZIP_DEFLATED, compresslevel=6) -> Member:
+        """Queue a file for archiving. Returns its Member handle."""
+        st = st or os.stat(path)
+        zinfo = zipinfo_from_stat(arcname, st)
+        zinfo.compress_type = compress_type
+        setattr(zinfo, _LEVEL_ATTR, compresslevel)
+        size = st.st_size
+
+        if _ZIP_INTERNALS and compress_type in (ZIP_STORED, ZIP_DEFLATED):
+            offsets = range(0, size, self.block_size) if size else [0]
+        elif _ZIP_INTERNALS and size <= self.inflight_bytes // 4:
+            offsets = [0]
+        else:
+            # Too big to hold in memory as a single bz2/lzma task, or no
+            # zipfile internals to write blocks with
+            member = Member(path, zinfo, 0, self.hash_content, st)
+            self._drain()
+            self._stream_member(member)
+            return member
+
+        member = Member(path, zinfo, len(offsets), self.hash_content, st)
+        for index, offset in enumerate(offsets):
+            last = index == len(offsets) - 1
+            length = self.block_size if len(offsets) > 1 else max(size, 1)
+            while self.pending and self.inflight + length > self.inflight_bytes:
+                self._write_next()
+            future = self.pool.submit(_compress_block, path, offset, length,
+                                      compress_type, compresslevel, last)
+            self.pending.append((member, index, future, length))
+            self.inflight += length
+        return member
+
+    def close(self) -> None:
+        """Write everything still in flight and stop the workers."""
+        self._drain()
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            self.pool.shutdown(cancel_futures=True)
+            return False
+        self.close()
+        return False
+
+    # --- writer side -------------------------------------------------------
+
+    def _drain(self) -> None:
+        while self.pending:
+            self._write_next()
+
+    def _write_next(self) -> None:
+        member, index, future, cost = self.pending.popleft()
+        self.inflight -= cost
+        if member.error is not None:
+            return
+        try:
+            raw, payload, read_s, compress_s = future.result()
+        except Exception as e:
+            # Unreadable source, or a compressor error: skip the member, as the serial path does
+            self._abort_member(member, e)
+            return
+        start = time.perf_counter()
+        if index == 0:
+            self._start_member(member)
+        self._write_payload(member, raw, payload)
+        if index == member.blocks - 1:
+            self._finish_member(member)
+        if self.progress is not None:
+            self.progress.add_time("read", read_s)
+            self.progress.add_time("compress", compress_s)
+            self.progress.add_time("write", time.perf_counter() - start)
+            if index == member.blocks - 1:
+                self.progress.file_done(member.zinfo.file_size, member.zinfo.filename)
+
+    def _start_member(self, member: Member) -> None:
+        zipf, zinfo = self.zipf, member.zinfo
+        zinfo.compress_size = 0
+        zinfo.CRC = 0
+        zinfo.flag_bits = 0x00
+        if zinfo.compress_type == ZIP_LZMA:
+            zinfo.flag_bits |= _MASK_COMPRESS_OPTION_1
+        if not zipf._seekable:
+            zinfo.flag_bits |= _MASK_USE_DATA_DESCRIPTOR
+        member._zip64 = zinfo.file_size * 1.05 > ZIP64_LIMIT
+        if zipf._seekable:
+            zipf.fp.seek(zipf.start_dir)
+        zinfo.header_offset = zipf.fp.tell()
+        zipf._writecheck(zinfo)
+        zipf._didModify = True
+        zipf.fp.write(zinfo.FileHeader(member._zip64))
+        member._started = True
+
+    def _write_payload(self, member: Member, raw: bytes, payload: bytes) -> None:
+        member._crc = zlib.crc32(raw, member._crc)
+        member._raw_size += len(raw)
+        member._compress_size += len(payload)
+        if member._digest is not None:
+            member._digest.update(raw)
+        self.zipf.fp.write(payload)
+
+    def _finish_member(self, member: Member) -> None:
+        zipf, zinfo, fp = self.zipf, member.zinfo, self.zipf.fp
+        zinfo.CRC = member._crc
+        zinfo.file_size = member._raw_size
+        zinfo.compress_size = member._compress_size
+        if zinfo.flag_bits & _MASK_USE_DATA_DESCRIPTOR:
+            fmt = "<LLQQ" if member._zip64 else "<LLLL"
+            fp.write(struct.pack(fmt, zipfile._DD_SIGNATURE, zinfo.CRC,
+                                 zinfo.compress_size, zinfo.file_size))
+            zipf.start_dir = fp.tell()
+        else:
+            if not member._zip64 and (zinfo.file_size > ZIP64_LIMIT
+                                      or zinfo.compress_size > ZIP64_LIMIT):
+                raise RuntimeError(f"{member.path} grew past the ZIP64 limit while archiving")
+            zipf.start_dir = fp.tell()
+            fp.seek(zinfo.header_offset)
+            fp.write(zinfo.FileHeader(member._zip64))
+            fp.seek(zipf.start_dir)
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+        if member._digest is not None:
+            member.sha256 = member._digest.hexdigest()
+        if self.on_member is not None:
+            self.on_member(member)
+
+    def _abort_member(self, member: Member, error: Exception) -> None:
+        """Drop a member whose source or compressor failed, rewinding if possible."""
+        member.error = error
+        if member._started:
+            if not self.zipf._seekable:
+                # Streamed output can't rewind; leave the bytes as dead space the
+                # central directory never points at
+                self.zipf.start_dir = self.zipf.fp.tell()
+                return
+            self.zipf.fp.seek(member.zinfo.header_offset)
+            self.zipf.fp.truncate()
+            self.zipf.start_dir = member.zinfo.header_offset
+
+    def _stream_member(self, member: Member) -> None:
+        """Compress a member on the writer thread through ZipFile.open."""
+        digest = member._digest
+        timed = self.progress.timed("compress") if self.progress is not None else nullcontext()
+        try:
+            with timed, open(member.path, "rb") as src, self.zipf.open(member.zinfo, "w") as dst:
+                member._started = True
+                for block in iter(lambda: src.read(STREAM_BLOCK), b""):
+                    if digest is not None:
+                        digest.update(block)
+                    dst.write(block)
+        except Exception as e:
+            if member.zinfo in self.zipf.filelist:
+                # Leaving the with block closed dst, which recorded the truncated
+                # entry as if it were complete; take it back out
+                self.zipf.filelist.remove(member.zinfo)
+                self.zipf.NameToInfo.pop(member.zinfo.filename, None)
+            self._abort_member(member, e)
+            return
+        if digest is not None:
+            member.sha256 = digest.hexdigest()
+        if self.on_member is not None:
+            self.on_member(member)
+        if self.progress is not None:
+            self.progress.file_done(member.zinfo.file_size, member.zinfo.filename)
@@ -0,0 +1,213 @@
+"""
+Progress reporting for BigSkyAg backups.
+
+Replaces per-file printing with rate-limited updates: files/s, bytes/s, ETA
+and the current phase go to the terminal (one overwritten line on a TTY,
+an occasional log line under launchd) and to a JSON status file that the
+health checker and mobile API read. When a run ends, a summary with timing
+breakdowns for walk, read, compress and write is stored in the status file
+and appended to backup_runs.jsonl next to it.
+
+read and compress are summed across worker threads, so on a multi-core
+run they can exceed the wall-clock time.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+STATUS_PATH = Path(os.getenv("BACKUP_STATUS_PATH",
+                             str(Path.home() / "PaulyOps" / "Reports" / "backup_status.json")))
+TIMINGS = ("walk", "read", "compress", "write")
+
+
+def load_status(path=STATUS_PATH) -> dict:
+    """Read the status file, or {} when no backup has reported yet."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def _fmt_eta(seconds) -> str:
+    if seconds is None:
+        return "?"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{secs:02d}s"
+
+
+class BackupProgress:
+    """Counters, timings and rate-limited reporting for one backup run."""
+
+    def __init__(self, label, status_path=STATUS_PATH, interval=None, stream=None, verbose=False):
+        self.label = label
+        self.status_path = Path(status_path)
+        self.stream = stream or sys.stdout
+        self.tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.interval = interval if interval is not None else (1.0 if self.tty else 30.0)
+        self.verbose = verbose
+        self.phase = "starting"
+        self.started = time.time()
+        self.files = 0
+        self.bytes = 0
+        self.excluded = 0
+        self.skipped = 0
+        self.unchanged = 0
+        self.timings = dict.fromkeys(TIMINGS, 0.0)
+        self._lock = threading.Lock()
+        self._last_emit = 0.0
+        self._status_error = False
+
+        last_run = self._last_run = load_status(self.status_path).get("last_run") or {}
+        self.expected_files = last_run.get("files_seen")
+        self.expected_bytes = last_run.get("bytes_seen")
+        self.bytes_seen = 0
+        self.files_seen = 0
+
+    # --- counters ------------------------------------------------------------
+
+    def set_phase(self, phase: str) -> None:
+        self.phase = phase
+        self.tick(force=True)
+
+    def add_time(self, category: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[category] += seconds
+
+    @contextmanager
+    def timed(self, category: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(category, time.perf_counter() - start)
+
+    def timed_iter(self, iterable, category: str = "walk"):
+        """Yield from iterable, charging the time spent producing items to category."""
+        it = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add_time(category, time.perf_counter() - start)
+                return
+            self.add_time(category, time.perf_counter() - start)
+            yield item
+
+    def file_seen(self, size: int) -> None:
+        """A file was found by the walk (archived or not); drives the ETA."""
+        self.files_seen += 1
+        self.bytes_seen += size
+
+    def file_done(self, size: int, name=None) -> None:
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+        if self.verbose and name:
+            self._print(f"📦 Added: {name}")
+        self.tick()
+
+    def note_excluded(self, rel: str) -> None:
+        self.excluded += 1
+        if self.verbose:
+            self._print(f"🚫 Excluded: {rel}")
+
+    def note_skipped(self, path, error) -> None:
+        self.skipped += 1
+        self._print(f"⚠️ Skipped: {path} → {error}")
+
+    # --- reporting -----------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.time() - self.started, 1e-6)
+        bytes_per_s = self.bytes / elapsed
+        eta = None
+        if self.expected_bytes and self.bytes_seen and self.phase not in ("done", "failed"):
+            # Walk and archive advance together, so the discovery rate is the run rate
+            eta = max(self.expected_bytes - self.bytes_seen, 0) / (self.bytes_seen / elapsed)
+        return {
+            "label": self.label,
+            "phase": self.phase,
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "elapsed_s": round(elapsed, 1),
+            "files": self.files,
+            "bytes": self.bytes,
+            "files_seen": self.files_seen,
+            "bytes_seen": self.bytes_seen,
+            "unchanged": self.unchanged,
+            "excluded": self.excluded,
+            "skipped": self.skipped,
+            "files_per_s": round(self.files / elapsed, 1),
+            "bytes_per_s": round(bytes_per_s),
+            "eta_s": None if eta is None else round(eta),
+            "timings_s": {k: round(v, 2) for k, v in self.timings.items()},
+        }
+
+    def tick(self, force: bool = False) -> None:
+        now = time.time()
+        if not force and now - self._last_emit < self.interval:
+            return
+        self._last_emit = now
+        snap = self.snapshot()
+        line = (f"⏳ {snap['phase']}: {snap['files']:,} files · {_fmt_bytes(snap['bytes'])} · "
+                f"{snap['files_per_s']:.0f} files/s · {_fmt_bytes(snap['bytes_per_s'])}/s · "
+                f"ETA {_fmt_eta(snap['eta_s'])}")
+        if self.tty:
+            self.stream.write("\r" + line.ljust(100))
+            self.stream.flush()
+        else:
+            self._print(line)
+        self._write_status({"state": "running", **snap, "last_run": self._last_run})
+
+    def finish(self, ok: bool = True, **extra) -> dict:
+        """Record the run summary and return it."""
+        self.phase = "done" if ok else "failed"
+        summary = {**self.snapshot(), **extra, "ok": ok}
+        if self.tty:
+            self.stream.write("\n")
+        self._write_status({"state": self.phase, **summary, "last_run": summary})
+        try:
+            with open(self.status_path.with_name("backup_runs.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary) + "\n")
+        except OSError:
+            pass
+        t = summary["timings_s"]
+        self._print(f"⏱️  {summary['files']:,} files, {_fmt_bytes(summary['bytes'])} in "
+                    f"{summary['elapsed_s']:.0f}s ({_fmt_bytes(summary['bytes_per_s'])}/s) — "
+                    f"walk {t['walk']:.1f}s, read {t['read']:.1f}s, "
+                    f"compress {t['compress']:.1f}s, write {t['write']:.1f}s")
+        return summary
+
+    def _print(self, message: str) -> None:
+        if self.tty:
+            self.stream.write("\r" + " " * 100 + "\r")
+        print(message, file=self.stream, flush=True)
+
+    def _write_status(self, data: dict) -> None:
+        try:
+            self.status_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.status_path.with_name(self.status_path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.status_path)
+        except OSError as e:
+            if not self._status_error:
+                self._status_error = True
+                self._print(f"Warning: Could not write backup status: {e}")
@@ -0,0 +1,242 @@
+"""
+Grandfather-father-son retention for BigSkyAg backups.
+
+One engine decides what the backup folder and its archive/ keep, so the
+backup run, the auto-doctor and the nightly report all agree. With the
+default policy:
+
+    active   1   newest backup stays in the backup folder, others move to archive/
+    daily    7   newest backup of each of the last 7 days that have one
+    weekly   4   one per ISO week for the last 4 weeks (a full backup if the week has one)
+    monthly  6   one per month for the last 6 months (likewise)
+
+Every incremental that is kept also keeps the archives it depends on
+(backup_chain.json), so a restore never loses its base. Anything else is
+deleted. A plan comes from one scan of the two folders and the dates in the
+file names — no stat calls — and can be printed as a dry run or applied in
+one batch. Files whose names don't parse are never touched.
+
+    python backup_retention.py ~/PaulyOps/Backups            # dry run
+    python backup_retention.py ~/PaulyOps/Backups --apply
+"""
+
+import os
+import re
+from collections import namedtuple
+from datetime import date
+from pathlib import Path
+
+from backup_manifest import ENC_SUFFIX, PARTS_SUFFIX, chain_dependencies, load_chain, save_chain
+from backup_split import delete_split, move_split
+
+ARCHIVE_SUBDIR = "archive"
+ARCHIVE_RE = re.compile(r"^BigSkyAg_Backup_(\d{4})-(\d{2})-(\d{2})(_incremental(?:_(?P<time>\d{6})(?:-(?P<seq>\d+))?)?)?"
+                        r"(?P<ext>\.zip|\.zip" + re.escape(ENC_SUFFIX) + "|" + re.escape(PARTS_SUFFIX) + r")$")
+DATED_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+DEFAULT_POLICY = {"active": 1, "daily": 7, "weekly": 4, "monthly": 6}
+
+# name is the logical .zip name, which is how the chain refers to split and encrypted ones too
+Backup = namedtuple("Backup", "name path day incremental split location")
+
+
+def parse_day(name: str):
+    """The first YYYY-MM-DD in a name as a date, or None."""
+    m = DATED_RE.search(name)
+    if not m:
+        return None
+    try:
+        return date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    except ValueError:
+        return None
+
+
+class RetentionPolicy:
+    """How many backups to keep per tier."""
+
+    def __init__(self, active=1, daily=7, weekly=4, monthly=6):
+        self.active = max(1, int(active))
+        self.daily = int(daily)
+        self.weekly = int(weekly)
+        self.monthly = int(monthly)
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Build the policy from backup.retention in the project config."""
+        if config is None:
+            try:
+                from config.loader import load_config
+                config = load_config()
+            except Exception as e:
+                print(f"Warning: Could not load backup retention config: {e}")
+                config = {}
+        section = (config.get("backup") or {}).get("retention") or {}
+        return cls(**{k: section.get(k, v) for k, v in DEFAULT_POLICY.items()})
+
+    def select(self, items) -> dict:
+        """
+        Pick what the daily/weekly/monthly tiers keep. items are
+        (day, key, preferred) tuples, newest first; within a week or month
+        the newest preferred item wins, else the newest. Returns
+        {key: [tier, ...]}; the newest item is always kept.
+        """
+        keep = {}
+        tiers = (("daily", self.daily, lambda d: d, False),
+                 ("weekly", self.weekly, lambda d: d.isocalendar()[:2], True),
+                 ("monthly", self.monthly, lambda d: (d.year, d.month), True))
+        for tier, count, bucket_of, use_preference in tiers:
+            buckets = {}
+            for day, key, preferred in items:
+                bucket = buckets.setdefault(bucket_of(day), [])
+                if len(buckets) > count:
+                    break
+                bucket.append((key, preferred))
+            for bucket in list(buckets.values())[:count]:
+                key = next((k for k, p in bucket if p), bucket[0][0]) if use_preference else bucket[0][0]
+                keep.setdefault(key, []).append(tier)
+        if items:
+            keep.setdefault(items[0][1], []).append("newest")
+        return keep
+
+
+def scan_backups(backup_dir, archive_subdir=ARCHIVE_SUBDIR) -> list:
+    """Backups in backup_dir and its archive folder from one listing each, newest first."""
+    found = []
+    order = {}
+    for location, directory in (("active", Path(backup_dir)), ("archive", Path(backup_dir) / archive_subdir)):
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            m = ARCHIVE_RE.match(entry.name)
+            if not m:
+                continue
+            try:
+                day = date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+            except ValueError:
+                continue
+            split = m.group("ext") == PARTS_SUFFIX
+            if split:
+                name = entry.name[:-len(PARTS_SUFFIX)] + ".zip"
+            else:
+                name = entry.name[:-len(ENC_SUFFIX)] if entry.name.endswith(ENC_SUFFIX) else entry.name
+            order[name] = (m.group("time") or "", int(m.group("seq") or 1))
+            found.append(Backup(name, Path(entry.path), day, bool(m.group(4)), split, location))
+    # Same day: incrementals were taken after that day's full, in time (then -N) order
+    found.sort(key=lambda b: (b.day, b.incremental, order[b.name]), reverse=True)
+    return found
+
+
+class RetentionPlan:
+    """What retention would do: keep (with reasons), move to archive/, delete."""
+
+    def __init__(self, backup_dir, archive_dir, keep, moves, deletes, chain):
+        self.backup_dir = Path(backup_dir)
+        self.archive_dir = Path(archive_dir)
+        self.keep = keep          # {name: [reason, ...]}
+        self.moves = moves        # [Backup] in the backup folder that belong in archive/
+        self.deletes = deletes    # [Backup]
+        self.chain = chain
+
+    @property
+    def pending(self) -> int:
+        return len(self.moves) + len(self.deletes)
+
+    def summary(self) -> str:
+        tiers = {}
+        for reasons in self.keep.values():
+            for reason in reasons:
+                tiers[reason] = tiers.get(reason, 0) + 1
+        kept = ", ".join(f"{n} {tier}" for tier, n in sorted(tiers.items()))
+        return (f"Keeping {len(self.keep)} backups ({kept}); "
+                f"pending: {len(self.moves)} to archive, {len(self.deletes)} to delete")
+
+    def describe(self) -> list:
+        lines = [f"keep    {name}  ({', '.join(reasons)})" for name, reasons in sorted(self.keep.items())]
+        lines += [f"archive {b.name}" for b in self.moves]
+        lines += [f"delete  {b.name}  ({b.location})" for b in self.deletes]
+        return lines
+
+
+def plan_retention(backup_dir, policy=None, archive_subdir=ARCHIVE_SUBDIR) -> RetentionPlan:
+    """Plan retention for backup_dir and its archive folder without changing anything."""
+    policy = policy or RetentionPolicy.from_config()
+    backups = scan_backups(backup_dir, archive_subdir)
+    chain = load_chain(backup_dir)
+    kinds = {e["name"]: e.get("kind") for e in chain}
+
+    keep = {b.name: ["active"] for b in backups[:policy.active]}
+    items = [(b.day, b.name, kinds.get(b.name, "incremental" if b.incremental else "full") == "full")
+             for b in backups]
+    for name, tiers in policy.select(items).items():
+        keep.setdefault(name, []).extend(tiers)
+    for name in chain_dependencies(chain, list(keep)) - set(keep):
+        keep[name] = ["chain base"]
+
+    active_names = {b.name for b in backups[:policy.active]}
+    moves = [b for b in backups if b.name in keep and b.location == "active" and b.name not in active_names]
+    deletes = [b for b in backups if b.name not in keep]
+    return RetentionPlan(backup_dir, Path(backup_dir) / archive_subdir, keep, moves, deletes, chain)
+
+
+def apply_retention(plan: RetentionPlan, log=print) -> dict:
+    """Carry out a plan in one pass: moves, then deletes, then one chain update."""
+    stats = {"moved": 0, "deleted": 0, "errors": 0}
+    if plan.moves:
+        plan.archive_dir.mkdir(parents=True, exist_ok=True)
+    for b in plan.moves:
+        try:
+            if b.split:
+                move_split(b.path, plan.archive_dir)
+            else:
+                os.replace(b.path, plan.archive_dir / b.path.name)
+            log(f"📦 Archived: {b.name} ({', '.join(plan.keep[b.name])})")
+            stats["moved"] += 1
+        except OSError as e:
+            log(f"⚠️ Could not archive {b.name}: {e}")
+            stats["errors"] += 1
+    for b in plan.deletes:
+        try:
+            if b.split:
+                delete_split(b.path)
+            else:
+                b.path.unlink()
+            log(f"🗑️  Deleting old backup: {b.name}")
+            stats["deleted"] += 1
+        except OSError as e:
+            log(f"⚠️ Could not delete {b.name}: {e}")
+            stats["errors"] += 1
+    if plan.chain and stats["deleted"]:
+        gone = {b.name for b in plan.deletes}
+        save_chain(plan.backup_dir, [e for e in plan.chain if e["name"] not in gone])
+    return stats
+
+
+def enforce_retention(backup_dir, policy=None, archive_subdir=ARCHIVE_SUBDIR, dry_run=False, log=print):
+    """Plan and (unless dry_run) apply; returns the plan."""
+    plan = plan_retention(backup_dir, policy, archive_subdir)
+    if dry_run:
+        for line in plan.describe():
+            log(line)
+    elif plan.pending:
+        apply_retention(plan, log=log)
+    return plan
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Grandfather-father-son retention for BigSkyAg backups")
+    parser.add_argument("backup_dir")
+    parser.add_argument("--apply", action="store_true", help="Carry out the plan (default: dry run)")
+    parser.add_argument("--archive-subdir", default=ARCHIVE_SUBDIR)
+    for tier, default in DEFAULT_POLICY.items():
+        parser.add_argument(f"--{tier}", type=int, default=None, help=f"Override the {tier} count")
+    args = parser.parse_args()
+
+    policy = RetentionPolicy.from_config()
+    for tier in DEFAULT_POLICY:
+        if getattr(args, tier) is not None:
+            setattr(policy, tier, getattr(args, tier))
+    plan = enforce_retention(args.backup_dir, policy, args.archive_subdir, dry_run=not args.apply)
+    print(plan.summary())
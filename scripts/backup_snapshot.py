@@ -0,0 +1,229 @@
+"""
+Hardlink snapshots of the BigSkyAg tree, like `rsync --link-dest`.
+
+Each snapshot is a plain, browsable copy of the tree under
+Backups/Snapshots/BigSkyAg_<date>/. A file whose size and mtime match the
+newest earlier snapshot is hardlinked to it, so it costs a directory entry
+instead of a copy; only new and changed files are copied, in the kernel
+(copy_file_range, else sendfile, else the platform's fastest copyfile)
+over a small thread pool. A nightly run over an unchanged tree is a walk
+plus one link per file.
+
+A run builds BigSkyAg_<date>.in-progress and renames it when complete, so
+an interrupted run never looks like a snapshot and is cleared next time.
+Hardlinked files have no "original": deleting a snapshot only drops its
+names for them, and the data stays for as long as any other snapshot
+links it. Retention follows the same daily/weekly/monthly policy as the
+zip backups; it only has to make sure it never removes a
+snapshot a running backup is linking against (a lock on the Snapshots
+folder) and that a half-deleted snapshot can't be mistaken for a good one
+(it is renamed to .deleting before removal).
+"""
+
+import errno
+import fcntl
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from backup_progress import BackupProgress
+from backup_retention import RetentionPolicy, parse_day
+from backup_walk import scan_tree
+
+SNAPSHOT_PREFIX = "BigSkyAg_"
+IN_PROGRESS_SUFFIX = ".in-progress"
+DELETING_SUFFIX = ".deleting"
+INFO_NAME = ".snapshot.json"
+COPY_BLOCK = 64 * 1024 * 1024
+
+
+def snapshot_root(backup_dir) -> Path:
+    return Path(backup_dir) / "Snapshots"
+
+
+def list_link_snapshots(root) -> list:
+    """Completed snapshots, newest first."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    snaps = [p for p in root.iterdir()
+             if p.is_dir() and p.name.startswith(SNAPSHOT_PREFIX) and (p / INFO_NAME).exists()]
+    return sorted(snaps, key=lambda p: p.name, reverse=True)
+
+
+@contextmanager
+def _locked(root: Path):
+    """Exclusive lock on the Snapshots folder: one run or prune at a time."""
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _copy_file(src: str, dst: str, size: int) -> None:
+    """Copy src to dst inside the kernel where possible."""
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        infd, outfd = fin.fileno(), fout.fileno()
+        copied = 0
+        for copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+            if copy is None:
+                continue
+            try:
+                while copied < size:
+                    if copy is os.sendfile:
+                        n = os.sendfile(outfd, infd, copied, min(COPY_BLOCK, size - copied))
+                    else:
+                        n = os.copy_file_range(infd, outfd, min(COPY_BLOCK, size - copied))
+                    if n == 0:
+                        break
+                    copied += n
+                return
+            except OSError as e:
+                # Cross-device, unsupported fs, or (macOS) sendfile only writing to sockets
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                                   errno.ENOTSOCK, errno.EBADF) or copied:
+                    raise
+    shutil.copyfile(src, dst)  # uses fcopyfile on macOS
+
+
+def _copy_entry(src: str, dst: str, st, progress) -> int:
+    try:
+        with progress.timed("write"):
+            _copy_file(src, dst, st.st_size)
+    except OSError:
+        Path(dst).unlink(missing_ok=True)
+        raise
+    os.chmod(dst, st.st_mode & 0o7777)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))  # next run compares mtimes
+    return st.st_size
+
+
+def take_snapshot(source, backup_dir, today=None, matcher=None, workers=None,
+                  parallel_walk=False, progress=None, verbose=False) -> Path:
+    """
+    Snapshot source under backup_dir/Snapshots, hardlinking unchanged files
+    to the newest existing snapshot. Returns the snapshot folder.
+    """
+    root = snapshot_root(backup_dir)
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    with _locked(root):
+        for stale in root.glob(f"*{IN_PROGRESS_SUFFIX}"):
+            print(f"🧹 Removing interrupted snapshot: {stale.name}")
+            shutil.rmtree(stale, ignore_errors=True)
+        snapshots = list_link_snapshots(root)
+        previous = snapshots[0] if snapshots else None
+        name = SNAPSHOT_PREFIX + today
+        if (root / name).exists():
+            name += datetime.now().strftime("_%H%M%S")
+        final = root / name
+        work = root / (name + IN_PROGRESS_SUFFIX)
+        work.mkdir()
+
+        progress = progress or BackupProgress(name, verbose=verbose)
+        stats = {"linked": 0, "copied": 0, "bytes_copied": 0, "link_fallbacks": 0}
+        made_dirs = set()
+        try:
+            with ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1)) as pool:
+                copies = []
+                progress.set_phase("snapshotting")
+                walk = scan_tree(source, matcher=matcher, follow_symlinks=True,
+                                 on_excluded=progress.note_excluded, parallel=parallel_walk)
+                for file_path, rel, st in progress.timed_iter(walk, "walk"):
+                    progress.file_seen(st.st_size)
+                    target = work / rel
+                    if target.parent not in made_dirs:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        made_dirs.add(target.parent)
+                    if previous is not None:
+                        try:
+                            old = os.lstat(previous / rel)
+                            if old.st_size == st.st_size and old.st_mtime_ns == st.st_mtime_ns:
+                                os.link(previous / rel, target)
+                                stats["linked"] += 1
+                                progress.unchanged += 1
+                                progress.file_done(st.st_size, rel)
+                                continue
+                        except FileNotFoundError:
+                            pass
+                        except OSError as e:
+                            if e.errno != errno.EMLINK:  # too many links: copy instead
+                                raise
+                            stats["link_fallbacks"] += 1
+                    copies.append((pool.submit(_copy_entry, file_path, str(target), st, progress), rel))
+                    if len(copies) > 256:
+                        copies = _drain(copies, progress, stats, keep=64)
+                _drain(copies, progress, stats)
+
+            info = {"source": str(Path(source).resolve()), "previous": previous.name if previous else None,
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "files": stats["linked"] + stats["copied"], **stats,
+                    "bytes": progress.bytes_seen}
+            with open(work / INFO_NAME, "w", encoding="utf-8") as f:
+                json.dump(info, f, indent=1)
+            os.replace(work, final)
+        except BaseException as e:
+            shutil.rmtree(work, ignore_errors=True)
+            progress.finish(ok=False, archive=str(final), error=str(e) or type(e).__name__)
+            raise
+
+    progress.finish(ok=True, archive=str(final), linked=stats["linked"], copied=stats["copied"],
+                    bytes_copied=stats["bytes_copied"])
+    print(f"✅ Snapshot complete: {final}")
+    print(f"🔗 Linked: {stats['linked']} files, 📄 copied: {stats['copied']} files "
+          f"({stats['bytes_copied'] / (1024 ** 2):.1f} MB)")
+    return final
+
+
+def _drain(copies, progress, stats, keep=0) -> list:
+    """Wait for queued copies until at most `keep` remain; returns those."""
+    while len(copies) > keep:
+        future, rel = copies.pop(0)
+        try:
+            size = future.result()
+        except OSError as e:  # vanished or unreadable source: skip it like the zip backend
+            progress.note_skipped(rel, e)
+            continue
+        stats["copied"] += 1
+        stats["bytes_copied"] += size
+        progress.file_done(size, rel)
+    return copies
+
+
+def prune_link_snapshots(backup_dir, policy=None) -> int:
+    """
+    Delete the snapshots the retention policy (backup_retention) doesn't
+    keep. Returns the bytes actually freed: only files no remaining
+    snapshot links to.
+    """
+    root = snapshot_root(backup_dir)
+    if not root.is_dir():
+        return 0
+    policy = policy or RetentionPolicy.from_config()
+    freed = 0
+    with _locked(root):
+        snapshots = [(parse_day(p.name), p) for p in list_link_snapshots(root)]
+        keep = policy.select([(day, p.name, False) for day, p in snapshots if day])
+        for day, old in snapshots:
+            if day is None or old.name in keep:
+                continue
+            print(f"🗑️  Deleting old snapshot: {old.name}")
+            doomed = old.with_name(old.name + DELETING_SUFFIX)
+            os.replace(old, doomed)
+            for dirpath, _, filenames in os.walk(doomed):
+                for filename in filenames:
+                    st = os.lstat(os.path.join(dirpath, filename))
+                    if st.st_nlink == 1:
+                        freed += st.st_size
+            shutil.rmtree(doomed)
+        for leftover in root.glob(f"*{DELETING_SUFFIX}"):
+            shutil.rmtree(leftover, ignore_errors=True)
+    if freed:
+        print(f"🧹 Freed {freed / (1024 ** 2):.1f} MB")
+    return freed
@@ -0,0 +1,274 @@
+"""
+Split-volume output for BigSkyAg zip backups.
+
+With a maximum part size the archive is written as consecutive byte
+ranges — BigSkyAg_Backup_<date>.chunk_001, .chunk_002, ... — that
+concatenate back into one ordinary zip (`cat *.chunk_* > full.zip`). The
+zip is written as a stream (data descriptors, no seeking back), so each
+part is fsynced, renamed into place and handed to `on_part` the moment it
+is full: an upload can start on part 1 while part 5 is still being
+compressed. Once the archive is complete,
+BigSkyAg_Backup_<date>.parts.json lists every part with its size and
+SHA-256; a set without that manifest is incomplete, and one that fails
+verification is deleted.
+
+open_archive() reads a split set in place through its manifest, so
+restore, verify and the catalog work on parts without joining them.
+"""
+
+import bisect
+import hashlib
+import io
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from zipfile import ZipFile
+
+from backup_crypto import FRAME_SIZE, EncryptedArchiveReader, is_encrypted
+from backup_manifest import PARTS_SUFFIX, parts_manifest_name
+
+PART_GLOB = ".chunk_*"
+
+
+def part_name(archive_name: str, index: int) -> str:
+    return f"{Path(archive_name).stem}.chunk_{index:03d}"
+
+
+def parts_manifest_path(final_path) -> Path:
+    final_path = Path(final_path)
+    return final_path.with_name(parts_manifest_name(final_path.name))
+
+
+def load_parts(manifest_path) -> dict:
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def delete_split(manifest_path) -> None:
+    """Remove a split archive: its manifest first, so a half-deleted set reads as incomplete."""
+    manifest_path = Path(manifest_path)
+    parts = load_parts(manifest_path)["parts"]
+    manifest_path.unlink()
+    for part in parts:
+        (manifest_path.parent / part["name"]).unlink(missing_ok=True)
+
+
+def move_split(manifest_path, dest_dir) -> Path:
+    """Move a split archive to dest_dir: parts first, manifest last, so it arrives complete."""
+    manifest_path = Path(manifest_path)
+    dest_dir = Path(dest_dir)
+    for part in load_parts(manifest_path)["parts"]:
+        os.replace(manifest_path.parent / part["name"], dest_dir / part["name"])
+    target = dest_dir / manifest_path.name
+    os.replace(manifest_path, target)
+    return target
+
+
+def _discard_parts(final_path) -> None:
+    final_path = Path(final_path)
+    parts_manifest_path(final_path).unlink(missing_ok=True)
+    for stale in final_path.parent.glob(Path(final_path.name).stem + PART_GLOB):
+        stale.unlink()
+
+
+class SplitVolumeWriter:
+    """
+    Write-only, non-seekable file object that rolls over to a new part every
+    `part_size` bytes. on_part(path, index, size, sha256) fires as each part
+    is finalized.
+    """
+
+    def __init__(self, final_path, part_size: int, on_part=None):
+        self.final_path = Path(final_path)
+        self.part_size = int(part_size)
+        self.on_part = on_part
+        self.parts = []
+        self._offset = 0
+        self._fp = None
+        self._tmp = None
+        self._digest = None
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation("split volumes are written as a stream")
+
+    def tell(self) -> int:
+        return self._offset
+
+    def write(self, data) -> int:
+        view = memoryview(data)
+        while view:
+            if self._fp is None:
+                self._open_part()
+            n = min(len(view), self.part_size - self._size)
+            self._fp.write(view[:n])
+            self._digest.update(view[:n])
+            self._size += n
+            self._offset += n
+            view = view[n:]
+            if self._size == self.part_size:
+                self._finish_part()
+        return len(data)
+
+    def flush(self) -> None:
+        if self._fp is not None:
+            self._fp.flush()
+
+    def close(self) -> list:
+        """Finalize the last part and return the part list."""
+        if self._fp is not None or not self.parts:
+            if self._fp is None:
+                self._open_part()
+            self._finish_part()
+        return self.parts
+
+    def abandon(self) -> None:
+        """Drop the unfinished part; finished ones stay for the caller to clean up."""
+        if self._fp is not None:
+            self._fp.close()
+            self._tmp.unlink(missing_ok=True)
+            self._fp = None
+
+    def _open_part(self) -> None:
+        name = part_name(self.final_path.name, len(self.parts) + 1)
+        self._tmp = self.final_path.with_name(name + ".tmp")
+        self._fp = open(self._tmp, "wb")
+        self._digest = hashlib.sha256()
+        self._size = 0
+
+    def _finish_part(self) -> None:
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._fp.close()
+        self._fp = None
+        path = self._tmp.with_name(self._tmp.name[:-len(".tmp")])
+        os.replace(self._tmp, path)
+        part = {"name": path.name, "size": self._size, "sha256": self._digest.hexdigest()}
+        self.parts.append(part)
+        if self.on_part is not None:
+            self.on_part(path, len(self.parts), part["size"], part["sha256"])
+
+
+class SplitVolumeReader(io.RawIOBase):
+    """Seekable read-only view of a split set as one continuous file."""
+
+    def __init__(self, manifest_path):
+        manifest_path = Path(manifest_path)
+        self.paths = []
+        self.starts = []
+        total = 0
+        for part in load_parts(manifest_path)["parts"]:
+            self.paths.append(manifest_path.parent / part["name"])
+            self.starts.append(total)
+            total += part["size"]
+        self.size = total
+        self._pos = 0
+        self._index = None
+        self._fp = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        if self._pos >= self.size:
+            return 0
+        index = bisect.bisect_right(self.starts, self._pos) - 1
+        if index != self._index:
+            if self._fp is not None:
+                self._fp.close()
+            self._fp = open(self.paths[index], "rb")
+            self._index = index
+        self._fp.seek(self._pos - self.starts[index])
+        n = self._fp.readinto(buffer)
+        self._pos += n
+        return n
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        super().close()
+
+
+def open_archive(path) -> ZipFile:
+    """
+    Open a zip archive or, given a .parts.json manifest, its split set; an
+    encrypted archive (backup_crypto) is decrypted as it is read.
+    """
+    if str(path).endswith(PARTS_SUFFIX):
+        return ZipFile(io.BufferedReader(SplitVolumeReader(path), buffer_size=1024 * 1024))
+    if is_encrypted(path):
+        return ZipFile(io.BufferedReader(EncryptedArchiveReader(path), buffer_size=FRAME_SIZE))
+    return ZipFile(path)
+
+
+class SplitArchive:
+    """
+    Split-volume counterpart of backup_checkpoint.ResumableArchive: same
+    zipf / member_done / abort / commit interface, but never resumed, since
+    finished parts may already have been uploaded.
+    """
+
+    def __init__(self, final_path, part_size: int, on_part=None):
+        self.final_path = Path(final_path)
+        self.manifest_path = parts_manifest_path(final_path)
+        self.resumed = {}
+        _discard_parts(final_path)
+        self.writer = SplitVolumeWriter(final_path, part_size, on_part)
+        self.zipf = ZipFile(self.writer, "w")
+
+    def member_done(self, member) -> None:
+        pass
+
+    def drop(self, arcname: str) -> None:
+        raise RuntimeError("split archives are never resumed")
+
+    def abort(self) -> None:
+        self.zipf.fp = None  # Detach so ZipFile never writes a central directory
+        self.writer.abandon()
+
+    def size(self) -> int:
+        return sum(p["size"] for p in self.writer.parts)
+
+    def commit(self, verify=True) -> None:
+        """Write the central directory, finalize the last part, publish the manifest and verify."""
+        self.zipf.close()
+        parts = self.writer.close()
+        manifest = {
+            "archive": self.final_path.name,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "part_size": self.writer.part_size,
+            "total_size": self.size(),
+            "parts": parts,
+        }
+        tmp = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+        if not verify:
+            return
+        from verify_backup import save_result, verify_archive
+        result = verify_archive(self.manifest_path)
+        if not result["ok"]:
+            _discard_parts(self.final_path)
+            bad = result.get("error") or ", ".join(name for name, _ in result["bad"][:5])
+            raise ValueError(f"{self.final_path.name} failed verification: {bad}")
+        save_result(result)
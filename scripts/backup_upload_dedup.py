@@ -0,0 +1,304 @@
+"""
+Chunk-level deduplicating upload of BigSkyAg backups.
+
+Each archive is cut into chunks and only chunks the destination doesn't
+already hold are sent. Unchanged files compress to identical bytes in every
+nightly zip, so cuts are made where members start (using the central
+directory): a member that didn't change becomes the same chunks wherever it
+sits in the archive, and its data dedups against split archives, whose
+local headers differ. Members under MIN_CHUNK are grouped until a group
+reaches that size, and big ones are cut every MAX_CHUNK from their start.
+Anything that isn't a readable zip falls back to backup_chunkstore's
+content-defined chunking. The destination keeps:
+
+    chunks/<aa>/<sha256>            one object per unique chunk
+    chunks/index.json.gz            every chunk hash present, with its size
+    recipes/<archive>.json          chunk list that rebuilds one archive
+
+The index is fetched once per run, so deciding whether a chunk is needed
+costs a set lookup rather than a request. It is written back every minute
+during a long upload, so an interrupted run doesn't resend what it already
+finished. Uploading every archive in the backup folder and archive/
+shares one index, so chunks common to the active backup and older ones go
+up once. Split archives are chunked as the one zip their parts make up.
+
+Encrypted archives (.zip.enc) are not chunked: every frame is sealed
+under a per-archive key, so their bytes never repeat between nights and
+chunking them would only add a recipe and an index entry per MB. They
+are uploaded whole through BackupUploader.upload_file under their own
+name, which still skips an archive that is already there unchanged and
+resumes an interrupted one.
+
+    python backup_upload_dedup.py ~/PaulyOps/Backups ~/PaulyOps/Backups/archive
+    python backup_upload_dedup.py --fetch BigSkyAg_Backup_2025-06-03.zip --dest /tmp
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from zipfile import BadZipFile, ZipFile
+
+from backup_chunkstore import MAX_CHUNK, MIN_CHUNK, iter_chunks
+from backup_manifest import ENC_SUFFIX, PARTS_SUFFIX
+from backup_split import SplitVolumeReader, load_parts
+from storage_providers import UPLOAD_STATUS_PATH, BackupUploader
+
+CHUNK_PREFIX = "chunks/"
+RECIPE_PREFIX = "recipes/"
+INDEX_KEY = CHUNK_PREFIX + "index.json.gz"
+INDEX_SAVE_INTERVAL = 60
+ARCHIVE_GLOBS = ("BigSkyAg_Backup_*.zip", "BigSkyAg_Backup_*" + PARTS_SUFFIX)
+ENCRYPTED_GLOB = "BigSkyAg_Backup_*.zip" + ENC_SUFFIX
+
+
+def chunk_key(digest: str) -> str:
+    return f"{CHUNK_PREFIX}{digest[:2]}/{digest}"
+
+
+def recipe_key(archive_name: str) -> str:
+    return f"{RECIPE_PREFIX}{archive_name}.json"
+
+
+def _put_json(provider, key: str, obj, compress=False) -> None:
+    data = json.dumps(obj, indent=None if compress else 1).encode("utf-8")
+    if compress:
+        data = gzip.compress(data, 6)
+    provider.put_object(key, data, hashlib.sha256(data).hexdigest())
+
+
+def _zip_cuts(stream) -> list:
+    """
+    Offsets where each member's local header and data start and end, and
+    where the central directory starts; None if the stream isn't a zip.
+    Cutting around the data keeps a member's bytes identical whether or not
+    its header carries a data descriptor (split archives are streamed).
+    """
+    try:
+        zipf = ZipFile(stream)
+        cuts = {0, zipf.start_dir}
+        for zinfo in zipf.infolist():
+            stream.seek(zinfo.header_offset)
+            header = stream.read(30)
+            if len(header) < 30 or header[:4] != b"PK\x03\x04":
+                return None
+            data_start = (zinfo.header_offset + 30 + int.from_bytes(header[26:28], "little")
+                          + int.from_bytes(header[28:30], "little"))
+            cuts.update((zinfo.header_offset, data_start, data_start + zinfo.compress_size))
+    except BadZipFile:
+        return None
+    stream.seek(0)
+    return sorted(cuts)
+
+
+def iter_archive_chunks(stream, size: int):
+    """Yield the chunks of an archive, cut at member boundaries (see module docstring)."""
+    cuts = _zip_cuts(stream)
+    if cuts is None:
+        stream.seek(0)
+        yield from iter_chunks(stream)
+        return
+    pending = bytearray()
+    for start, end in zip(cuts, cuts[1:] + [size]):
+        if end - start < MIN_CHUNK:
+            pending += stream.read(end - start)
+            if len(pending) >= MIN_CHUNK:
+                yield bytes(pending)
+                pending.clear()
+            continue
+        if pending:
+            yield bytes(pending)
+            pending.clear()
+        for offset in range(start, end, MAX_CHUNK):
+            yield stream.read(min(MAX_CHUNK, end - offset))
+    if pending:
+        yield bytes(pending)
+
+
+class RemoteChunkIndex:
+    """The destination's set of stored chunk hashes."""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.chunks = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        data = provider.get_object(INDEX_KEY)
+        if data is not None:
+            self.chunks = json.loads(gzip.decompress(data))["chunks"]
+        elif any(True for _ in provider.list_objects(CHUNK_PREFIX)):
+            self.rescan()
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.chunks
+
+    def add(self, digest: str, size: int) -> None:
+        with self._lock:
+            self.chunks[digest] = size
+            self._dirty = True
+
+    def rescan(self) -> int:
+        """Rebuild the index from the chunk objects actually present."""
+        found = {}
+        for key in self.provider.list_objects(CHUNK_PREFIX):
+            name = key.rsplit("/", 1)[-1]
+            if key != INDEX_KEY and len(name) == 64:
+                data = self.provider.get_object(key)
+                if data is not None and hashlib.sha256(data).hexdigest() == name:
+                    found[name] = len(data)
+        with self._lock:
+            self.chunks = found
+            self._dirty = True
+        return len(found)
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self.chunks)
+            self._dirty = False
+        _put_json(self.provider, INDEX_KEY, {"updated": datetime.now().isoformat(timespec="seconds"),
+                                            "chunks": snapshot}, compress=True)
+
+
+class DedupUploader(BackupUploader):
+    """BackupUploader that sends archives as deduplicated chunks plus a recipe."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = RemoteChunkIndex(self.provider)
+        self.stats.update({"archives": 0, "chunks_sent": 0, "chunks_deduped": 0, "bytes_deduped": 0})
+        self._inflight = threading.BoundedSemaphore(self.workers * 2)
+
+    def _send_chunk(self, digest: str, data: bytes) -> None:
+        try:
+            self._retry(f"Chunk {digest[:12]}", self.provider.put_object, chunk_key(digest), data, digest)
+            self.index.add(digest, len(data))
+            self._count(chunks_sent=1, bytes=len(data))
+        finally:
+            self._inflight.release()
+
+    def upload_chunked(self, path) -> dict:
+        """Upload one archive's missing chunks and its recipe; skip it if already uploaded."""
+        path = Path(path)
+        st = path.stat()
+        source = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        name = load_parts(path)["archive"] if path.name.endswith(PARTS_SUFFIX) else path.name
+        existing = self.provider.get_object(recipe_key(name))
+        if existing is not None and json.loads(existing).get("source") == source:
+            self._count(skipped_files=1)
+            return json.loads(existing)
+
+        recipe, futures, queued = [], [], set()
+        whole = hashlib.sha256()
+        last_save = time.time()
+        if path.name.endswith(PARTS_SUFFIX):
+            reader = SplitVolumeReader(path)
+            size, stream = reader.size, io.BufferedReader(reader, buffer_size=1024 * 1024)
+        else:
+            size, stream = st.st_size, open(path, "rb")
+        try:
+            for data in iter_archive_chunks(stream, size):
+                digest = hashlib.sha256(data).hexdigest()
+                whole.update(data)
+                recipe.append([digest, len(data)])
+                if digest in self.index or digest in queued:
+                    self._count(chunks_deduped=1, bytes_deduped=len(data))
+                    continue
+                queued.add(digest)
+                self._inflight.acquire()  # bounds chunk data held in memory
+                futures.append(self._parts.submit(self._send_chunk, digest, data))
+                if time.time() - last_save > INDEX_SAVE_INTERVAL:
+                    self.index.save()
+                    last_save = time.time()
+        finally:
+            stream.close()
+            for future in futures:
+                future.exception()  # wait for every send before deciding anything
+            self.index.save()
+        for future in futures:
+            future.result()
+
+        if path.stat().st_mtime_ns != st.st_mtime_ns:
+            raise IOError(f"{path.name} changed during upload")
+        result = {"archive": name, "source": source, "size": sum(size for _, size in recipe),
+                  "sha256": whole.hexdigest(), "chunks": recipe,
+                  "uploaded": datetime.now().isoformat(timespec="seconds")}
+        _put_json(self.provider, recipe_key(name), result)
+        self._count(archives=1, files=1)
+        return result
+
+    def upload_all(self, dirs, status_path=UPLOAD_STATUS_PATH) -> dict:
+        """
+        Upload every archive in dirs (oldest first) that the destination
+        doesn't have yet: plain ones as chunks, encrypted ones whole.
+        """
+        archives = sorted((a for d in dirs if Path(d).is_dir()
+                           for pattern in ARCHIVE_GLOBS + (ENCRYPTED_GLOB,) for a in Path(d).glob(pattern)),
+                          key=lambda a: a.stat().st_mtime)
+        label = archives[-1].name if archives else "nothing to upload"
+        try:
+            for archive in archives:
+                if archive.name.endswith(ENC_SUFFIX):
+                    self.upload_file(archive)
+                else:
+                    self.upload_chunked(archive)
+        except Exception as e:
+            return self._finish(label, status_path, error=f"{type(e).__name__}: {e}")
+        return self._finish(label, status_path)
+
+
+def fetch_archive(provider, archive_name: str, dest) -> Path:
+    """Rebuild an uploaded archive from its recipe into dest, checking every hash."""
+    data = provider.get_object(recipe_key(archive_name))
+    if data is None:
+        raise FileNotFoundError(f"No recipe for {archive_name}")
+    recipe = json.loads(data)
+    target = Path(dest) / archive_name
+    tmp = target.with_name(target.name + ".fetching")
+    whole = hashlib.sha256()
+    with open(tmp, "wb") as out:
+        for digest, size in recipe["chunks"]:
+            chunk = provider.get_object(chunk_key(digest))
+            if chunk is None or len(chunk) != size or hashlib.sha256(chunk).hexdigest() != digest:
+                tmp.unlink(missing_ok=True)
+                raise ValueError(f"Chunk {digest[:12]} of {archive_name} is missing or corrupt")
+            whole.update(chunk)
+            out.write(chunk)
+    if whole.hexdigest() != recipe["sha256"]:
+        tmp.unlink(missing_ok=True)
+        raise ValueError(f"{archive_name} rebuilt with the wrong SHA-256")
+    tmp.replace(target)
+    return target
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from storage_providers import describe_upload, get_provider
+
+    parser = argparse.ArgumentParser(description="Deduplicating chunk upload of BigSkyAg backups")
+    parser.add_argument("dirs", nargs="*", help="Backup folders to upload (e.g. Backups and Backups/archive)")
+    parser.add_argument("--provider", default=None, help="Override STORAGE_PROVIDER")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rescan", action="store_true",
+                        help="Rebuild the remote chunk index from the stored chunks first")
+    parser.add_argument("--fetch", metavar="ARCHIVE", help="Rebuild an uploaded archive instead")
+    parser.add_argument("--dest", default=".", help="Folder for --fetch")
+    args = parser.parse_args()
+
+    provider = get_provider(args.provider)
+    if args.fetch:
+        print(f"✅ Rebuilt {fetch_archive(provider, args.fetch, args.dest)}")
+        sys.exit(0)
+    with DedupUploader(provider, workers=args.workers) as uploader:
+        if args.rescan:
+            print(f"🔎 Remote holds {uploader.index.rescan():,} chunks")
+        status = uploader.upload_all(args.dirs)
+    print(f"{'✅' if status['state'] == 'done' else '❌'} {describe_upload(status)}")
+    sys.exit(0 if status["state"] == "done" else 1)
@@ -0,0 +1,293 @@
+"""
+os.scandir-based tree walker shared by the backup engines.
+
+Every file is yielded once with the stat result taken from its DirEntry,
+so callers (zip writer, manifest, chunk store) never stat it again.
+Directories are tracked by (st_dev, st_ino): following symlinks can no
+longer loop forever or archive the same folder twice. Exclusion rules and
+per-directory .backupignore files from backup_exclude are applied while
+walking, so excluded subtrees are never listed. Entries come out sorted by
+name, which keeps archives deterministic.
+
+With parallel=True the top-level folders (00_Admin, DropZone, ...) are
+walked concurrently on a thread pool. Each worker streams its listings
+through a small bounded queue and the caller replays them in name order,
+deciding which of two paths to the same directory is walked exactly as
+the serial walk would, so the output doesn't depend on thread timing.
+"""
+
+import os
+import queue
+import stat
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from backup_exclude import IGNORE_FILE, ExclusionMatcher, load_ignore_file
+
+FileEntry = namedtuple("FileEntry", "path rel stat")
+
+QUEUE_EVENTS = 64      # Listings a parallel worker may run ahead of the caller
+_DONE = object()
+
+
+class _Visited:
+    """(dev, inode) pairs of directories already walked, shared across threads."""
+
+    def __init__(self):
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def add(self, st) -> bool:
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            return True
+
+
+def _list_dir(dirpath, rel, m, follow_symlinks, on_excluded, on_error=None):
+    """
+    List one directory. Returns (matcher, files, subdirs) where matcher
+    includes the directory's own .backupignore rules. Entries that can't
+    be read are reported to on_error(rel) ('' for the root itself).
+    """
+    try:
+        with os.scandir(dirpath) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError as e:
+        print(f"⚠️ Skipped: {dirpath} → {e}")
+        if on_error:
+            on_error(rel.rstrip("/"))
+        return m, [], []
+
+    if any(e.name == IGNORE_FILE for e in entries):
+        m = m.child(rel.rstrip("/"), load_ignore_file(os.path.join(dirpath, IGNORE_FILE)))
+
+    files, subdirs = [], []
+    for entry in entries:
+        rel_path = rel + entry.name
+        try:
+            is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+            if m.excluded(rel_path, is_dir=is_dir):
+                if on_excluded:
+                    on_excluded(rel_path + "/" if is_dir else rel_path)
+                continue
+            st = entry.stat(follow_symlinks=follow_symlinks)
+        except OSError as e:
+            print(f"⚠️ Skipped: {entry.path} → {e}")
+            if on_error:
+                on_error(rel_path)
+            continue
+        if is_dir:
+            subdirs.append(FileEntry(entry.path, rel_path, st))
+        elif entry.is_file(follow_symlinks=follow_symlinks):
+            files.append(FileEntry(entry.path, rel_path, st))
+    return m, files, subdirs
+
+
+def _claim(visited, subdirs) -> list:
+    """The subdirectories not walked yet, marking them as walked."""
+    claimed = []
+    for d in subdirs:
+        if visited.add(d.stat):
+            claimed.append(d)
+        else:
+            print(f"🔁 Skipping already-walked directory (symlink loop?): {d.rel}")
+    return claimed
+
+
+def _iter_dir(path, rel, matcher, follow_symlinks, visited, on_excluded, on_error=None):
+    """Depth-first walk below one directory, yielding files in name order."""
+    stack = [(path, rel, matcher)]
+    while stack:
+        dirpath, rel_dir, m = stack.pop()
+        m, files, subdirs = _list_dir(dirpath, rel_dir, m, follow_symlinks, on_excluded, on_error)
+        yield from files
+        # Reverse so the stack pops subdirectories in name order
+        stack.extend((d.path, d.rel + "/", m) for d in reversed(_claim(visited, subdirs)))
+
+
+def _walk_events(top, matcher, follow_symlinks, seen, on_excluded, on_error):
+    """
+    Worker side of the parallel scan: walk one top-level folder depth-first
+    with its own visited set (seeded with `seen`) and yield
+    ("list", rel_dir, files, subdirs, fresh) for every directory listed,
+    fresh being the subdirectories this walk enters. Where it would have
+    entered one it had already seen, it yields ("enter", subdir, matcher)
+    instead, as that copy may be the first the serial walk gets to.
+    """
+    visited = _Visited()
+    for st in seen:
+        visited.add(st)
+    stack = [("walk", top.path, top.rel + "/", matcher)]
+    while stack:
+        kind, *item = stack.pop()
+        if kind == "enter":
+            yield ("enter", *item)
+            continue
+        dirpath, rel_dir, m = item
+        m, files, subdirs = _list_dir(dirpath, rel_dir, m, follow_symlinks, on_excluded, on_error)
+        fresh = {d.rel for d in subdirs if visited.add(d.stat)}
+        yield "list", rel_dir, files, subdirs, fresh
+        stack.extend(("walk", d.path, d.rel + "/", m) if d.rel in fresh else ("enter", d, m)
+                     for d in reversed(subdirs))
+
+
+def _produce(events, out, stop) -> None:
+    """Run a worker's walk into its queue until it ends or the caller stops listening."""
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    try:
+        for event in events:
+            if not put(event):
+                return
+    except Exception as e:
+        put(e)
+        return
+    put(_DONE)
+
+
+def _consume(out):
+    while True:
+        event = out.get()
+        if event is _DONE:
+            return
+        if isinstance(event, Exception):
+            raise event
+        yield event
+
+
+def _replay(events, visited, follow_symlinks, on_excluded, on_error):
+    """
+    Caller side of the parallel scan: yield a worker's files as the serial
+    walk would, claiming directories in the same order against the shared
+    visited set. Subtrees the serial walk wouldn't enter are dropped; the
+    rare directory the worker skipped but the serial walk enters is
+    walked here.
+    """
+    pruned, walk_here = set(), set()
+    for kind, *event in events:
+        if kind == "enter":
+            d, m = event
+            if d.rel in walk_here:
+                yield from _iter_dir(d.path, d.rel + "/", m, follow_symlinks, visited,
+                                     on_excluded, on_error)
+            continue
+        rel_dir, files, subdirs, fresh = event
+        if any(rel_dir[:i + 1] in pruned for i, c in enumerate(rel_dir) if c == "/"):
+            continue
+        yield from files
+        claimed = {d.rel for d in _claim(visited, subdirs)}
+        for d in subdirs:
+            if d.rel not in claimed and d.rel in fresh:
+                pruned.add(d.rel + "/")
+            elif d.rel in claimed and d.rel not in fresh:
+                walk_here.add(d.rel)
+
+
+def scan_tree(root, matcher=None, follow_symlinks=True, on_excluded=None,
+              parallel=False, workers=None, on_error=None):
+    """
+    Yield FileEntry(path, rel, stat) for every included file under root.
+
+    rel uses '/' separators. Sockets, FIFOs and broken links are skipped;
+    files and folders that can't be read are passed to on_error(rel), so
+    a caller can tell "unreadable" from "deleted".
+    In parallel mode each top-level folder is walked by its own worker;
+    output is the same as the serial walk's, in the same order.
+    """
+    root = os.fspath(root)
+    visited = _Visited()
+    root_st = os.stat(root)
+    visited.add(root_st)
+    m, files, subdirs = _list_dir(root, "", matcher or ExclusionMatcher(), follow_symlinks,
+                                  on_excluded, on_error)
+    yield from files
+    subdirs = _claim(visited, subdirs)
+
+    if not parallel:
+        for d in subdirs:
+            yield from _iter_dir(d.path, d.rel + "/", m, follow_symlinks, visited, on_excluded, on_error)
+        return
+
+    # Workers skip the root and every top-level folder locally; the replay sorts out the rest
+    seen = [root_st] + [d.stat for d in subdirs]
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1))
+    try:
+        queues = []
+        for d in subdirs:
+            out = queue.Queue(maxsize=QUEUE_EVENTS)
+            pool.submit(_produce, _walk_events(d, m, follow_symlinks, seen, on_excluded, on_error),
+                        out, stop)
+            queues.append(out)
+        for out in queues:
+            yield from _replay(_consume(out), visited, follow_symlinks, on_excluded, on_error)
+    finally:
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def scan_paths(root, paths, matcher=None, follow_symlinks=True, on_excluded=None, on_error=None):
+    """
+    Yield FileEntry for the included files among `paths` (relative to root),
+    walking the ones that are directories; a trailing '/' marks a directory
+    but isn't required. Exclusions, including .backupignore files in any
+    ancestor, apply as they would in scan_tree. Paths that no longer exist
+    yield nothing. Used with a change journal to skip the full walk.
+    """
+    root = os.fspath(root)
+    visited = _Visited()
+    matchers = {"": matcher or ExclusionMatcher()}
+    seen_dirs = set()
+
+    def dir_matcher(rel_dir):
+        """Matcher in effect inside rel_dir, or None if rel_dir is excluded."""
+        if rel_dir in matchers:
+            return matchers[rel_dir]
+        parent, _, _ = rel_dir.rpartition("/")
+        m = dir_matcher(parent)
+        if m is not None:
+            if m.excluded(rel_dir, is_dir=True):
+                m = None
+            else:
+                ignore = os.path.join(root, rel_dir, IGNORE_FILE)
+                if os.path.isfile(ignore):
+                    m = m.child(rel_dir, load_ignore_file(ignore))
+        matchers[rel_dir] = m
+        return m
+
+    for rel in sorted({p.strip("/") for p in paths} - {""}):
+        if any(rel.startswith(d) for d in seen_dirs):
+            continue  # Already walked with an enclosing directory
+        m = dir_matcher(rel.rpartition("/")[0])
+        path = os.path.join(root, rel)
+        try:
+            st = os.stat(path) if follow_symlinks else os.lstat(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"⚠️ Skipped: {path} → {e}")
+            if on_error:
+                on_error(rel)
+            continue
+        is_dir = stat.S_ISDIR(st.st_mode)
+        if m is None or m.excluded(rel, is_dir=is_dir):
+            if m is not None and on_excluded:
+                on_excluded(rel + "/" if is_dir else rel)
+            continue
+        if is_dir:
+            seen_dirs.add(rel + "/")
+            if visited.add(st):
+                yield from _iter_dir(path, rel + "/", m, follow_symlinks, visited, on_excluded, on_error)
+        elif stat.S_ISREG(st.st_mode):
+            yield FileEntry(path, rel, st)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Startup cost of load_config() in a fresh process, with and without the
+config snapshot (config/.config_snapshot.json).
+
+Each run starts a new interpreter that imports config.loader, calls
+load_config() once and reports its wall time and whether yaml/tomllib
+got imported. "parse" runs delete the snapshot first, as after a config
+change; "snapshot" runs reuse it, as every launchd job after that does.
+
+By default this runs against a throwaway project holding a copy of
+config/loader.py and a generated config/app.yaml (PyYAML needed for the
+parse runs); --project benchmarks a real checkout instead, and leaves
+its snapshot in place.
+
+    python bench_config_startup.py
+    python bench_config_startup.py --runs 30 --project ~/PaulyOps/agentops-core
+"""
+
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from config.loader import load_config
+cfg = load_config()
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({"ms": ms, "keys": len(cfg),
+                  "yaml": "yaml" in sys.modules, "tomllib": "tomllib" in sys.modules}))
+"""
+
+
+def make_project(where: Path) -> Path:
+    """A minimal project: .projectroot, the current loader, a mid-sized app.yaml."""
+    (where / "config").mkdir(parents=True)
+    (where / ".projectroot").touch()
+    shutil.copy2(REPO_ROOT / "config" / "loader.py", where / "config" / "loader.py")
+    (where / "config" / "__init__.py").touch()
+    lines = ["backup:", "  retention: {active: 1, daily: 7, weekly: 4, monthly: 6}",
+             "  codecs:", "    default: deflate", "    extensions:"]
+    lines += [f"      .ext{i}: {'store' if i % 3 else 'lzma'}" for i in range(200)]
+    lines += ["providers:"]
+    for i in range(40):
+        lines += [f"  provider_{i}:", f"    bucket: bucket-{i}", "    region: us-west-2",
+                  "    part_size_mb: 16", "    workers: 4", f"    prefix: backups/{i}/"]
+    (where / "config" / "app.yaml").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return where
+
+
+def run_once(project: Path) -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=project,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench(project: Path, runs: int, keep_snapshot: bool) -> list:
+    snapshot = project / "config" / ".config_snapshot.json"
+    results = []
+    for _ in range(runs):
+        if not keep_snapshot:
+            snapshot.unlink(missing_ok=True)
+        results.append(run_once(project))
+    return results
+
+
+def report(label: str, results: list) -> float:
+    times = [r["ms"] for r in results]
+    imported = [name for name in ("yaml", "tomllib") if any(r[name] for r in results)]
+    median = statistics.median(times)
+    print(f"  {label:<9} median {median:7.2f} ms   min {min(times):7.2f} ms   "
+          f"imports: {', '.join(imported) or 'none'}")
+    return median
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark config startup with and without the snapshot")
+    parser.add_argument("--runs", type=int, default=15, help="Processes per mode (default 15)")
+    parser.add_argument("--project", type=Path, default=None, help="Benchmark this project instead of a generated one")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.project:
+        project = args.project.expanduser().resolve()
+    else:
+        tmp = tempfile.mkdtemp(prefix="bench_config_")
+        project = make_project(Path(tmp))
+    try:
+        print(f"⏱️  load_config() in a fresh process, {args.runs} runs each ({project})")
+        parsed = report("parse", bench(project, args.runs, keep_snapshot=False))
+        run_once(project)  # Write the snapshot
+        cached = report("snapshot", bench(project, args.runs, keep_snapshot=True))
+        print(f"  ✅ snapshot is {parsed / cached:.1f}x faster ({parsed - cached:.1f} ms saved per start)")
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,89 +1,382 @@
 import sys
 from pathlib import Path
 import os
-from zipfile import ZipFile
+import json
 from datetime import datetime
 
-# Allow imports from Coding_Commands folder
-sys.path.append(str(Path.home() / "Desktop" / "Coding_Commands"))
-
+sys.path.insert(0, str(Path(__file__).resolve().parent))
 from bigsky_path_utils import (
     find_bigsky_root,
     get_bigsky_subfolder,
     safe_print_bigsky_path,
     backup_script
 )
+from backup_manifest import (
+    DUPLICATES_NAME,
+    META_PREFIX,
+    entry_unchanged,
+    file_sha256,
+    incremental_name,
+    load_manifest,
+    needs_full_backup,
+    record_archive,
+    save_manifest,
+)
+from backup_pipeline import DEFAULT_INFLIGHT, ParallelZipWriter
+from backup_checkpoint import ResumableArchive, adopt_partial, discard_partial, partial_path
+from backup_crypto import EncryptedArchive, EncryptionSettings, encrypted_path
+from backup_split import SplitArchive, parts_manifest_path
+from backup_snapshot import prune_link_snapshots, take_snapshot
+from backup_retention import ARCHIVE_SUBDIR, enforce_retention
+from backup_progress import BackupProgress
+from backup_codecs import CodecPolicy
+from backup_dedup import DuplicateFinder
+from backup_exclude import ExclusionMatcher
+from backup_walk import scan_paths, scan_tree
+from backup_journal import changes_since, covered_by, load_cursor, release_segments, save_cursor, take_cursor
+from backup_catalog import update_catalog
+from backup_chunkstore import (
+    ChunkStore,
+    list_snapshots,
+    load_snapshot,
+    prune_snapshots,
+    save_snapshot,
+    snapshot_folder,
+)
+
+_DEFAULT_MATCHER = ExclusionMatcher()
 
 def should_exclude_file(file_path, folder_path):
-    """Check if file should be excluded from backup."""
-    rel_path = os.path.relpath(file_path, folder_path)
-    
-    # Exclude backup folders and files
-    exclude_patterns = [
-        "00_Admin/Backups/",  # Don't backup the backup folder
-        "00_Admin/Backups/*.zip",  # Don't backup zip files
-        "00_Admin/Backups/*.chunk_*",  # Don't backup chunk files
-        ".git/",  # Don't backup git folder (can be large)
-        ".DS_Store",  # macOS system files
-        "Thumbs.db",  # Windows system files
-        "*.tmp",  # Temporary files
-        "*.temp",  # Temporary files
-        "*.log",  # Log files (optional)
-        "__pycache__/",  # Python cache
-        "*.pyc",  # Python compiled files
-        "node_modules/",  # Node.js modules
-        ".Trash/",  # Trash folder
-        "~",  # Backup files
-    ]
-    
-    for pattern in exclude_patterns:
-        if pattern.endswith("/") and rel_path.startswith(pattern):
-            return True
-        elif pattern.startswith("*") and rel_path.endswith(pattern[1:]):
-            return True
-        elif rel_path == pattern:
-            return True
-        elif pattern in rel_path:
-            return True
-    
-    return False
-
-def zip_folder_verbose(folder_path, output_zip_path):
-    with ZipFile(output_zip_path, 'w') as zipf:
-        for foldername, subfolders, filenames in os.walk(folder_path, followlinks=True):
-            for filename in filenames:
-                file_path = os.path.join(foldername, filename)
-
-                # Check if file should be excluded
-                if should_exclude_file(file_path, folder_path):
-                    print(f"🚫 Excluded: {os.path.relpath(file_path, folder_path)}")
-                    continue
+    """Check if file should be excluded from backup (see backup_exclude.DEFAULT_EXCLUDES)."""
+    rel_path = os.path.relpath(file_path, folder_path).replace(os.sep, "/")
+    return _DEFAULT_MATCHER.excluded(rel_path)
+
+def zip_folder_verbose(folder_path, output_zip_path, previous=None, parent=None,
+                       workers=None, inflight_bytes=DEFAULT_INFLIGHT, policy=None,
+                       matcher=None, parallel_walk=False, progress=None, verbose=False,
+                       resume=True, split_size=None, on_part=None, changes=None, dedup=True,
+                       encryption=None):
+    """
+    Archive folder_path into output_zip_path and return the new file manifest.
+
+    With `previous` (the manifest files of the last run) only new or changed
+    files are archived; paths that disappeared are listed as tombstones in
+    __backup__/chain.json so a restore can replay the chain. Paths that were
+    skipped because they couldn't be read keep their previous entry (and
+    the copy in the older archive) rather than becoming tombstones. Members are
+    compressed on `workers` threads with at most `inflight_bytes` buffered,
+    using the codec `policy` picks per file type. The tree is walked once
+    with backup_walk.scan_tree (optionally fanning out across top-level
+    folders); excluded directories are pruned without being walked.
+
+    Progress goes through `progress` (a BackupProgress) as rate-limited
+    updates and a status file; per-file lines only appear with `verbose`.
 
+    The archive is built as <output>.partial with periodic checkpoints (see
+    backup_checkpoint). With `resume`, an interrupted run for the same
+    source and parent is picked up where its last checkpoint left off.
+
+    With `split_size` the archive is streamed into parts of at most that
+    many bytes instead (see backup_split); on_part(path, index, size,
+    sha256) is called as each part is finalized. Split runs start over.
+
+    With `changes` (paths changed since `previous` was taken, from
+    backup_journal) only those paths are looked at; every other entry of
+    `previous` is carried over without a walk or a stat.
+
+    With `dedup`, a file identical to one already in this archive is stored
+    once and listed in __backup__/duplicates.json (see backup_dedup).
+
+    With `encryption` (settings, key) the archive is encrypted as it is
+    written, to <output>.enc (see backup_crypto). Encrypted runs start over.
+    """
+    previous = previous or {}
+    policy = policy or CodecPolicy.from_config()
+    progress = progress or BackupProgress(os.path.basename(output_zip_path), verbose=verbose)
+    kind = "incremental" if previous else "full"
+    meta = {"source": os.path.abspath(folder_path), "kind": kind, "parent": parent}
+    if split_size and encryption:
+        raise ValueError("Split archives can't be encrypted; choose one of --split-mb and --encrypt")
+    if split_size:
+        archive = SplitArchive(output_zip_path, split_size, on_part)
+    elif encryption:
+        settings, key = encryption
+        archive = EncryptedArchive(output_zip_path, key, settings)
+    else:
+        if resume:
+            adopt_partial(os.path.dirname(os.path.abspath(output_zip_path)), output_zip_path, meta)
+        else:
+            discard_partial(partial_path(output_zip_path))
+        archive = ResumableArchive(output_zip_path, meta)
+    resumed = archive.resumed
+    if resumed:
+        print(f"⏯️  Resuming from checkpoint: {len(resumed)} files already archived")
+    files = {}
+    added = []
+    duplicates = []
+    unreadable = set()  # rel paths of files and folders that were skipped on error
+    finder = DuplicateFinder() if dedup else None
+    try:
+        with ParallelZipWriter(archive.zipf, workers=workers, inflight_bytes=inflight_bytes,
+                               progress=progress, on_member=archive.member_done) as writer:
+            progress.set_phase("archiving")
+            if changes is not None and previous:
+                for arcname, prev in previous.items():
+                    if arcname not in resumed and not covered_by(changes, arcname):
+                        files[arcname] = prev
+                        progress.file_seen(prev[0])
+                        progress.unchanged += 1
+                walk = scan_paths(folder_path, set(changes) | set(resumed), matcher=matcher,
+                                  follow_symlinks=True, on_excluded=progress.note_excluded,
+                                  on_error=unreadable.add)
+            else:
+                walk = scan_tree(folder_path, matcher=matcher, follow_symlinks=True,
+                                 on_excluded=progress.note_excluded, parallel=parallel_walk,
+                                 on_error=unreadable.add)
+            for file_path, arcname, st in progress.timed_iter(walk, "walk"):
+                progress.file_seen(st.st_size)
                 try:
-                    arcname = os.path.relpath(file_path, folder_path)
-                    print(f"📦 Adding: {arcname}")
-                    zipf.write(file_path, arcname)
+                    done = resumed.get(arcname)
+                    if done is not None:
+                        if entry_unchanged(done, st):
+                            files[arcname] = done
+                            if finder:
+                                finder.add_known(arcname, done[0], done[2])
+                            continue
+                        archive.drop(arcname)  # Changed since the checkpoint
+                    prev = previous.get(arcname)
+                    if entry_unchanged(prev, st):
+                        files[arcname] = prev
+                        progress.unchanged += 1
+                        continue
+                    if prev and prev[0] == st.st_size and file_sha256(file_path) == prev[2]:
+                        # Touched but identical content: refresh mtime, don't re-archive
+                        files[arcname] = [st.st_size, st.st_mtime_ns, prev[2]]
+                        progress.unchanged += 1
+                        continue
+                    if finder:
+                        source, sha256 = finder.check(file_path, arcname, st.st_size)
+                        if source is not None:
+                            duplicates.append((arcname, file_path, st, sha256))
+                            continue
+                    compress_type, level = policy.choose(file_path, st.st_size)
+                    member = writer.add(file_path, arcname, st, compress_type=compress_type,
+                                        compresslevel=level)
+                    added.append((arcname, st, member))
                 except Exception as e:
-                    print(f"⚠️ Skipped: {file_path} → {e}")
-    print(f"✅ Backup complete: {output_zip_path}")
-    size = os.path.getsize(output_zip_path) / (1024 ** 3)
-    print(f"📏 Total size: {size:.2f} GB")
+                    progress.note_skipped(file_path, e)
+                    unreadable.add(arcname)
 
-def prune_old_backups(folder: Path, keep: int = 2):
-    backups = sorted(folder.glob("BigSkyAg_Backup_*.zip"), key=lambda f: f.stat().st_mtime, reverse=True)
-    for old_backup in backups[keep:]:
-        print(f"🗑️  Deleting old backup: {old_backup.name}")
-        old_backup.unlink()
+            progress.set_phase("finishing")
+            writer.close()
+            for arcname, st, member in added:
+                if member.error is not None:
+                    progress.note_skipped(member.path, member.error)
+                    unreadable.add(arcname)
+                    continue
+                files[arcname] = [st.st_size, st.st_mtime_ns, member.sha256]
+            for arcname, file_path, st, sha256 in duplicates:
+                source = files.get(finder.duplicates[arcname])
+                if source is not None and source[2] == sha256:
+                    files[arcname] = [st.st_size, st.st_mtime_ns, sha256]
+                    continue
+                # The source failed or changed after it was hashed: store this copy after all
+                finder.discard(arcname, st.st_size)
+                try:
+                    compress_type, level = policy.choose(file_path, st.st_size)
+                    archive.zipf.write(file_path, arcname, compress_type, level)
+                    files[arcname] = [st.st_size, st.st_mtime_ns, file_sha256(file_path)]
+                except Exception as e:
+                    progress.note_skipped(file_path, e)
+                    unreadable.add(arcname)
+            for arcname in set(resumed) - set(files):
+                archive.drop(arcname)  # Deleted since the checkpoint
+
+            for arcname in set(previous) - set(files):
+                if _under_any(arcname, unreadable):
+                    files[arcname] = previous[arcname]  # Still restorable from the older archive
+            tombstones = sorted(set(previous) - set(files))
+            archive.zipf.writestr(META_PREFIX + "chain.json", json.dumps({
+                "kind": kind,
+                "parent": parent,
+                "tombstones": tombstones,
+            }, indent=1))
+            if finder and finder.duplicates:
+                archive.zipf.writestr(DUPLICATES_NAME, json.dumps(finder.duplicates, indent=1))
+        progress.set_phase("verifying")
+    except BaseException as e:
+        archive.abort()
+        progress.finish(ok=False, archive=str(output_zip_path), error=str(e) or type(e).__name__)
+        raise
+
+    try:
+        archive.commit()
+    except Exception as e:
+        progress.finish(ok=False, archive=str(output_zip_path), error=str(e))
+        raise
+
+    archive_bytes = archive.size()
+    progress.finish(ok=True, archive=str(output_zip_path), archive_bytes=archive_bytes,
+                    deleted=len(tombstones), resumed=len(resumed),
+                    ratio=round(archive_bytes / progress.bytes, 3) if progress.bytes else None)
+    print(f"✅ Backup complete: {encrypted_path(output_zip_path) if encryption else output_zip_path}")
+    if previous:
+        print(f"♻️  Unchanged: {progress.unchanged} files, 🪦 deleted: {len(tombstones)} files")
+    if finder and finder.duplicates:
+        print(f"🧬 Duplicates: {len(finder.duplicates)} files "
+              f"({finder.bytes_saved / (1024 ** 2):.1f} MB) stored once")
+    print(f"📏 Total size: {archive_bytes / (1024 ** 3):.2f} GB")
+    return files
+
+def _under_any(arcname, rels) -> bool:
+    """True if arcname is one of rels or inside one of them ('' is the whole tree)."""
+    return any(not rel or arcname == rel or arcname.startswith(rel + "/") for rel in rels)
+
+def run_chunked_backup(source, backup_dir, today):
+    """Snapshot source into the deduplicating chunk store under backup_dir/chunks."""
+    store = ChunkStore(Path(backup_dir) / "chunks")
+    snapshots = list_snapshots(backup_dir)
+    previous = load_snapshot(snapshots[0]) if snapshots else None
+    print(f"🚀 Starting chunked snapshot: {source}")
+    files, stats = snapshot_folder(str(source), store, previous)
+    output_file = Path(backup_dir) / f"BigSkyAg_Snapshot_{today}.json.gz"
+    save_snapshot(output_file, files)
+    print(f"✅ Snapshot complete: {output_file}")
+    print(f"♻️  Reused: {stats['reused']} files, chunked: {stats['files']} files, "
+          f"new chunks: {stats['new_chunks']} ({stats['new_bytes'] / (1024 ** 2):.1f} MB)")
+    prune_snapshots(backup_dir, store)
+
+def run_snapshot_backup(source, backup_dir, today, workers=None, parallel_walk=False,
+                        verbose=False):
+    """Take a hardlink snapshot of source under backup_dir/Snapshots and prune old ones."""
+    print(f"🚀 Starting hardlink snapshot: {source}")
+    snapshot = take_snapshot(str(source), backup_dir, today, workers=workers,
+                             parallel_walk=parallel_walk, verbose=verbose)
+    prune_link_snapshots(backup_dir)
+    return snapshot
+
+def run_zip_backup(source, backup_dir, today, incremental=False, full_every=7,
+                   workers=None, inflight_bytes=DEFAULT_INFLIGHT, parallel_walk=False,
+                   verbose=False, resume=True, split_size=None, on_part=None, journal=False,
+                   dedup=True, encrypt=None):
+    """
+    Write a full or incremental zip, update the manifest and chain, and return its path.
+    With `journal`, an incremental run takes its change set from the
+    backup_journal watcher when it can, instead of walking the tree.
+    `encrypt` defaults to backup.encryption.enabled in the config.
+    """
+    settings = EncryptionSettings.from_config()
+    encryption = None
+    if settings.enabled if encrypt is None else encrypt:
+        encryption = (settings, settings.load_key())
+    manifest = load_manifest(backup_dir)
+    incremental = incremental and not needs_full_backup(backup_dir, manifest, full_every)
+    if incremental:
+        output_file = os.path.join(backup_dir, incremental_name(backup_dir, today))
+        previous, parent = manifest["files"], manifest["archive"]
+    else:
+        output_file = os.path.join(backup_dir, f"BigSkyAg_Backup_{today}.zip")
+        previous, parent = None, None
+
+    print(f"🚀 Starting {'incremental' if incremental else 'full'} backup: {source}")
+    print(f"📁 Excluding backup folder and system files...")
+    cursor = changes = None
+    if journal:
+        cursor = take_cursor(source)
+        if incremental and cursor:
+            changes = changes_since(source, load_cursor(backup_dir, parent), cursor)
+            if changes is None:
+                print("📒 Journal doesn't cover the last backup; walking the full tree")
+            else:
+                print(f"📒 Journal: {len(changes)} changed paths since {parent}")
+    files = zip_folder_verbose(str(source), output_file, previous=previous, parent=parent,
+                               workers=workers, inflight_bytes=inflight_bytes,
+                               parallel_walk=parallel_walk, verbose=verbose, resume=resume,
+                               split_size=split_size, on_part=on_part, changes=changes,
+                               dedup=dedup, encryption=encryption)
+    archive_name = os.path.basename(output_file)
+    record_archive(backup_dir, archive_name, "incremental" if incremental else "full", parent)
+    save_manifest(backup_dir, archive_name, files)
+    if cursor:
+        save_cursor(backup_dir, archive_name, cursor)
+        release_segments(source, cursor)
+    enforce_retention(backup_dir)
+    if split_size:
+        archive_path = parts_manifest_path(output_file)
+    elif encryption:
+        archive_path = encrypted_path(output_file)
+    else:
+        archive_path = output_file
+    update_catalog([backup_dir, os.path.join(backup_dir, ARCHIVE_SUBDIR)], archive_path, files)
+    return archive_path
 
 # --- MAIN SCRIPT ---
 if __name__ == "__main__":
-    source = get_bigsky_subfolder("")
-    backup_dir = get_bigsky_subfolder("00_Admin/Backups")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BigSkyAg backup")
+    parser.add_argument("--backend", choices=["zip", "chunks", "snapshot"], default="zip",
+                        help="zip archives, a deduplicating content-addressed chunk store, "
+                             "or hardlinked folder snapshots")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Archive only files changed since the last run")
+    parser.add_argument("--full-every", type=int, default=7,
+                        help="Days between full backups that anchor the incremental chain")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Compression threads, or copy threads for snapshots (default: per core)")
+    parser.add_argument("--inflight-mb", type=int, default=DEFAULT_INFLIGHT // (1024 ** 2),
+                        help="Upper bound on file data buffered between readers and the writer")
+    parser.add_argument("--parallel-walk", action="store_true",
+                        help="Scan top-level folders (00_Admin, DropZone, ...) concurrently")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Print every added and excluded file instead of periodic progress")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard any interrupted backup instead of resuming it")
+    parser.add_argument("--split-mb", type=int, default=None,
+                        help="Write the zip as .chunk_NNN parts of at most this many MB")
+    parser.add_argument("--journal", action="store_true",
+                        help="Take the incremental change set from the backup_journal watcher "
+                             "(falls back to a full walk if it isn't running or overflowed)")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Store identical files separately instead of once")
+    encrypt = parser.add_mutually_exclusive_group()
+    encrypt.add_argument("--encrypt", dest="encrypt", action="store_true", default=None,
+                         help="Write an AES-256-GCM encrypted .zip.enc (key from BACKUP_ENCRYPTION_KEY)")
+    encrypt.add_argument("--no-encrypt", dest="encrypt", action="store_false",
+                         help="Write a plain zip even if backup.encryption.enabled is set")
+    parser.add_argument("--upload", action="store_true",
+                        help="Upload the archive to STORAGE_PROVIDER (split parts as they finish)")
+    args = parser.parse_args()
+
+    source = get_bigsky_subfolder("", heavy_io=True)
+    backup_dir = get_bigsky_subfolder("00_Admin/Backups", heavy_io=True)
     today = datetime.now().strftime("%Y-%m-%d")
-    output_file = os.path.join(backup_dir, f"BigSkyAg_Backup_{today}.zip")
 
-    print(f"🚀 Starting backup: {source}")
-    print(f"📁 Excluding backup folder and system files...")
-    zip_folder_verbose(str(source), output_file)
-    prune_old_backups(Path(backup_dir), keep=2)
+    uploader = None
+    if args.upload and args.backend == "zip":
+        from storage_providers import BackupUploader, describe_upload
+        uploader = BackupUploader()
+
+    def on_part(path, index, size, sha256):
+        print(f"📤 Part {index} ready: {path.name} ({size / (1024 ** 2):.0f} MB)")
+        if uploader is not None:
+            uploader.on_part(path, index, size, sha256)
 
+    if args.backend == "chunks":
+        run_chunked_backup(source, backup_dir, today)
+    elif args.backend == "snapshot":
+        run_snapshot_backup(source, backup_dir, today, workers=args.workers,
+                            parallel_walk=args.parallel_walk, verbose=args.verbose)
+    else:
+        archive = run_zip_backup(source, backup_dir, today, incremental=args.incremental,
+                                 full_every=args.full_every, workers=args.workers,
+                                 inflight_bytes=args.inflight_mb * 1024 ** 2,
+                                 parallel_walk=args.parallel_walk, verbose=args.verbose,
+                                 resume=not args.fresh,
+                                 split_size=args.split_mb * 1024 ** 2 if args.split_mb else None,
+                                 on_part=on_part, journal=args.journal, dedup=not args.no_dedup,
+                                 encrypt=args.encrypt)
+        if uploader is not None:
+            with uploader:
+                status = uploader.upload(archive)
+            print(f"{'✅' if status['state'] == 'done' else '❌'} Upload: {describe_upload(status)}")
@@ -1,28 +1,24 @@
+"""
+Legacy entry point, now a wrapper over the `paths` package. The old
+preferred order (external SSD, ~/BigSkyAg, Google Drive as a last
+resort) is the resolver's default order.
+"""
+
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from paths import resolve_root  # noqa: E402
+
 def find_bigsky_root():
     """
     Locates the BigSkyAg root folder in preferred order:
-    1. External SSD (/Volumes/BigSkyAgSSD)
-    2. Local non-synced folder (~/BigSkyAg)
-    3. Cloud fallback (Google Drive iCloud-synced) — last resort only
+    1. $BIGSKY_ROOT, or the root found last time
+    2. External SSD (/Volumes/*/BigSkyAg)
+    3. Local non-synced folder (~/BigSkyAg)
+    4. Cloud fallback (Google Drive / iCloud) — last resort only
     """
-    # ✅ Primary: External SSD
-    ssd_path = Path("/Volumes/BigSkyAgSSD/BigSkyAg")
-    if ssd_path.exists():
-        return ssd_path
-
-    # ✅ Secondary: Local folder (not cloud-synced)
-    local_path = Path.home() / "BigSkyAg"
-    if local_path.exists():
-        return local_path
-
-    # ❌ LAST resort: Cloud-synced Google Drive folder
-    cloud_path = Path.home() / "Library/CloudStorage/GoogleDrive-gregpaulsen26@gmail.com/My Drive/BigSkyAg"
-    if cloud_path.exists():
-        return cloud_path
-
-    raise FileNotFoundError("❌ BigSkyAg root not found in any expected location.")
+    return resolve_root()
 
 def get_bigsky_subfolder(relative_path=""):
     """
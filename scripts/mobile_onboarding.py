@@ -180,6 +180,18 @@ async def get_system_info():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get system info: {str(e)}")
 
+@app.get("/backup-status")
+async def get_backup_status():
+    """Live progress of the running backup, or the summary of the last one."""
+    status_file = get_paulyops_root() / "Reports" / "backup_status.json"
+    if not status_file.exists():
+        return {"state": "unknown"}
+    try:
+        with open(status_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read backup status: {str(e)}")
+
 @app.post("/onboard")
 async def onboard_system(data: OnboardingData):
     """Onboard a new system with company configuration."""
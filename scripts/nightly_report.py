@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # Nightly automation status email (agnostic): SMTP (generic) or Apple Mail fallback
-import os, sys, subprocess, shlex, pathlib, time, datetime, socket, re, smtplib, mimetypes
+import os, sys, json, subprocess, shlex, pathlib, time, datetime, socket, re, smtplib, mimetypes
 from email.message import EmailMessage
 
 HOME = pathlib.Path.home()
@@ -29,7 +29,11 @@ CONFIG = {
     "DROPZONE": str(DESKTOP / "BigSkyAgDropzone"),
     "BACKUPS_ROOT": "/Volumes/BigSkyAgSSD/BigSkyAg/00_Admin/Backups",
     "ARCHIVE_SUBFOLDER": "Archive",
-    "BACKUP_GLOB": "*.zip",
+    "BACKUP_GLOBS": ("*.zip", "*.zip.enc"),
+    "VERIFY_SAMPLE": float(os.environ.get("NR_VERIFY_SAMPLE", "0.05")),  # fraction of bytes CRC-checked
+    "UPLOAD_STATUS": os.environ.get("BACKUP_UPLOAD_STATUS_PATH",
+                                    str(HOME / "PaulyOps" / "Reports" / "backup_upload_status.json")),
+    "UPLOAD_MAX_AGE_H": 26,
     "LOG_BACKUP_CANDIDATES": [
         "/Volumes/BigSkyAgSSD/BigSkyAg/05_Automation/Logs/backup.log",
         str(DESKTOP / "backup.log"),
@@ -78,29 +82,60 @@ def size_fmt(bytes_val):
         return f"{x:.1f} {units[i]}"
     except: return f"{bytes_val} B"
 
+def daemon_call(op, **args):
+    # Warm answer from backup_daemon.py when it is running, else None
+    try:
+        sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+        from backup_daemon import try_call
+        return try_call(op, **args)
+    except Exception:
+        return None
+
 def latest_backup():
     root = pathlib.Path(CONFIG["BACKUPS_ROOT"])
     if not root.exists():
         return False, "Backups root missing", ""
-    zips = sorted(root.rglob(CONFIG["BACKUP_GLOB"]), key=lambda p: p.stat().st_mtime, reverse=True)
-    if not zips:
-        return False, "No backup zips found", ""
-    latest = zips[0]
-    age_h = (time.time() - latest.stat().st_mtime)/3600.0
-    return True, f"{latest.name} — {size_fmt(latest.stat().st_size)} — {age_h:.1f}h old", str(latest)
+    cached = daemon_call("latest_backup", backup_dir=str(root), archive_subdir=CONFIG["ARCHIVE_SUBFOLDER"])
+    if cached:
+        latest, size, mtime = pathlib.Path(cached["path"]), cached["size"], cached["mtime"]
+    else:
+        zips = [(p, p.stat()) for pattern in CONFIG["BACKUP_GLOBS"] for p in root.rglob(pattern)]
+        if not zips:
+            return False, "No backup zips found", ""
+        latest, st = max(zips, key=lambda z: z[1].st_mtime)
+        size, mtime = st.st_size, st.st_mtime
+    age_h = (time.time() - mtime)/3600.0
+    ok, integrity = verify_status(latest)
+    return ok, f"{latest.name} — {size_fmt(size)} — {age_h:.1f}h old — {integrity}", str(latest)
+
+def verify_status(archive):
+    # Sampled CRC check of the archive (see verify_backup.py); a recent or full result is reused
+    try:
+        sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+        from verify_backup import describe, verify_cached
+        result = verify_cached(archive, sample=CONFIG["VERIFY_SAMPLE"])
+        return result["ok"], describe(result)
+    except Exception as e:
+        return False, f"not verified ({e})"
 
 def rotation_status():
     root = pathlib.Path(CONFIG["BACKUPS_ROOT"])
     arch = CONFIG["ARCHIVE_SUBFOLDER"]
     if not arch:
         return True, "Rotation disabled"
-    archive = root / arch
-    if not archive.exists():
-        return False, f"Archive missing: {archive}"
-    active = list(root.glob(CONFIG["BACKUP_GLOB"]))
-    msg = f"Active backups: {len(active)} (expect 1), Archive entries: {len(list(archive.glob(CONFIG['BACKUP_GLOB'])))}"
-    ok = len(active) <= 1
-    return ok, msg
+    if not root.exists():
+        return False, f"Backups root missing: {root}"
+    # Same GFS policy the backup run and auto-doctor apply (see backup_retention.py)
+    cached = daemon_call("retention", backup_dir=str(root), archive_subdir=arch)
+    if cached is not None:
+        return not cached["pending"], cached["summary"]
+    try:
+        sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+        from backup_retention import plan_retention
+        plan = plan_retention(root, archive_subdir=arch)
+    except Exception as e:
+        return False, f"Retention check failed: {e}"
+    return not plan.pending, plan.summary()
 
 def grep_success(log_paths, pattern, hours=24):
     cutoff = time.time() - hours*3600
@@ -119,7 +154,20 @@ def router_status():
     return grep_success(CONFIG["LOG_ROUTER_CANDIDATES"], r"(route success|routed|no files)")
 
 def backup_upload_status():
-    return grep_success(CONFIG["LOG_BACKUP_CANDIDATES"], r"(upload success|backup completed|finished)")
+    # Written by storage_providers.BackupUploader after every upload run
+    try:
+        with open(CONFIG["UPLOAD_STATUS"], "r", encoding="utf-8") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return grep_success(CONFIG["LOG_BACKUP_CANDIDATES"], r"(upload success|backup completed|finished)")
+    sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+    from storage_providers import describe_upload
+    age_h = (datetime.datetime.now() - datetime.datetime.fromisoformat(status["finished_at"])).total_seconds() / 3600
+    if status.get("state") != "done":
+        return False, f"Upload FAILED: {describe_upload(status)}"
+    if age_h > CONFIG["UPLOAD_MAX_AGE_H"]:
+        return False, f"No upload in {age_h:.0f}h — last: {describe_upload(status)}"
+    return True, describe_upload(status)
 
 def launchd_status():
     ok, out = run("launchctl list", timeout=8)
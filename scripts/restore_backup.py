@@ -0,0 +1,230 @@
+"""
+Selective, parallel restore from BigSkyAg zip backups.
+
+Only the central directory is read to decide what to extract, so pulling
+one folder out of a 40 GB archive reads just that folder's bytes. Paths
+are selected with the same gitignore-style syntax as .backupignore
+(`00_Admin/Reports/`, `*.xlsx`, `DropZone/2025-*/**/*.tif`). Files are
+extracted concurrently, each written to a preallocated temp file that is
+renamed into place once the member's CRC-32 has been checked while it
+streamed (zipfile raises on mismatch at end of stream).
+
+Restoring from an incremental archive replays its chain: the parent
+archives are found next to it (or in archive/), their tombstones applied,
+and every path is taken from the newest archive that holds it. Split
+archives are read in place through their .parts.json manifest, and
+encrypted ones (.zip.enc) are decrypted as they are read. Files
+stored once for several identical paths (__backup__/duplicates.json) are
+written to each of them.
+
+    python restore_backup.py latest 00_Admin/Reports/ --dest /tmp/restore-test
+    python restore_backup.py BigSkyAg_Backup_2025-06-03_incremental_221500.zip "*.xlsx" --dest ~/Desktop/Restored
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from zipfile import BadZipFile
+
+from backup_exclude import ExclusionMatcher
+from backup_manifest import DUPLICATES_NAME, ENC_SUFFIX, META_PREFIX, PARTS_SUFFIX, parts_manifest_name
+from backup_split import open_archive
+
+COPY_BLOCK = 1024 * 1024
+TMP_SUFFIX = ".restore-tmp"
+
+
+def _read_chain_meta(zipf) -> dict:
+    try:
+        return json.loads(zipf.read(META_PREFIX + "chain.json"))
+    except KeyError:
+        return {}
+
+
+def _read_duplicates(zipf) -> dict:
+    try:
+        return json.loads(zipf.read(DUPLICATES_NAME))
+    except KeyError:
+        return {}
+
+
+def _find_archive(name: str, near: Path) -> Path:
+    """Locate a parent archive (or its split set) beside `near`, in archive/, or one level up."""
+    for directory in (near.parent, near.parent / "archive", near.parent.parent):
+        for candidate in (directory / name, directory / (name + ENC_SUFFIX),
+                          directory / parts_manifest_name(name)):
+            if candidate.exists():
+                return candidate
+    raise FileNotFoundError(f"Chain archive {name} (needed by {near.name}) not found")
+
+
+def resolve_chain(archive_path) -> list:
+    """Return the archives needed to restore archive_path, oldest (the full) first."""
+    chain = []
+    path = Path(archive_path)
+    while True:
+        with open_archive(path) as zipf:
+            parent = _read_chain_meta(zipf).get("parent")
+        chain.append(path)
+        if not parent:
+            return chain[::-1]
+        path = _find_archive(parent, path)
+        if path in chain:
+            raise ValueError(f"Backup chain loops at {path.name}")
+
+
+def plan_restore(archive_path, patterns=None, chain=True) -> dict:
+    """
+    Map each selected arcname to (archive_path, ZipInfo) of its newest copy.
+    With no patterns, everything is selected.
+    """
+    selector = ExclusionMatcher(patterns=patterns) if patterns else None
+    plan = {}
+    for archive in resolve_chain(archive_path) if chain else [Path(archive_path)]:
+        with open_archive(archive) as zipf:
+            for name in _read_chain_meta(zipf).get("tombstones", []):
+                plan.pop(name, None)
+            for zinfo in zipf.infolist():
+                name = zinfo.filename
+                if name.startswith(META_PREFIX) or zinfo.is_dir():
+                    continue
+                # A selector "exclusion" is a match: patterns pick what to restore
+                if selector is None or selector.excluded(name):
+                    plan[name] = (archive, zinfo)
+            for name, source in _read_duplicates(zipf).items():
+                if selector is None or selector.excluded(name):
+                    plan[name] = (archive, zipf.getinfo(source))
+    return plan
+
+
+def _safe_target(dest: Path, arcname: str) -> Path:
+    parts = arcname.split("/")
+    if arcname.startswith("/") or ".." in parts:
+        raise ValueError(f"Refusing unsafe path in archive: {arcname}")
+    return dest.joinpath(*parts)
+
+
+def _preallocate(fd: int, size: int) -> None:
+    if size <= 0:
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, size)  # macOS has no posix_fallocate
+
+
+class _ArchiveHandles(threading.local):
+    """One ZipFile per archive per worker thread, so reads never share a file position."""
+
+    def get(self, path):
+        handles = self.__dict__.setdefault("handles", {})
+        if path not in handles:
+            handles[path] = open_archive(path)
+        return handles[path]
+
+
+def _extract(handles, archive, zinfo, target: Path) -> int:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + TMP_SUFFIX)
+    try:
+        with handles.get(archive).open(zinfo) as src, open(tmp, "wb") as dst:
+            _preallocate(dst.fileno(), zinfo.file_size)
+            for block in iter(lambda: src.read(COPY_BLOCK), b""):
+                dst.write(block)
+            if dst.tell() != zinfo.file_size:
+                raise BadZipFile(f"Size mismatch for {zinfo.filename}")
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    mode = (zinfo.external_attr >> 16) & 0o7777
+    if mode:
+        os.chmod(tmp, mode)
+    mtime = time.mktime(zinfo.date_time + (0, 0, -1))
+    os.utime(tmp, (mtime, mtime))
+    os.replace(tmp, target)
+    return zinfo.file_size
+
+
+def restore(archive_path, dest, patterns=None, workers=None, overwrite=False, chain=True) -> dict:
+    """
+    Extract the selected paths of archive_path (and its chain) under dest.
+    Existing files are left alone unless `overwrite`. Returns counts.
+    """
+    dest = Path(dest)
+    plan = plan_restore(archive_path, patterns, chain=chain)
+    stats = {"files": 0, "bytes": 0, "skipped": 0, "errors": 0}
+    handles = _ArchiveHandles()
+    started = time.time()
+    print(f"♻️  Restoring {len(plan)} files from {Path(archive_path).name} to {dest}")
+
+    with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+        futures = {}
+        for arcname, (archive, zinfo) in sorted(plan.items()):
+            try:
+                target = _safe_target(dest, arcname)
+            except ValueError as e:
+                print(f"⚠️ Skipped: {e}")
+                stats["errors"] += 1
+                continue
+            if target.exists() and not overwrite:
+                stats["skipped"] += 1
+                continue
+            futures[pool.submit(_extract, handles, archive, zinfo, target)] = arcname
+        for future in as_completed(futures):
+            try:
+                stats["bytes"] += future.result()
+                stats["files"] += 1
+            except (OSError, BadZipFile, ValueError) as e:
+                print(f"❌ Failed: {futures[future]} → {e}")
+                stats["errors"] += 1
+
+    elapsed = max(time.time() - started, 1e-6)
+    mb = stats["bytes"] / (1024 ** 2)
+    print(f"{'⚠️' if stats['errors'] else '✅'} Restored {stats['files']} files ({mb:.1f} MB, "
+          f"{mb / elapsed:.1f} MB/s), "
+          f"{stats['skipped']} existing skipped, {stats['errors']} errors")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from bigsky_path_utils import get_bigsky_subfolder
+
+    parser = argparse.ArgumentParser(description="Restore files from a BigSkyAg backup")
+    parser.add_argument("archive", help="Archive path or name in 00_Admin/Backups, or 'latest'")
+    parser.add_argument("patterns", nargs="*", help="Paths or globs to restore (default: everything)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--dest", help="Restore under this folder instead of the live tree")
+    target.add_argument("--in-place", action="store_true", help="Restore into the live BigSkyAg folder")
+    parser.add_argument("--overwrite", action="store_true", help="Replace files that already exist")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-chain", action="store_true",
+                        help="Only read the given archive, not the incrementals' bases")
+    parser.add_argument("--list", action="store_true", help="Show what would be restored and exit")
+    args = parser.parse_args()
+
+    backup_dir = Path(get_bigsky_subfolder("00_Admin/Backups", heavy_io=True))
+    archive = Path(args.archive)
+    if args.archive == "latest":
+        candidates = [*backup_dir.glob("BigSkyAg_Backup_*.zip"),
+                      *backup_dir.glob("BigSkyAg_Backup_*.zip" + ENC_SUFFIX),
+                      *backup_dir.glob("BigSkyAg_Backup_*" + PARTS_SUFFIX)]
+        archive = max(candidates, key=lambda p: p.stat().st_mtime)
+    elif not archive.exists():
+        archive = backup_dir / args.archive
+
+    if args.list:
+        for arcname, (source, zinfo) in sorted(plan_restore(archive, args.patterns,
+                                                            chain=not args.no_chain).items()):
+            print(f"{zinfo.file_size:>12,}  {source.name}  {arcname}")
+        sys.exit(0)
+
+    dest = get_bigsky_subfolder("", heavy_io=True) if args.in_place else args.dest
+    result = restore(archive, dest, args.patterns, workers=args.workers,
+                     overwrite=args.overwrite, chain=not args.no_chain)
+    sys.exit(1 if result["errors"] else 0)
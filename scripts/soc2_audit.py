@@ -216,13 +216,39 @@ class SOC2Auditor:
             "issues": []
         }
         
-        # Check backup encryption (placeholder)
+        # Backups must be encrypted at rest (backup_crypto's .zip.enc format)
         backup_dir = project_root / "Backups"
         if backup_dir.exists():
-            backup_files = list(backup_dir.glob("*.zip"))
-            if backup_files:
-                results["passed"] += 1  # Assuming zip files provide basic protection
-            else:
+            sys.path.insert(0, str(Path(__file__).resolve().parent))
+            from backup_crypto import ALGORITHM, EncryptionSettings, read_header, verify_encrypted
+
+            plain = list(backup_dir.rglob("*.zip"))
+            encrypted = sorted(backup_dir.rglob("*.zip.enc"), key=lambda p: p.stat().st_mtime)
+            if plain:
+                results["failed"] += 1
+                results["issues"].append(f"{len(plain)} unencrypted backup archive(s), e.g. {plain[0].name}")
+            for archive in encrypted:
+                try:
+                    with open(archive, "rb") as f:
+                        header, _ = read_header(f)
+                    if header.get("algorithm") != ALGORITHM:
+                        raise ValueError(f"unexpected algorithm {header.get('algorithm')}")
+                    results["passed"] += 1
+                except (OSError, ValueError) as e:
+                    results["failed"] += 1
+                    results["issues"].append(f"Encrypted backup {archive.name} is unreadable: {e}")
+            if encrypted:
+                # Authenticate every frame of the newest one, if the key is available here
+                try:
+                    verify_encrypted(encrypted[-1], EncryptionSettings.from_config().load_key())
+                    results["passed"] += 1
+                except RuntimeError as e:
+                    results["warnings"] += 1
+                    results["issues"].append(f"Could not verify {encrypted[-1].name}: {e}")
+                except (OSError, ValueError) as e:
+                    results["failed"] += 1
+                    results["issues"].append(f"Backup {encrypted[-1].name} failed verification: {e}")
+            elif not plain:
                 results["warnings"] += 1
                 results["issues"].append("No backup files found")
         
@@ -0,0 +1,444 @@
+"""
+Storage providers and the multipart uploader for BigSkyAg backups.
+
+A provider exposes object-store style multipart uploads: create an upload,
+send numbered parts (each checked against the SHA-256 the client computed),
+list the parts already received, and complete the upload into one object.
+STORAGE_PROVIDER picks the backend; "local" writes to a directory (another
+disk, a NAS mount, a synced folder) and behaves like an object store, so a
+cloud backend only has to implement the same six methods.
+
+BackupUploader sends a file as fixed-size parts over a bounded thread pool,
+so at most `workers` parts are in memory. Failed parts are retried with
+backoff; an interrupted upload is found again by key and source size/mtime
+and only its missing parts are sent. Split archives upload chunk by chunk —
+from SplitArchive's on_part while compression is still running, if wired
+up — with the .parts.json manifest last. Every run writes its throughput
+and retry counts to Reports/backup_upload_status.json for nightly_report.
+
+    python storage_providers.py ~/PaulyOps/Backups/BigSkyAg_Backup_2025-06-03.zip
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+from backup_manifest import PARTS_SUFFIX
+
+UPLOAD_STATUS_PATH = Path(os.getenv("BACKUP_UPLOAD_STATUS_PATH",
+                                    str(Path.home() / "PaulyOps" / "Reports" / "backup_upload_status.json")))
+DEFAULT_LOCAL_DIR = Path.home() / "PaulyOps" / "Uploads"
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 4
+RETRY_BASE_DELAY = 0.5
+FILE_WORKERS = 2   # files in flight at once; their parts share the part pool
+
+
+class ChecksumMismatch(IOError):
+    """A part arrived with different bytes than the client hashed."""
+
+
+class StorageProvider:
+    """Multipart object storage. Keys are flat names such as an archive's file name."""
+
+    name = "base"
+
+    def stat(self, key: str):
+        """Metadata of a completed object ({"size", "source", ...}) or None."""
+        raise NotImplementedError
+
+    def create_upload(self, key: str, source: dict) -> str:
+        raise NotImplementedError
+
+    def find_upload(self, key: str, source: dict):
+        """Upload id of an unfinished upload of the same source, or None."""
+        raise NotImplementedError
+
+    def list_parts(self, key: str, upload_id: str) -> dict:
+        """{part number: sha256} of the parts received so far."""
+        raise NotImplementedError
+
+    def upload_part(self, key: str, upload_id: str, number: int, data, sha256: str) -> None:
+        raise NotImplementedError
+
+    def complete_upload(self, key: str, upload_id: str, parts: list) -> None:
+        """Assemble parts [(number, sha256), ...] into the object."""
+        raise NotImplementedError
+
+    def abort_upload(self, key: str, upload_id: str) -> None:
+        raise NotImplementedError
+
+    def put_object(self, key: str, data, sha256: str) -> None:
+        """Store a small object in one request, checked like upload_part."""
+        raise NotImplementedError
+
+    def get_object(self, key: str):
+        """Bytes of a stored object, or None if there is none."""
+        raise NotImplementedError
+
+    def list_objects(self, prefix: str):
+        """Keys of stored objects that start with prefix."""
+        raise NotImplementedError
+
+
+class LocalDirectoryProvider(StorageProvider):
+    """
+    Object-store stand-in on a local or mounted directory. Objects are plain
+    files under root, their metadata in root/.meta; parts of unfinished
+    uploads live in root/.multipart/<upload id>/ named <number>.<sha256>.
+    """
+
+    name = "local"
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.getenv("STORAGE_LOCAL_DIR") or DEFAULT_LOCAL_DIR).expanduser()
+        self.meta_dir = self.root / ".meta"
+        self.multipart_dir = self.root / ".multipart"
+        for d in (self.root, self.meta_dir, self.multipart_dir):
+            d.mkdir(parents=True, exist_ok=True)
+
+    def _upload_dir(self, upload_id: str) -> Path:
+        return self.multipart_dir / upload_id
+
+    def stat(self, key: str):
+        try:
+            with open(self.meta_dir / (key + ".json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        target = self.root / key
+        if not target.exists() or target.stat().st_size != meta.get("size"):
+            return None
+        return meta
+
+    def create_upload(self, key: str, source: dict) -> str:
+        upload_id = uuid.uuid4().hex
+        upload_dir = self._upload_dir(upload_id)
+        upload_dir.mkdir()
+        with open(upload_dir / "upload.json", "w", encoding="utf-8") as f:
+            json.dump({"key": key, "source": source,
+                       "created": datetime.now().isoformat(timespec="seconds")}, f)
+        return upload_id
+
+    def find_upload(self, key: str, source: dict):
+        found = None
+        for info in self.multipart_dir.glob("*/upload.json"):
+            try:
+                with open(info, "r", encoding="utf-8") as f:
+                    upload = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if upload.get("key") != key:
+                continue
+            if upload.get("source") == source and found is None:
+                found = info.parent.name
+            else:
+                # Same key but the file changed since: its parts are useless
+                shutil.rmtree(info.parent, ignore_errors=True)
+        return found
+
+    def list_parts(self, key: str, upload_id: str) -> dict:
+        parts = {}
+        for part in self._upload_dir(upload_id).glob("[0-9]*.*"):
+            number, _, sha256 = part.name.partition(".")
+            if not sha256.endswith(".tmp"):
+                parts[int(number)] = sha256
+        return parts
+
+    def upload_part(self, key: str, upload_id: str, number: int, data, sha256: str) -> None:
+        upload_dir = self._upload_dir(upload_id)
+        tmp = upload_dir / f"{number:05d}.{sha256}.tmp"
+        self._write_checked(tmp, data, sha256, f"Part {number} of {key}")
+        for stale in upload_dir.glob(f"{number:05d}.*"):
+            if stale != tmp:
+                stale.unlink(missing_ok=True)
+        os.replace(tmp, tmp.with_name(tmp.name[:-len(".tmp")]))
+
+    def complete_upload(self, key: str, upload_id: str, parts: list) -> None:
+        upload_dir = self._upload_dir(upload_id)
+        with open(upload_dir / "upload.json", "r", encoding="utf-8") as f:
+            source = json.load(f)["source"]
+        target = self.root / key
+        tmp = target.with_name(target.name + ".uploading")
+        combined = hashlib.sha256()
+        with open(tmp, "wb") as out:
+            for number, sha256 in sorted(parts):
+                with open(upload_dir / f"{number:05d}.{sha256}", "rb") as part:
+                    shutil.copyfileobj(part, out, 1024 * 1024)
+                combined.update(bytes.fromhex(sha256))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, target)
+        meta = {"key": key, "size": target.stat().st_size, "source": source, "parts": len(parts),
+                # Like an S3 multipart ETag: a hash of the part hashes
+                "parts_sha256": f"{combined.hexdigest()}-{len(parts)}",
+                "uploaded": datetime.now().isoformat(timespec="seconds")}
+        with open(self.meta_dir / (key + ".json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=1)
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+    def abort_upload(self, key: str, upload_id: str) -> None:
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+    def _write_checked(self, tmp: Path, data, sha256: str, label: str) -> None:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Hash what actually landed, not what we meant to send
+        received = hashlib.sha256()
+        with open(tmp, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                received.update(block)
+        received = received.hexdigest()
+        if received != sha256:
+            tmp.unlink(missing_ok=True)
+            raise ChecksumMismatch(f"{label}: sent {sha256[:12]}, stored {received[:12]}")
+
+    def put_object(self, key: str, data, sha256: str) -> None:
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".uploading")
+        self._write_checked(tmp, data, sha256, key)
+        os.replace(tmp, target)
+
+    def get_object(self, key: str):
+        try:
+            with open(self.root / key, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def list_objects(self, prefix: str):
+        base = self.root / prefix
+        directory = base if prefix.endswith("/") else base.parent
+        if not directory.is_dir():
+            return
+        for path in directory.rglob("*"):
+            key = path.relative_to(self.root).as_posix()
+            if path.is_file() and key.startswith(prefix) and not key.endswith(".uploading"):
+                yield key
+
+
+PROVIDERS = {
+    "local": LocalDirectoryProvider,
+}
+
+
+def _upload_config(config=None) -> dict:
+    if config is None:
+        try:
+            from config.loader import load_config
+            config = load_config()
+        except Exception as e:
+            print(f"Warning: Could not load backup upload config: {e}")
+            config = {}
+    return (config.get("backup") or {}).get("upload") or {}
+
+
+def get_provider(name=None, config=None) -> StorageProvider:
+    """Provider named by `name`, STORAGE_PROVIDER, or backup.upload.provider (default local)."""
+    section = _upload_config(config)
+    name = (name or os.getenv("STORAGE_PROVIDER") or section.get("provider") or "local").lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown storage provider {name!r} (available: {', '.join(PROVIDERS)})")
+    if name == "local":
+        return LocalDirectoryProvider(section.get("local_dir"))
+    return PROVIDERS[name]()
+
+
+class BackupUploader:
+    """
+    Concurrent multipart uploader. submit() starts a file in the background;
+    upload() sends an archive (or a split set) and records the run's status.
+    """
+
+    def __init__(self, provider=None, part_size=None, workers=None, retries=None, config=None):
+        section = _upload_config(config) if None in (provider, part_size, workers, retries) else {}
+        self.provider = provider or get_provider(config=config)
+        self.part_size = int(part_size or section.get("part_size_mb", 0) * 1024 * 1024
+                             or DEFAULT_PART_SIZE)
+        self.workers = int(workers or section.get("workers") or DEFAULT_WORKERS)
+        self.retries = int(retries if retries is not None else section.get("retries", DEFAULT_RETRIES))
+        self.stats = {"files": 0, "skipped_files": 0, "parts": 0, "resumed_parts": 0,
+                      "bytes": 0, "retries": 0}
+        self._lock = threading.Lock()
+        self._parts = ThreadPoolExecutor(max_workers=self.workers)
+        self._files = ThreadPoolExecutor(max_workers=FILE_WORKERS)
+        self._pending = {}
+        self._started = time.time()
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for k, v in deltas.items():
+                self.stats[k] += v
+
+    def _retry(self, label: str, send, *args):
+        """Call send(*args), retrying I/O errors with exponential backoff."""
+        for attempt in range(self.retries + 1):
+            try:
+                return send(*args)
+            except OSError as e:
+                if attempt == self.retries:
+                    raise
+                self._count(retries=1)
+                delay = RETRY_BASE_DELAY * 2 ** attempt
+                print(f"⚠️ {label} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _send_part(self, fd: int, key: str, upload_id: str, number: int, size: int) -> str:
+        offset = (number - 1) * self.part_size
+        data = os.pread(fd, min(self.part_size, size - offset), offset)
+        sha256 = hashlib.sha256(data).hexdigest()
+        self._retry(f"Part {number} of {key}", self.provider.upload_part,
+                    key, upload_id, number, data, sha256)
+        self._count(parts=1, bytes=len(data))
+        return sha256
+
+    def upload_file(self, path, key=None) -> dict:
+        """Upload one file as multipart, resuming an earlier attempt if there is one."""
+        path = Path(path)
+        key = key or path.name
+        st = path.stat()
+        source = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        existing = self.provider.stat(key)
+        if existing and existing.get("source") == source:
+            self._count(skipped_files=1)
+            return existing
+
+        upload_id = self.provider.find_upload(key, source)
+        done = self.provider.list_parts(key, upload_id) if upload_id else {}
+        upload_id = upload_id or self.provider.create_upload(key, source)
+        count = max(1, -(-st.st_size // self.part_size))
+        self._count(resumed_parts=sum(1 for n in done if n <= count))
+
+        fd = os.open(path, os.O_RDONLY)
+        futures = {}
+        try:
+            futures = {n: self._parts.submit(self._send_part, fd, key, upload_id, n, st.st_size)
+                       for n in range(1, count + 1) if n not in done}
+            parts = [(n, futures[n].result() if n in futures else done[n]) for n in range(1, count + 1)]
+        finally:
+            wait(futures.values())  # no part may still be reading fd when it closes
+            os.close(fd)
+        if path.stat().st_mtime_ns != st.st_mtime_ns:
+            self.provider.abort_upload(key, upload_id)
+            raise IOError(f"{path.name} changed during upload")
+        self.provider.complete_upload(key, upload_id, parts)
+        self._count(files=1)
+        return self.provider.stat(key)
+
+    def submit(self, path, key=None):
+        """Start uploading a file in the background; returns its future."""
+        path = Path(path)
+        if path not in self._pending:
+            self._pending[path] = self._files.submit(self.upload_file, path, key)
+        return self._pending[path]
+
+    def on_part(self, path, index, size, sha256) -> None:
+        """SplitArchive on_part hook: upload each finished part straight away."""
+        self.submit(path)
+
+    def upload(self, archive, status_path=UPLOAD_STATUS_PATH) -> dict:
+        """Upload an archive, or every part of a split set and then its manifest."""
+        archive = Path(archive)
+        try:
+            if archive.name.endswith(PARTS_SUFFIX):
+                with open(archive, "r", encoding="utf-8") as f:
+                    parts = json.load(f)["parts"]
+                futures = [self.submit(archive.parent / p["name"]) for p in parts]
+                for future in futures:
+                    future.result()
+            self.submit(archive).result()
+        except Exception as e:
+            return self._finish(archive.name, status_path, error=f"{type(e).__name__}: {e}")
+        return self._finish(archive.name, status_path)
+
+    def _finish(self, label: str, status_path, error=None) -> dict:
+        elapsed = max(time.time() - self._started, 1e-6)
+        status = {
+            "state": "failed" if error else "done",
+            "provider": self.provider.name,
+            "archive": label,
+            **self.stats,
+            "elapsed_s": round(elapsed, 2),
+            "mb_s": round(self.stats["bytes"] / elapsed / (1024 * 1024), 1),
+            "part_size": self.part_size,
+            "workers": self.workers,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if error:
+            status["error"] = error
+        try:
+            Path(status_path).parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(str(status_path) + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(status, f, indent=1)
+            os.replace(tmp, status_path)
+        except OSError as e:
+            print(f"Warning: Could not write upload status: {e}")
+        return status
+
+    def close(self) -> None:
+        self._files.shutdown(wait=True)
+        self._parts.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def load_upload_status(path=UPLOAD_STATUS_PATH) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def describe_upload(status: dict) -> str:
+    """One-line summary for reports."""
+    mb = status.get("bytes", 0) / (1024 ** 2)
+    sent = (f"{status['chunks_sent']} chunks" if "chunks_sent" in status
+            else f"{status.get('parts', 0)} parts")
+    line = (f"{status.get('archive')} → {status.get('provider')}: {mb:.1f} MB in "
+            f"{sent} at {status.get('mb_s', 0):.1f} MB/s, "
+            f"{status.get('resumed_parts', 0)} resumed, {status.get('retries', 0)} retries "
+            f"({status.get('finished_at')})")
+    if status.get("chunks_deduped"):
+        line += (f", {status['chunks_deduped']:,} chunks "
+                 f"({status['bytes_deduped'] / (1024 ** 2):.1f} MB) already stored")
+    if status.get("skipped_files"):
+        line += f", {status['skipped_files']} already uploaded"
+    if status.get("error"):
+        line += f" — {status['error']}"
+    return line
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Upload a BigSkyAg backup to the storage provider")
+    parser.add_argument("archive", help="Backup zip or .parts.json manifest")
+    parser.add_argument("--provider", default=None, help="Override STORAGE_PROVIDER")
+    parser.add_argument("--part-mb", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    part_size = args.part_mb * 1024 * 1024 if args.part_mb else None
+    with BackupUploader(get_provider(args.provider), part_size, args.workers) as uploader:
+        result = uploader.upload(args.archive)
+    print(f"{'✅' if result['state'] == 'done' else '❌'} {describe_upload(result)}")
+    sys.exit(0 if result["state"] == "done" else 1)
@@ -65,50 +65,37 @@ def ensure_folders():
             log(f"folder: created {folder}")
 
 def reconcile_backup_rotation():
-    """Ensure only 1 active backup, move others to archive."""
+    """Apply the shared retention policy: newest backup active, GFS tiers in archive/, rest pruned."""
     if not BACKUPS_DIR.exists():
         return
-    
-    # Find all zip files
-    zip_files = list(BACKUPS_DIR.glob("*.zip"))
-    
-    if len(zip_files) <= 1:
-        log("rotation: no action needed (1 or fewer backups)")
-        return
-    
-    # Sort by modification time (oldest first)
-    zip_files.sort(key=lambda f: f.stat().st_mtime)
-    
-    # Move all but the newest to archive
-    archive_dir = BACKUPS_DIR / "archive"
-    if not archive_dir.exists():
-        archive_dir.mkdir(parents=True, exist_ok=True)
-    
-    moved_count = 0
-    for zip_file in zip_files[:-1]:  # All but the newest
-        try:
-            archive_path = archive_dir / zip_file.name
-            zip_file.rename(archive_path)
-            log(f"rotation: moved '{zip_file.name}' -> archive/")
-            moved_count += 1
-        except Exception as e:
-            log(f"rotation: error moving {zip_file.name}: {e}")
-    
-    # Verify only 1 backup remains
-    remaining_backups = list(BACKUPS_DIR.glob("*.zip"))
-    if len(remaining_backups) > 1:
-        log(f"rotation: WARNING - {len(remaining_backups)} backups still active, removing extras")
-        for backup in remaining_backups[1:]:
-            try:
-                backup.unlink()
-                log(f"rotation: removed extra backup '{backup.name}'")
-            except Exception as e:
-                log(f"rotation: error removing {backup.name}: {e}")
-    
-    # Create rotation success marker
-    rotation_marker = REPORTS_DIR / ".backup_rotation_last_success"
-    rotation_marker.touch()
-    log(f"rotation: completed - {moved_count} moved to archive, 1 active backup maintained")
+    try:
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from backup_retention import apply_retention, plan_retention
+        plan = plan_retention(BACKUPS_DIR)
+        if not plan.pending:
+            log(f"rotation: no action needed ({plan.summary()})")
+        else:
+            stats = apply_retention(plan, log=lambda msg: log(f"rotation: {msg}"))
+            if stats["errors"]:
+                log(f"rotation: {stats['errors']} errors, {stats['moved']} moved, {stats['deleted']} deleted")
+            else:
+                # Create rotation success marker
+                (REPORTS_DIR / ".backup_rotation_last_success").touch()
+                log(f"rotation: completed - {stats['moved']} moved to archive, {stats['deleted']} deleted")
+    except Exception as e:
+        log(f"rotation: failed: {e}")
+    update_backup_catalog()
+
+def update_backup_catalog():
+    """Re-sync the backup catalog with the active and archive/ backups."""
+    try:
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from backup_catalog import BackupCatalog
+        with BackupCatalog() as catalog:
+            stats = catalog.sync([BACKUPS_DIR, BACKUPS_DIR / "archive"])
+        log(f"catalog: {stats['indexed']} indexed, {stats['moved']} moved, {stats['removed']} removed")
+    except Exception as e:
+        log(f"catalog: update failed: {e}")
 
 def check_launchagents():
     """Check and repair LaunchAgent jobs."""
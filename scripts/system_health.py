@@ -89,8 +89,9 @@ class EnhancedSystemHealthChecker:
         if not recent_files:
             self.add_warning("BigSkyAgDropzone", "No files found in dropzone")
         else:
-            latest_file = max(recent_files, key=lambda f: f.stat().st_mtime if f.is_file() else 0)
-            age_hours = (time.time() - latest_file.stat().st_mtime) / 3600
+            latest_file, latest_stat = max(((f, f.stat()) for f in recent_files),
+                                           key=lambda t: t[1].st_mtime if t[0].is_file() else 0)
+            age_hours = (time.time() - latest_stat.st_mtime) / 3600
             self.add_check("BigSkyAgDropzone", True, f"Found {len(recent_files)} files, latest: {latest_file.name} ({age_hours:.1f}h ago)")
         
         return True
@@ -104,27 +105,96 @@ class EnhancedSystemHealthChecker:
             self.add_check("Backup Directory", False, "Backup directory not found")
             return False
         
-        # Check backup files (exclude archive directory)
-        backup_files = [f for f in self.backup_dir.glob("*.zip") if f.parent == self.backup_dir]
+        # Check backup files (exclude archive directory): plain, encrypted and split
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from backup_manifest import ENC_SUFFIX, PARTS_SUFFIX
+        from backup_split import load_parts
+        backup_files = [f for pattern in ("*.zip", "*.zip" + ENC_SUFFIX, "*" + PARTS_SUFFIX)
+                        for f in self.backup_dir.glob(pattern) if f.parent == self.backup_dir]
         if not backup_files:
             self.add_warning("Backup Files", "No backup files found")
         else:
-            latest_backup = max(backup_files, key=lambda f: f.stat().st_mtime)
-            backup_age_hours = (time.time() - latest_backup.stat().st_mtime) / 3600
-            backup_size_mb = latest_backup.stat().st_size / (1024 * 1024)
+            latest_backup, latest_stat = max(((f, f.stat()) for f in backup_files),
+                                             key=lambda t: t[1].st_mtime)
+            backup_age_hours = (time.time() - latest_stat.st_mtime) / 3600
+            backup_size = latest_stat.st_size
+            if latest_backup.name.endswith(PARTS_SUFFIX):
+                try:
+                    backup_size = sum(part["size"] for part in load_parts(latest_backup)["parts"])
+                except (OSError, ValueError, KeyError):
+                    pass  # Unreadable manifest: the integrity check below reports it
+            backup_size_mb = backup_size / (1024 * 1024)
             
             self.add_check("Backup Files", True, 
                           f"Found {len(backup_files)} active backup(s), latest: {latest_backup.name} "
                           f"({backup_age_hours:.1f}h ago, {backup_size_mb:.1f}MB)")
+            self.check_backup_integrity(latest_backup)
         
-        # Check archive directory
+        # Check archive directory against the shared retention policy
         if self.archive_dir.exists():
-            archive_files = list(self.archive_dir.glob("*.zip"))
-            self.add_check("Archive Directory", True, f"Found {len(archive_files)} archived backups")
+            try:
+                sys.path.insert(0, str(Path(__file__).resolve().parent))
+                from backup_daemon import try_call
+                # The backup daemon answers from its warm cache; plan here if it isn't running
+                cached = try_call("retention", backup_dir=str(self.backup_dir))
+                if cached is None:
+                    from backup_retention import plan_retention
+                    plan = plan_retention(self.backup_dir)
+                    cached = {"pending": plan.pending, "summary": plan.summary()}
+                if cached["pending"]:
+                    self.add_warning("Backup Retention", cached["summary"])
+                else:
+                    self.add_check("Backup Retention", True, cached["summary"])
+            except Exception as e:
+                self.add_warning("Backup Retention", f"Could not plan retention: {e}")
         else:
             self.add_warning("Archive Directory", "Archive directory not found")
-        
+
+        self.check_backup_run()
         return True
+
+    def check_backup_integrity(self, archive: Path):
+        """CRC-check a sample of the latest backup (reuses a recent or full result)."""
+        try:
+            sys.path.insert(0, str(Path(__file__).resolve().parent))
+            from verify_backup import describe, verify_cached
+            result = verify_cached(archive)
+        except Exception as e:
+            self.add_warning("Backup Integrity", f"Could not verify {archive.name}: {e}")
+            return
+        self.add_check("Backup Integrity", result["ok"], f"{archive.name}: {describe(result)}")
+
+    def check_backup_run(self):
+        """Report the running or last backup from the backup_status.json progress file."""
+        status_file = Path(os.getenv("BACKUP_STATUS_PATH", str(self.reports_dir / "backup_status.json")))
+        try:
+            with open(status_file, 'r') as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        state = status.get("state")
+        if state == "running":
+            try:
+                updated = datetime.fromisoformat(status["updated"])
+            except (KeyError, ValueError):
+                updated = datetime.min
+            if datetime.now() - updated > timedelta(minutes=10):
+                self.add_warning("Backup Run", f"{status.get('label')} stopped reporting at {status.get('updated')}")
+            else:
+                self.add_check("Backup Run", True,
+                              f"In progress ({status.get('phase')}): {status.get('files', 0)} files, "
+                              f"ETA {status.get('eta_s') or '?'}s")
+            return
+
+        run = status.get("last_run") or {}
+        mb_per_s = (run.get("bytes_per_s") or 0) / (1024 * 1024)
+        if run.get("ok") is False:
+            self.add_check("Backup Run", False, f"{run.get('label')} failed: {run.get('error', 'unknown error')}")
+        elif run:
+            self.add_check("Backup Run", True,
+                          f"{run.get('label')}: {run.get('files', 0)} files in {run.get('elapsed_s', 0):.0f}s "
+                          f"({mb_per_s:.1f}MB/s, {run.get('skipped', 0)} skipped)")
     
     def check_logs(self) -> bool:
         """Check log files and rotation."""
@@ -139,9 +209,10 @@ class EnhancedSystemHealthChecker:
         if not log_files:
             self.add_warning("Log Files", "No log files found")
         else:
-            latest_log = max(log_files, key=lambda f: f.stat().st_mtime)
-            log_age_hours = (time.time() - latest_log.stat().st_mtime) / 3600
-            log_size_mb = latest_log.stat().st_size / (1024 * 1024)
+            latest_log, latest_stat = max(((f, f.stat()) for f in log_files),
+                                          key=lambda t: t[1].st_mtime)
+            log_age_hours = (time.time() - latest_stat.st_mtime) / 3600
+            log_size_mb = latest_stat.st_size / (1024 * 1024)
             
             self.add_check("Log Files", True, 
                           f"Found {len(log_files)} logs, latest: {latest_log.name} "
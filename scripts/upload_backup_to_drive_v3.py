@@ -1,29 +1,52 @@
+#!/usr/bin/env python3
+"""
+Upload the newest BigSkyAg backup to the configured storage provider
+(STORAGE_PROVIDER, default local) as a concurrent, resumable multipart
+upload. Split archives are sent part by part with their manifest last;
+--dedup sends only the chunks the destination doesn't hold yet.
+Throughput and retry counts land in Reports/backup_upload_status.json.
+"""
 import sys
 from pathlib import Path
-sys.path.append(str(Path.home() / "Desktop" / "Coding_Commands"))
 
-from bigsky_path_utils import (
-    get_agent_subfolder,
-    find_bigsky_root,
-    get_bigsky_subfolder,
-    safe_print_bigsky_path,
-    backup_script
-)
+from bigsky_path_utils import get_bigsky_subfolder
 
-from pathlib import Path
-sys.path.append(str(Path.home() / "Desktop" / "Coding_Commands"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from backup_manifest import ENC_SUFFIX, PARTS_SUFFIX
+from backup_upload_dedup import DedupUploader
+from storage_providers import BackupUploader, describe_upload
 
-from bigsky_path_utils import (
-    find_agent_root,
-    get_agent_subfolder,
-    find_bigsky_root,
-    get_bigsky_subfolder,
-    safe_print_bigsky_path,
-    backup_script
-)
 
-#!/usr/bin/env python3
-from datetime import datetime
+def latest_archive(backup_dir: Path) -> Path:
+    candidates = [*backup_dir.glob("BigSkyAg_Backup_*.zip"),
+                  *backup_dir.glob("BigSkyAg_Backup_*.zip" + ENC_SUFFIX),
+                  *backup_dir.glob("BigSkyAg_Backup_*" + PARTS_SUFFIX)]
+    if not candidates:
+        raise FileNotFoundError(f"No backups in {backup_dir}")
+    return max(candidates, key=lambda p: p.stat().st_mtime)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Upload the newest BigSkyAg backup")
+    parser.add_argument("archive", nargs="?", help="Archive to upload (default: the newest)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Send only chunks the destination lacks, for every archive in "
+                             "the backup folder and archive/")
+    args = parser.parse_args()
 
-print(f"☁️ Upload to Drive simulated — file already saved in BigSkyAgBackup as of {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-print("✅ Upload complete!")
+    backup_dir = Path(get_bigsky_subfolder("00_Admin/Backups", heavy_io=True))
+    if args.dedup:
+        print(f"☁️ Uploading new chunks from {backup_dir}...")
+        with DedupUploader() as uploader:
+            status = uploader.upload_all([backup_dir, backup_dir / "archive"])
+    else:
+        archive = Path(args.archive) if args.archive else latest_archive(backup_dir)
+        print(f"☁️ Uploading {archive.name}...")
+        with BackupUploader() as uploader:
+            status = uploader.upload(archive)
+    if status["state"] != "done":
+        print(f"❌ Upload failed: {describe_upload(status)}")
+        sys.exit(1)
+    print(f"✅ Upload complete! {describe_upload(status)}")
@@ -0,0 +1,230 @@
+"""
+Parallel integrity verification for BigSkyAg zip backups.
+
+A full check decompresses every member and compares its CRC-32, with the
+members split by compressed size across worker processes that each open
+the archive themselves and read it concurrently. The sampled mode (used by
+the nightly health check) checks the central directory — every member's
+data must lie before it — and then decompresses a random slice of the
+members, a `sample` fraction of the archive's bytes. Split archives are
+verified in place through their .parts.json manifest.
+
+Results are kept in Reports/backup_verify.json keyed by archive path, so
+system_health and nightly_report can show the last result and its
+throughput without re-reading an archive that hasn't changed.
+
+    python verify_backup.py /Volumes/BigSkyAgSSD/BigSkyAg/00_Admin/Backups/BigSkyAg_Backup_2025-06-03.zip
+    python verify_backup.py --sample 0.05 ~/PaulyOps/Backups/*.zip
+"""
+
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from zipfile import BadZipFile
+
+from backup_split import open_archive
+
+VERIFY_PATH = Path(os.getenv("BACKUP_VERIFY_PATH",
+                             str(Path.home() / "PaulyOps" / "Reports" / "backup_verify.json")))
+DEFAULT_SAMPLE = 0.05
+MIN_SAMPLE_MEMBERS = 16
+PROCESS_THRESHOLD = 64 * 1024 * 1024   # below this, worker start-up costs more than it saves
+READ_BLOCK = 1024 * 1024
+
+
+def _verify_members(path: str, indexes) -> tuple:
+    """Decompress the given members and check their CRCs. Runs in a worker process."""
+    checked = data_bytes = 0
+    bad = []
+    with open_archive(path) as zipf:
+        infos = zipf.infolist()
+        for i in indexes:
+            zinfo = infos[i]
+            try:
+                # ZipExtFile raises BadZipFile on a CRC mismatch at end of stream
+                with zipf.open(zinfo) as f:
+                    while f.read(READ_BLOCK):
+                        pass
+            except Exception as e:
+                bad.append((zinfo.filename, str(e) or type(e).__name__))
+            checked += 1
+            data_bytes += zinfo.file_size
+    return checked, data_bytes, bad
+
+
+def _layout_errors(stream, infos, cd_start: int) -> list:
+    """
+    Check each member's local header and that its data, which starts after
+    the header's name and extra field, ends before the central directory.
+    """
+    errors = []
+    for zinfo in infos:
+        stream.seek(zinfo.header_offset)
+        header = stream.read(30)
+        if len(header) < 30 or header[:4] != b"PK\x03\x04":
+            errors.append([zinfo.filename, "local header missing"])
+            continue
+        data_start = (zinfo.header_offset + 30 + int.from_bytes(header[26:28], "little")
+                      + int.from_bytes(header[28:30], "little"))
+        if data_start + zinfo.compress_size > cd_start:
+            errors.append([zinfo.filename, "data overlaps the central directory"])
+    return errors
+
+
+def _batches(infos, indexes, count: int) -> list:
+    """Split member indexes into `count` groups of roughly equal compressed size."""
+    bins = [[0, []] for _ in range(count)]
+    for i in sorted(indexes, key=lambda i: infos[i].compress_size, reverse=True):
+        smallest = min(bins, key=lambda b: b[0])
+        smallest[0] += infos[i].compress_size
+        smallest[1].append(i)
+    return [b[1] for b in bins if b[1]]
+
+
+def verify_archive(path, sample=None, workers=None, seed=None) -> dict:
+    """
+    Verify one archive. With `sample` (0-1) only that fraction of the bytes is
+    decompressed, chosen at random. Returns a result dict; result["ok"] is
+    False if the directory is damaged or any checked member is bad.
+    """
+    path = Path(path)
+    started = time.time()
+    st = path.stat()
+    result = {
+        "archive": str(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "mode": "sampled" if sample else "full",
+        "verified_at": datetime.now().isoformat(timespec="seconds"),
+        "bad": [],
+    }
+    try:
+        with open_archive(path) as zipf:
+            infos = zipf.infolist()
+            cd_start = zipf.start_dir
+            result["bad"] += _layout_errors(zipf.fp, infos, cd_start)
+    except RuntimeError as e:
+        # An encrypted archive with no backup key configured on this host
+        return {**result, "ok": False, "error": f"Encryption key unavailable: {e}",
+                "members": 0, "checked": 0, "elapsed_s": round(time.time() - started, 2)}
+    except (OSError, BadZipFile) as e:
+        return {**result, "ok": False, "error": f"Central directory unreadable: {e}",
+                "members": 0, "checked": 0, "elapsed_s": round(time.time() - started, 2)}
+
+    indexes = [i for i, z in enumerate(infos) if not z.is_dir()]
+    if sample:
+        rng = random.Random(seed)
+        rng.shuffle(indexes)
+        budget = sample * sum(infos[i].compress_size for i in indexes)
+        chosen, used = [], 0
+        for i in indexes:
+            if used >= budget and len(chosen) >= MIN_SAMPLE_MEMBERS:
+                break
+            chosen.append(i)
+            used += infos[i].compress_size
+        indexes = chosen
+
+    read_bytes = sum(infos[i].compress_size for i in indexes)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and read_bytes >= PROCESS_THRESHOLD and len(indexes) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_verify_members, [str(path)] * workers,
+                                  _batches(infos, indexes, workers)))
+    else:
+        parts = [_verify_members(str(path), indexes)]
+
+    elapsed = max(time.time() - started, 1e-6)
+    data_bytes = sum(p[1] for p in parts)
+    result["bad"] += [list(b) for p in parts for b in p[2]]
+    result.update({
+        "ok": not result["bad"],
+        "members": len(infos),
+        "checked": sum(p[0] for p in parts),
+        "read_bytes": read_bytes,
+        "data_bytes": data_bytes,
+        "elapsed_s": round(elapsed, 2),
+        "read_mb_s": round(read_bytes / elapsed / (1024 * 1024), 1),
+        "data_mb_s": round(data_bytes / elapsed / (1024 * 1024), 1),
+    })
+    return result
+
+
+def load_results(path=VERIFY_PATH) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_result(result: dict, archive_path=None, path=VERIFY_PATH) -> None:
+    """Store a result under archive_path (default: the archive it was run on)."""
+    results = load_results(path)
+    key = str(Path(archive_path or result["archive"]).resolve())
+    if archive_path is not None:
+        st = Path(archive_path).stat()
+        result = {**result, "archive": key, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    results[key] = result
+    # Forget archives that have been pruned
+    results = {k: v for k, v in results.items() if os.path.exists(k)}
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(str(path) + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Warning: Could not save verification result: {e}")
+
+
+def verify_cached(archive_path, sample=DEFAULT_SAMPLE, max_age_hours=20.0, workers=None) -> dict:
+    """
+    Return a stored result for an unchanged archive if it is a full check or
+    a recent sample; otherwise verify now (sampled) and store the result.
+    """
+    key = str(Path(archive_path).resolve())
+    st = Path(archive_path).stat()
+    cached = load_results().get(key)
+    if cached and cached.get("size") == st.st_size and cached.get("mtime_ns") == st.st_mtime_ns:
+        age = datetime.now() - datetime.fromisoformat(cached["verified_at"])
+        if cached["mode"] == "full" or age.total_seconds() < max_age_hours * 3600:
+            return cached
+    result = verify_archive(archive_path, sample=sample, workers=workers)
+    save_result(result)
+    return result
+
+
+def describe(result: dict) -> str:
+    """One-line summary for reports."""
+    if result.get("error"):
+        return result["error"]
+    status = "CRC OK" if result["ok"] else f"{len(result['bad'])} BAD member(s)"
+    scope = "all" if result["mode"] == "full" else f"{result['checked']:,} sampled of"
+    return (f"{status} — {scope} {result['members']:,} members, "
+            f"{result.get('read_mb_s', 0):.1f} MB/s ({result['verified_at']})")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Verify BigSkyAg backup archives")
+    parser.add_argument("archives", nargs="+")
+    parser.add_argument("--sample", type=float, default=None,
+                        help="Fraction of bytes to check at random (default: everything)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    failed = False
+    for archive in args.archives:
+        result = verify_archive(archive, sample=args.sample, workers=args.workers)
+        save_result(result)
+        print(f"{'✅' if result['ok'] else '❌'} {Path(archive).name}: {describe(result)}")
+        for name, error in result["bad"][:20]:
+            print(f"   ❌ {name} → {error}")
+        failed |= not result["ok"]
+    sys.exit(1 if failed else 0)
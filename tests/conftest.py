@@ -0,0 +1,44 @@
+"""
+Shared setup for the backup tests.
+
+The backup modules live in scripts/ and import each other by module
+name, so scripts/ and the project root go on sys.path. HOME points at a
+throwaway folder before anything is imported: status files, the catalog,
+verify results and root hints all default to paths under it.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+_HOME = tempfile.mkdtemp(prefix="bigsky_tests_home_")
+os.environ["HOME"] = _HOME
+os.environ["PAULYOPS_CONFIG_SNAPSHOT"] = "0"
+os.environ.pop("BACKUP_ENCRYPTION_KEY", None)
+os.environ.pop("BACKUP_ENCRYPTION_KEY_FILE", None)
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+
+def write(path: Path, data) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """A small BigSkyAg-like source tree and an empty backup folder."""
+    source = tmp_path / "BigSkyAg"
+    write(source / "00_Admin" / "notes.txt", "admin notes\n")
+    write(source / "00_Admin" / "Reports" / "q1.csv", "a,b\n1,2\n" * 200)
+    write(source / "DropZone" / "field.bin", os.urandom(20000))
+    backup_dir = tmp_path / "Backups"
+    backup_dir.mkdir()
+    return source, backup_dir
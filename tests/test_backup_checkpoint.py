@@ -0,0 +1,109 @@
+import os
+import zipfile
+
+import pytest
+
+from conftest import write
+
+import create_backup_zip_cleaned as backup
+from backup_checkpoint import ResumableArchive, checkpoint_path, load_checkpoint, partial_path
+from backup_codecs import CodecPolicy
+from backup_progress import BackupProgress
+
+FILES = 12
+MB = 1024 * 1024
+
+
+class Interrupt(CodecPolicy):
+    """Stops the run like a sleep or an unmounted drive, after `after` files."""
+
+    def __init__(self, after):
+        super().__init__()
+        self.after = after
+        self.seen = 0
+
+    def choose(self, path, size):
+        self.seen += 1
+        if self.seen > self.after:
+            raise KeyboardInterrupt
+        return super().choose(path, size)
+
+
+class InterruptBeforeVerify(BackupProgress):
+    """Stops the run once the archive is written, metadata and all, before the commit."""
+
+    def set_phase(self, phase):
+        if phase == "verifying":
+            raise KeyboardInterrupt
+        super().set_phase(phase)
+
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / "BigSkyAg"
+    for n in range(FILES):
+        write(root / "DropZone" / f"f{n:02}.bin", os.urandom(MB + n))
+    return root
+
+
+def archive_zip(source, output, **kwargs):
+    # The smallest in-flight budget (one 4 MB block) keeps only a few members queued
+    return backup.zip_folder_verbose(str(source), str(output), inflight_bytes=1, workers=1,
+                                     dedup=False, **kwargs)
+
+
+def test_interrupted_backup_resumes_from_its_checkpoint(source, tmp_path, capsys):
+    output = tmp_path / "Backups" / "BigSkyAg_Backup_2026-10-17.zip"
+    output.parent.mkdir()
+    with pytest.raises(KeyboardInterrupt):
+        archive_zip(source, output, policy=Interrupt(after=8))
+    partial = partial_path(output)
+    state = load_checkpoint(partial)
+    assert not output.exists() and len(state["files"]) >= 5
+
+    with open(partial, "ab") as f:
+        f.write(b"torn write after the checkpoint")
+    changed = sorted(state["files"])[0]
+    write(source / changed, b"changed after the checkpoint")
+    capsys.readouterr()
+
+    files = archive_zip(source, output)
+    assert f"{len(state['files'])} files already archived" in capsys.readouterr().out
+    assert not os.path.exists(partial) and not os.path.exists(checkpoint_path(partial))
+    assert len(files) == FILES
+    with zipfile.ZipFile(output) as zipf:
+        assert zipf.testzip() is None
+        names = [n for n in zipf.namelist() if not n.startswith("__backup__/")]
+        assert sorted(names) == sorted(files)
+        for name in names:
+            assert zipf.read(name) == (source / name).read_bytes()
+
+
+def test_backup_aborted_after_its_metadata_resumes_without_duplicates(source, tmp_path):
+    output = tmp_path / "BigSkyAg_Backup_2026-10-17.zip"
+    with pytest.raises(KeyboardInterrupt):
+        archive_zip(source, output, progress=InterruptBeforeVerify(output.name))
+    state = load_checkpoint(partial_path(output))
+    assert len(state["files"]) == FILES
+    assert sorted(m[0] for m in state["members"]) == sorted(state["files"])
+
+    files = archive_zip(source, output)
+    assert len(files) == FILES
+    with zipfile.ZipFile(output) as zipf:
+        names = zipf.namelist()
+        assert len(names) == len(set(names)) and "__backup__/chain.json" in names
+        assert zipf.testzip() is None
+
+
+def test_checkpoint_for_another_parent_is_not_resumed(source, tmp_path):
+    output = tmp_path / "BigSkyAg_Backup_2026-10-17.zip"
+    with pytest.raises(KeyboardInterrupt):
+        archive_zip(source, output, policy=Interrupt(after=4))
+    assert load_checkpoint(partial_path(output))["files"]
+
+    meta = {"source": str(source), "kind": "incremental", "parent": "BigSkyAg_Backup_2026-10-16.zip"}
+    archive = ResumableArchive(output, meta)
+    try:
+        assert archive.resumed == {} and archive.zipf.filelist == []
+    finally:
+        archive.abort()
@@ -0,0 +1,47 @@
+import io
+import os
+
+import pytest
+
+from conftest import write
+
+import backup_chunkstore
+from backup_chunkstore import ChunkStore, iter_chunks, snapshot_folder
+
+SMALL = {"min_size": 1000, "max_size": 40000}
+
+
+def cuts(data, **kwargs):
+    return [len(chunk) for chunk in iter_chunks(io.BytesIO(data), **kwargs)]
+
+
+@pytest.mark.parametrize("mask", [0, 0xFF, (1 << 13) - 1, (1 << 40) - 1])
+def test_numpy_cuts_match_the_byte_loop(monkeypatch, mask):
+    pytest.importorskip("numpy")
+    data = os.urandom(300000) + b"\0" * 100000
+    fast = cuts(data, mask=mask, **SMALL)
+    monkeypatch.setattr(backup_chunkstore, "_np", None)
+    assert fast == cuts(data, mask=mask, **SMALL)
+    assert sum(fast) == len(data)
+
+
+def test_boundaries_survive_an_insertion():
+    data = os.urandom(400000)
+    before = list(iter_chunks(io.BytesIO(data), mask=0x1FFF, **SMALL))
+    after = list(iter_chunks(io.BytesIO(data[:50000] + b"inserted" + data[50000:]), mask=0x1FFF, **SMALL))
+    assert len(set(before) & set(after)) >= len(before) - 2
+
+
+def test_snapshot_chunks_are_the_same_without_numpy(tree, tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    source, _ = tree
+    write(source / "DropZone" / "big.bin", os.urandom(6 * 1024 * 1024))
+    fast, _ = snapshot_folder(source, ChunkStore(tmp_path / "fast"))
+    monkeypatch.setattr(backup_chunkstore, "_np", None)
+    store = ChunkStore(tmp_path / "slow")
+    slow, stats = snapshot_folder(source, store)
+    assert [f["chunks"] for f in slow.values()] == [f["chunks"] for f in fast.values()]
+    assert len(slow["DropZone/big.bin"]["chunks"]) > 1
+    entry = slow["DropZone/big.bin"]
+    assert b"".join(store.get(d) for d in entry["chunks"]) == (source / "DropZone" / "big.bin").read_bytes()
+    assert stats["files"] == 4
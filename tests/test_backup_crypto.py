@@ -0,0 +1,73 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import create_backup_zip_cleaned as backup
+from backup_crypto import (EncryptedArchive, EncryptedArchiveReader, EncryptionSettings,
+                           is_encrypted, verify_encrypted)
+from restore_backup import restore
+
+TODAY = "2026-10-17"
+
+
+@pytest.fixture
+def key(monkeypatch):
+    key = os.urandom(32)
+    monkeypatch.setenv("BACKUP_ENCRYPTION_KEY", key.hex())
+    return key
+
+
+def run(source, backup_dir):
+    return Path(backup.run_zip_backup(source, backup_dir, TODAY, encrypt=True, resume=False))
+
+
+def test_encrypted_backup_round_trips(tree, tmp_path, key):
+    source, backup_dir = tree
+    archive = run(source, backup_dir)
+    assert archive.name.endswith(".zip.enc") and is_encrypted(archive)
+    assert b"admin notes" not in archive.read_bytes()
+
+    restore(archive, tmp_path / "restore")
+    for path in source.rglob("*"):
+        if path.is_file():
+            rel = path.relative_to(source)
+            assert (tmp_path / "restore" / rel).read_bytes() == path.read_bytes()
+
+
+def test_small_frames_authenticate_on_write_and_read(tmp_path, key):
+    data = os.urandom(50000)
+    settings = EncryptionSettings(enabled=True, frame_size=4096, verify="full")
+    archive = EncryptedArchive(tmp_path / "frames.zip", key, settings)
+    archive.zipf.writestr("data.bin", data)
+    archive.commit()
+
+    assert verify_encrypted(archive.final_path, key)["frames"] > 10
+    reader = EncryptedArchiveReader(archive.final_path, key)
+    try:
+        assert reader.read().count(data) == 1
+    finally:
+        reader.close()
+
+
+def test_tampered_archive_fails_authentication(tree, key):
+    source, backup_dir = tree
+    archive = run(source, backup_dir)
+    raw = bytearray(archive.read_bytes())
+    raw[len(raw) // 2] ^= 0x01
+    archive.write_bytes(bytes(raw))
+
+    with pytest.raises(ValueError, match="failed authentication"):
+        verify_encrypted(archive, key)
+
+
+def test_wrong_key_is_reported(tree, key):
+    source, backup_dir = tree
+    archive = run(source, backup_dir)
+    with pytest.raises(ValueError, match="different key"):
+        EncryptedArchiveReader(archive, os.urandom(32))
+
+
+def test_unknown_verify_mode_is_rejected():
+    with pytest.raises(ValueError, match="verify"):
+        EncryptionSettings(verify="sometimes")
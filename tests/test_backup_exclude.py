@@ -0,0 +1,49 @@
+from conftest import write
+
+from backup_exclude import ExclusionMatcher
+from backup_walk import scan_tree
+
+PATHS = [
+    ("00_Admin/Backups", True), ("00_Admin/Backups/a.zip", False), ("00_Admin/notes.txt", False),
+    ("DropZone/run.log", False), ("DropZone/keep.log", False), ("DropZone/.DS_Store", False),
+    ("src/node_modules", True), ("src/node_modules/x.js", False), ("src/app.pyc", False),
+    ("Reports/2026/q1.csv", False), ("Reports/2026/tmp", True), ("Reports/draft.tmp", False),
+]
+
+
+def test_negation_re_includes_and_the_last_match_wins():
+    m = ExclusionMatcher(patterns=["*.log", "!keep.log", "build/", "!build/", "*.csv", "!/Reports/**",
+                                   "Reports/2026/q1.csv"])
+    assert m.excluded("DropZone/run.log")
+    assert not m.excluded("DropZone/keep.log")
+    assert not m.excluded("build", is_dir=True)
+    assert not m.excluded("Reports/q4.csv")
+    assert m.excluded("Reports/2026/q1.csv")
+    assert m.excluded("Other/q1.csv")
+
+
+def test_negated_directory_rule_only_applies_to_directories():
+    m = ExclusionMatcher(patterns=["cache*", "!cache/"])
+    assert not m.excluded("cache", is_dir=True)
+    assert m.excluded("cache")
+    assert m.excluded("cached.bin")
+
+
+def test_compiled_fast_path_agrees_with_ordered_rules():
+    # Any negation switches to the single ordered regex; both must decide alike
+    fast = ExclusionMatcher()
+    ordered = ExclusionMatcher(rules=fast.rules, patterns=["!never-matches"])
+    assert fast._ordered is None and ordered._ordered is not None
+    for rel, is_dir in PATHS:
+        assert fast.excluded(rel, is_dir=is_dir) == ordered.excluded(rel, is_dir=is_dir), rel
+
+
+def test_ignore_file_negation_applies_to_its_subtree_only(tmp_path):
+    root = tmp_path / "BigSkyAg"
+    write(root / "Logs" / ".backupignore", "!important.log\n")
+    write(root / "Logs" / "important.log", "keep")
+    write(root / "Logs" / "noise.log", "drop")
+    write(root / "Other" / "important.log", "drop")
+    rels = [entry.rel for entry in scan_tree(root)]
+    assert "Logs/important.log" in rels
+    assert "Logs/noise.log" not in rels and "Other/important.log" not in rels
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+import backup_journal
+from backup_journal import (JournalWriter, changes_since, covered_by, load_cursor, save_cursor,
+                            take_cursor)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    root = tmp_path / "BigSkyAg"
+    root.mkdir()
+    writer = JournalWriter(root, "test", 0.1)
+    yield root, writer
+    writer.close()
+
+
+def cursor(root, writer):
+    now = time.time()
+    writer.sync(now)
+    return take_cursor(root, since=now, log=lambda line: None)
+
+
+def test_changes_between_two_cursors(journal):
+    root, writer = journal
+    writer.record("00_Admin/old.txt")
+    first = cursor(root, writer)
+    writer.record("00_Admin/notes.txt")
+    writer.record("DropZone/new", is_dir=True)
+    writer.record("00_Admin/notes.txt")
+    second = cursor(root, writer)
+
+    assert changes_since(root, first, second) == {"00_Admin/notes.txt", "DropZone/new/"}
+    assert changes_since(root, second, second) == set()
+    assert changes_since(root, second, first) is None
+
+
+def test_changes_span_rotated_segments_until_one_is_dropped(journal, monkeypatch):
+    root, writer = journal
+    monkeypatch.setattr(backup_journal, "SEGMENT_BYTES", 16)  # Rotate on every sync
+    monkeypatch.setattr(backup_journal, "MAX_SEGMENTS", 3)
+    first = cursor(root, writer)
+    writer.record("a/one.txt")
+    second = cursor(root, writer)
+    writer.record("b/two.txt")
+    third = cursor(root, writer)
+    assert third["segment"] > first["segment"]
+    assert changes_since(root, first, third) == {"a/one.txt", "b/two.txt"}
+
+    for n in range(3):
+        writer.record(f"c/{n:040d}.txt")
+        last = cursor(root, writer)
+    assert changes_since(root, second, last) is None
+
+
+def test_overflow_invalidates_earlier_cursors(journal):
+    root, writer = journal
+    first = cursor(root, writer)
+    writer.overflow("queue overflow")
+    assert changes_since(root, first, cursor(root, writer)) is None
+
+
+def test_a_restarted_watcher_invalidates_earlier_cursors(tmp_path):
+    writer = JournalWriter(tmp_path, "test", 0.1)
+    first = cursor(tmp_path, writer)
+    writer.close()
+    restarted = JournalWriter(tmp_path, "test", 0.1)
+    try:
+        assert changes_since(tmp_path, first, cursor(tmp_path, restarted)) is None
+    finally:
+        restarted.close()
+
+
+def test_ignore_file_change_covers_its_directory(journal):
+    root, writer = journal
+    first = cursor(root, writer)
+    writer.record("Reports/.backupignore")
+    assert changes_since(root, first, cursor(root, writer)) == {"Reports/.backupignore", "Reports/"}
+    second = cursor(root, writer)
+    writer.record(".backupignore")
+    assert changes_since(root, second, cursor(root, writer)) is None
+
+
+def test_no_cursor_from_an_incomplete_journal(journal):
+    root, writer = journal
+    writer.incomplete("inotify watch limit reached")
+    assert cursor(root, writer) is None
+
+
+def test_no_cursor_once_the_watcher_stops(tmp_path):
+    writer = JournalWriter(tmp_path, "test", 0.1)
+    assert cursor(tmp_path, writer) is not None
+    writer.close()
+    assert take_cursor(tmp_path, since=0, log=lambda line: None) is None
+
+
+def test_covered_by_matches_paths_and_whole_directories():
+    changes = {"Reports/", "00_Admin/notes.txt"}
+    assert covered_by(changes, "00_Admin/notes.txt")
+    assert covered_by(changes, "Reports/2026/q1.csv")
+    assert not covered_by(changes, "Reports2/q1.csv")
+    assert not covered_by(changes, "00_Admin/notes.txt.bak")
+
+
+def test_cursor_is_saved_per_archive(tmp_path):
+    saved = {"session": "s", "segment": 0, "offset": 10}
+    save_cursor(tmp_path, "BigSkyAg_Backup_2026-10-17.zip", saved)
+    assert load_cursor(tmp_path, "BigSkyAg_Backup_2026-10-17.zip") == saved
+    assert load_cursor(tmp_path, "BigSkyAg_Backup_2026-10-16.zip") is None
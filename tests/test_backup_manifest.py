@@ -0,0 +1,86 @@
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from conftest import write
+
+import create_backup_zip_cleaned as backup
+from backup_codecs import CodecPolicy
+from backup_manifest import load_chain, load_manifest, record_archive
+from restore_backup import plan_restore, resolve_chain, restore
+
+TODAY = "2026-10-17"
+
+
+def run(source, backup_dir, incremental):
+    return Path(backup.run_zip_backup(source, backup_dir, TODAY, incremental=incremental,
+                                      encrypt=False, resume=False))
+
+
+def restored(archive, dest):
+    restore(archive, dest)
+    return {p.relative_to(dest).as_posix(): p.read_bytes() for p in dest.rglob("*") if p.is_file()}
+
+
+def test_same_day_incrementals_keep_their_own_archives(tree, tmp_path):
+    source, backup_dir = tree
+    full = run(source, backup_dir, incremental=False)
+    write(source / "00_Admin" / "notes.txt", "first change\n")
+    first = run(source, backup_dir, incremental=True)
+    write(source / "DropZone" / "new.txt", "second change\n")
+    second = run(source, backup_dir, incremental=True)
+
+    assert len({full.name, first.name, second.name}) == 3
+    chain = {e["name"]: e for e in load_chain(backup_dir)}
+    assert chain[first.name]["parent"] == full.name
+    assert chain[second.name]["parent"] == first.name
+    assert [p.name for p in resolve_chain(second)] == [full.name, first.name, second.name]
+
+    files = restored(second, tmp_path / "restore")
+    assert files["00_Admin/notes.txt"] == b"first change\n"
+    assert files["DropZone/new.txt"] == b"second change\n"
+    assert files["DropZone/field.bin"] == (source / "DropZone" / "field.bin").read_bytes()
+
+
+def test_deleted_files_become_tombstones(tree):
+    source, backup_dir = tree
+    run(source, backup_dir, incremental=False)
+    (source / "00_Admin" / "notes.txt").unlink()
+    archive = run(source, backup_dir, incremental=True)
+
+    with zipfile.ZipFile(archive) as zipf:
+        meta = json.loads(zipf.read("__backup__/chain.json"))
+    assert meta["tombstones"] == ["00_Admin/notes.txt"]
+    assert "00_Admin/notes.txt" not in plan_restore(archive)
+    assert "00_Admin/notes.txt" not in load_manifest(backup_dir)["files"]
+
+
+def test_unreadable_files_keep_their_previous_entry(tree, tmp_path):
+    source, backup_dir = tree
+    full = backup_dir / f"BigSkyAg_Backup_{TODAY}.zip"
+    previous = backup.zip_folder_verbose(str(source), str(full))
+    write(source / "00_Admin" / "notes.txt", "changed but locked\n")
+
+    class Locked(CodecPolicy):
+        def choose(self, path, size):
+            if path.endswith("notes.txt"):
+                raise PermissionError("locked")
+            return super().choose(path, size)
+
+    incremental = backup_dir / f"BigSkyAg_Backup_{TODAY}_incremental_120000.zip"
+    files = backup.zip_folder_verbose(str(source), str(incremental), previous=previous,
+                                      parent=full.name, policy=Locked(), resume=False)
+
+    assert files["00_Admin/notes.txt"] == previous["00_Admin/notes.txt"]
+    with zipfile.ZipFile(incremental) as zipf:
+        assert json.loads(zipf.read("__backup__/chain.json"))["tombstones"] == []
+    assert restored(incremental, tmp_path / "restore")["00_Admin/notes.txt"] == b"admin notes\n"
+
+
+def test_archive_cannot_be_its_own_parent(tmp_path):
+    with pytest.raises(ValueError):
+        record_archive(tmp_path, "BigSkyAg_Backup_2026-10-17_incremental.zip", "incremental",
+                       parent="BigSkyAg_Backup_2026-10-17_incremental.zip")
+    assert load_chain(tmp_path) == []
@@ -0,0 +1,122 @@
+import builtins
+import os
+import zlib
+from zipfile import ZIP_BZIP2, ZIP_DEFLATED, ZipFile
+
+import pytest
+
+from conftest import write
+
+import backup_pipeline
+from backup_pipeline import ParallelZipWriter
+
+
+class FailingReader:
+    """A file that gives one good block and then fails, like a disk that went away."""
+
+    def __init__(self, f):
+        self._f = f
+        self._reads = 0
+
+    def read(self, n=-1):
+        self._reads += 1
+        if self._reads > 1:
+            raise OSError(5, "Input/output error")
+        return self._f.read(n)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+class Unseekable:
+    """Write-only stream, like the encrypted writer or a pipe."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, data):
+        return self._f.write(data)
+
+    def tell(self):
+        return self._f.tell()
+
+    def flush(self):
+        self._f.flush()
+
+    def seekable(self):
+        return False
+
+
+@pytest.mark.parametrize("seekable", [True, False])
+def test_streamed_member_that_fails_mid_read_is_dropped(tmp_path, monkeypatch, seekable):
+    good = write(tmp_path / "good.txt", "fine\n" * 1000)
+    big = write(tmp_path / "big.bin", os.urandom(3 * backup_pipeline.STREAM_BLOCK))
+    after = write(tmp_path / "after.txt", "still here\n")
+
+    def flaky_open(path, *args, **kwargs):
+        f = builtins.open(path, *args, **kwargs)
+        return FailingReader(f) if str(path) == str(big) else f
+
+    monkeypatch.setattr(backup_pipeline, "open", flaky_open, raising=False)
+    out = tmp_path / "out.zip"
+    with open(out, "wb") as raw:
+        target = raw if seekable else Unseekable(raw)
+        with ZipFile(target, "w") as zipf:
+            with ParallelZipWriter(zipf, workers=2, inflight_bytes=64 * 1024) as writer:
+                writer.add(good, "good.txt")
+                member = writer.add(big, "big.bin", compress_type=ZIP_BZIP2)
+                writer.add(after, "after.txt")
+
+    assert isinstance(member.error, OSError)
+    with ZipFile(out) as zipf:
+        assert zipf.namelist() == ["good.txt", "after.txt"]
+        assert zipf.testzip() is None
+        assert zipf.read("after.txt") == b"still here\n"
+    if seekable:
+        assert out.stat().st_size < backup_pipeline.STREAM_BLOCK
+
+
+def test_member_whose_compressor_fails_is_dropped(tmp_path, monkeypatch):
+    good = write(tmp_path / "good.txt", "fine\n" * 1000)
+    bad = write(tmp_path / "bad.txt", "won't compress\n")
+    after = write(tmp_path / "after.txt", "still here\n")
+    compress_block = backup_pipeline._compress_block
+
+    def failing_block(path, *args):
+        if str(path) == str(bad):
+            raise zlib.error("Error -2 while compressing data")
+        return compress_block(path, *args)
+
+    monkeypatch.setattr(backup_pipeline, "_compress_block", failing_block)
+    out = tmp_path / "out.zip"
+    with ZipFile(out, "w") as zipf:
+        with ParallelZipWriter(zipf, workers=2) as writer:
+            writer.add(good, "good.txt")
+            member = writer.add(bad, "bad.txt")
+            writer.add(after, "after.txt")
+
+    assert isinstance(member.error, zlib.error)
+    with ZipFile(out) as zipf:
+        assert zipf.namelist() == ["good.txt", "after.txt"]
+        assert zipf.testzip() is None
+
+
+def test_members_are_streamed_without_zipfile_internals(tmp_path, monkeypatch):
+    files = {f"f{n}.txt": write(tmp_path / f"f{n}.txt", f"line {n}\n" * 5000) for n in range(3)}
+    monkeypatch.setattr(backup_pipeline, "_ZIP_INTERNALS", False)
+    monkeypatch.setattr(backup_pipeline, "_compress_block", None)  # must not be used
+    out = tmp_path / "out.zip"
+    with ZipFile(out, "w") as zipf:
+        with ParallelZipWriter(zipf, workers=2) as writer:
+            members = [writer.add(path, name, compress_type=ZIP_DEFLATED, compresslevel=9)
+                       for name, path in files.items()]
+
+    assert all(m.error is None and m.sha256 for m in members)
+    with ZipFile(out) as zipf:
+        assert zipf.testzip() is None
+        for name, path in files.items():
+            assert zipf.read(name) == path.read_bytes()
+            assert zipf.getinfo(name).compress_type == ZIP_DEFLATED
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+from conftest import write
+
+from backup_manifest import record_archive
+from backup_retention import RetentionPolicy, apply_retention, plan_retention, scan_backups
+
+START = date(2026, 9, 1)   # A Tuesday
+
+
+def day(n: int) -> date:
+    return START + timedelta(days=n)
+
+
+def full(n: int) -> str:
+    return f"BigSkyAg_Backup_{day(n)}.zip"
+
+
+def incremental(n: int, time="020000") -> str:
+    return f"BigSkyAg_Backup_{day(n)}_incremental_{time}.zip"
+
+
+def test_select_keeps_one_per_bucket_preferring_fulls():
+    # Newest first: an incremental every day, a full every Monday
+    items = [(day(n), f"b{n}", day(n).weekday() == 0) for n in range(40, -1, -1)]
+    keep = RetentionPolicy(daily=3, weekly=2, monthly=2).select(items)
+
+    assert [k for k, tiers in keep.items() if "daily" in tiers] == ["b40", "b39", "b38"]
+    weekly = [k for k, tiers in keep.items() if "weekly" in tiers]
+    assert weekly == ["b34", "b27"]                      # The Mondays of the two newest weeks
+    monthly = [k for k, tiers in keep.items() if "monthly" in tiers]
+    assert monthly == ["b34", "b27"]                     # October's and September's newest Monday
+    assert "newest" in keep["b40"]
+
+
+def test_select_falls_back_to_the_newest_without_a_preferred_item():
+    items = [(day(n), f"b{n}", False) for n in (9, 8, 7)]
+    assert RetentionPolicy(daily=0, weekly=1, monthly=0).select(items) == {"b9": ["weekly", "newest"]}
+
+
+def test_plan_keeps_the_chain_a_kept_incremental_needs(tmp_path):
+    backup_dir = tmp_path / "Backups"
+    write(backup_dir / full(-7), "old full")
+    record_archive(backup_dir, full(-7), "full")
+    write(backup_dir / full(0), "full")
+    record_archive(backup_dir, full(0), "full")
+    parent = full(0)
+    for n in range(1, 6):
+        write(backup_dir / incremental(n), f"inc {n}")
+        record_archive(backup_dir, incremental(n), "incremental", parent=parent)
+        parent = incremental(n)
+
+    plan = plan_retention(backup_dir, RetentionPolicy(active=1, daily=2, weekly=0, monthly=0))
+    assert plan.keep[incremental(5)] == ["active", "daily", "newest"]
+    assert plan.keep[incremental(4)] == ["daily"]
+    for name in (full(0), incremental(1), incremental(2), incremental(3)):
+        assert plan.keep[name] == ["chain base"]
+    assert [b.name for b in plan.deletes] == [full(-7)]
+    assert {b.name for b in plan.moves} == {full(0)} | {incremental(n) for n in range(1, 5)}
+
+    stats = apply_retention(plan, log=lambda line: None)
+    assert stats == {"moved": 5, "deleted": 1, "errors": 0}
+    assert [(b.name, b.location) for b in scan_backups(backup_dir)][:2] == [
+        (incremental(5), "active"), (incremental(4), "archive")]
+
+
+def test_same_day_incrementals_sort_by_time_then_sequence(tmp_path):
+    backup_dir = tmp_path / "Backups"
+    names = [full(0), incremental(0, "010000"), incremental(0, "010000-2"), incremental(0, "230000")]
+    for name in names:
+        write(backup_dir / name, name)
+    assert [b.name for b in scan_backups(backup_dir)] == names[::-1]
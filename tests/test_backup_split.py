@@ -0,0 +1,66 @@
+import os
+import zipfile
+from pathlib import Path
+
+from conftest import write
+
+import create_backup_zip_cleaned as backup
+from backup_split import load_parts, open_archive
+from restore_backup import resolve_chain, restore
+from verify_backup import verify_archive
+
+TODAY = "2026-10-17"
+PART = 64 * 1024
+
+
+def run(source, backup_dir, incremental=False, on_part=None):
+    return Path(backup.run_zip_backup(source, backup_dir, TODAY, incremental=incremental,
+                                      split_size=PART, on_part=on_part, encrypt=False, resume=False))
+
+
+def test_split_archive_round_trips(tree, tmp_path):
+    source, backup_dir = tree
+    write(source / "DropZone" / "big.bin", os.urandom(5 * PART))
+    handed = []
+    manifest = run(source, backup_dir, on_part=lambda path, *rest: handed.append(Path(path).name))
+
+    assert manifest.name == f"BigSkyAg_Backup_{TODAY}.parts.json"
+    parts = load_parts(manifest)["parts"]
+    assert len(parts) >= 5 and all(p["size"] <= PART for p in parts)
+    assert handed == [p["name"] for p in parts]
+
+    joined = tmp_path / "joined.zip"
+    joined.write_bytes(b"".join((backup_dir / p["name"]).read_bytes() for p in parts))
+    with zipfile.ZipFile(joined) as zipf, open_archive(manifest) as split:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == split.namelist()
+
+    restore(manifest, tmp_path / "restore")
+    for path in source.rglob("*"):
+        if path.is_file():
+            assert (tmp_path / "restore" / path.relative_to(source)).read_bytes() == path.read_bytes()
+
+
+def test_incremental_restores_through_a_split_parent(tree, tmp_path):
+    source, backup_dir = tree
+    full = run(source, backup_dir)
+    write(source / "00_Admin" / "notes.txt", "changed\n")
+    incremental = run(source, backup_dir, incremental=True)
+
+    assert [p.name for p in resolve_chain(incremental)] == [full.name, incremental.name]
+    restore(incremental, tmp_path / "restore")
+    assert (tmp_path / "restore" / "00_Admin" / "notes.txt").read_text() == "changed\n"
+    assert ((tmp_path / "restore" / "DropZone" / "field.bin").read_bytes()
+            == (source / "DropZone" / "field.bin").read_bytes())
+
+
+def test_damaged_part_fails_verification(tree):
+    source, backup_dir = tree
+    write(source / "DropZone" / "big.bin", os.urandom(3 * PART))
+    manifest = run(source, backup_dir)
+    part = backup_dir / load_parts(manifest)["parts"][1]["name"]
+    data = bytearray(part.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    part.write_bytes(bytes(data))
+
+    assert not verify_archive(manifest)["ok"]
@@ -0,0 +1,26 @@
+import os
+
+from conftest import write
+
+from backup_upload_dedup import DedupUploader, fetch_archive, recipe_key
+from storage_providers import LocalDirectoryProvider
+
+
+def test_plain_archives_dedup_and_encrypted_ones_go_up_whole(tmp_path):
+    backup_dir = tmp_path / "Backups"
+    plain = write(backup_dir / "BigSkyAg_Backup_2026-10-16.zip", os.urandom(300000))
+    sealed = write(backup_dir / "BigSkyAg_Backup_2026-10-17.zip.enc", os.urandom(300000))
+    provider = LocalDirectoryProvider(tmp_path / "remote")
+
+    with DedupUploader(provider, part_size=64 * 1024, workers=2, retries=0) as uploader:
+        status = uploader.upload_all([backup_dir], status_path=tmp_path / "status.json")
+    assert status["state"] == "done", status.get("error")
+    assert status["archives"] == 1 and status["files"] == 2
+
+    assert provider.get_object(recipe_key(sealed.name)) is None
+    assert provider.get_object(sealed.name) == sealed.read_bytes()
+    assert fetch_archive(provider, plain.name, tmp_path).read_bytes() == plain.read_bytes()
+
+    with DedupUploader(provider, part_size=64 * 1024, workers=2, retries=0) as uploader:
+        status = uploader.upload_all([backup_dir], status_path=tmp_path / "status.json")
+    assert status["skipped_files"] == 2 and status["chunks_sent"] == 0
@@ -0,0 +1,55 @@
+import os
+import threading
+
+from conftest import write
+
+from backup_exclude import ExclusionMatcher
+from backup_walk import scan_tree
+
+
+def rels(root, **kwargs):
+    return [entry.rel for entry in scan_tree(root, **kwargs)]
+
+
+def linked_tree(root):
+    """Top-level folders that reach into each other through symlinks."""
+    for top in ("A", "B", "C", "D"):
+        for sub in range(3):
+            for n in range(4):
+                write(root / top / f"s{sub}" / f"f{n}.txt", f"{top}{sub}{n}")
+    os.symlink("../A/s1", root / "B" / "alias")           # Duplicate of a folder walked earlier
+    os.symlink("../../C", root / "D" / "s0" / "up")       # Duplicate of a top-level folder
+    os.symlink("..", root / "C" / "s2" / "loop")          # Loop back to an ancestor
+    os.symlink("../D/s2", root / "A" / "later")           # Same folder as one walked later
+    return root
+
+
+def test_parallel_walk_matches_serial(tmp_path):
+    root = linked_tree(tmp_path / "tree")
+    serial = rels(root)
+    assert "A/later/f0.txt" in serial and "D/s2/f0.txt" not in serial
+    assert not any("/alias/" in rel or "/loop/" in rel or "/up/" in rel for rel in serial)
+    for _ in range(10):
+        assert rels(root, parallel=True, workers=4) == serial
+
+
+def test_parallel_walk_enters_a_folder_its_worker_saw_only_in_a_dropped_copy(tmp_path):
+    root = tmp_path / "tree"
+    write(root / "A" / "sub" / "f.txt", "a")
+    write(root / "B" / "y" / "z" / "zz.txt", "z")
+    os.symlink("../../B/y/z", root / "A" / "sub" / "inner")
+    os.symlink("../A/sub", root / "B" / "dup")
+    matcher = ExclusionMatcher(patterns=["A/sub/inner/"])
+
+    serial = rels(root, matcher=matcher)
+    assert serial == ["A/sub/f.txt", "B/y/z/zz.txt"]
+    assert rels(root, matcher=matcher, parallel=True, workers=2) == serial
+
+
+def test_abandoned_parallel_walk_stops_its_workers(tmp_path):
+    root = linked_tree(tmp_path / "tree")
+    before = threading.active_count()
+    walk = scan_tree(root, parallel=True, workers=4)
+    next(walk)
+    walk.close()
+    assert threading.active_count() == before
@@ -0,0 +1,70 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from conftest import write
+
+from config.loader import LAYERS, ConfigWatcher, load_config, status_flag_files
+from backup_daemon import BackupState
+
+
+@pytest.fixture
+def app_json(tmp_path):
+    return write(tmp_path / "app.json", json.dumps({"backup": {"retention": {"daily": 7, "weekly": 4}}}))
+
+
+@pytest.fixture
+def flags():
+    path = status_flag_files()[-1]
+    write(path, json.dumps({"check_launchd": False}))
+    yield path
+    path.unlink()
+
+
+def test_only_defaults_and_the_file_by_default(app_json, flags, monkeypatch):
+    monkeypatch.setenv("PAULYOPS__backup__retention__daily", "3")
+    config = load_config(app_json, defaults={"backup": {"retention": {"monthly": 6}}})
+    assert config == {"backup": {"retention": {"daily": 7, "weekly": 4, "monthly": 6}}}
+
+
+def test_status_flags_and_env_layers_are_opt_in(app_json, flags, monkeypatch):
+    monkeypatch.setenv("PAULYOPS__backup__retention__daily", "3")
+    config = load_config(app_json, layers=LAYERS)
+    assert config["backup"]["retention"] == {"daily": 3, "weekly": 4}
+    assert config["status_flags"]["check_launchd"] is False
+
+    assert "status_flags" not in load_config(app_json, layers=("file", "env"))
+    with pytest.raises(ValueError):
+        load_config(app_json, layers=("file", "enviroment"))
+
+
+def test_watcher_reloads_when_the_file_changes(app_json):
+    seen = []
+    watcher = ConfigWatcher(app_json, on_change=seen.append)
+    assert not watcher.check()
+
+    write(app_json, json.dumps({"backup": {"retention": {"daily": 14}}}))
+    stat = app_json.stat()
+    os.utime(app_json, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert watcher.check()
+    assert watcher.config == seen[-1] == {"backup": {"retention": {"daily": 14}}}
+
+
+def test_daemon_serves_the_watched_config(tmp_path, monkeypatch):
+    import config.loader as loader
+
+    app_json = write(tmp_path / "daemon.json", json.dumps({"backup": {"retention": {"daily": 5}}}))
+    monkeypatch.setattr(loader, "config_candidates", lambda path=None: [Path(path or app_json)])
+    state = BackupState(backup_dir=tmp_path)
+    state.watch_config(interval=60)
+    try:
+        assert state.handle("config", {"section": "backup"}) == {"retention": {"daily": 5}}
+        write(app_json, json.dumps({"backup": {"retention": {"daily": 9}}}))
+        stat = app_json.stat()
+        os.utime(app_json, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        state._watcher.check()
+        assert state.config()["backup"]["retention"]["daily"] == 9
+    finally:
+        state.close()
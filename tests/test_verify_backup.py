@@ -0,0 +1,36 @@
+import os
+import struct
+import zipfile
+
+from backup_crypto import EncryptedArchive, EncryptionSettings
+from verify_backup import verify_archive
+
+
+def test_data_running_into_the_central_directory_is_caught(tmp_path):
+    path = tmp_path / "BigSkyAg_Backup_2026-10-17.zip"
+    with zipfile.ZipFile(path, "w") as zipf:
+        zipf.writestr("DropZone/a.txt", b"field notes", compress_type=zipf.compression)
+    assert verify_archive(path)["ok"]
+
+    # Grow the recorded size by less than the local header: the member still
+    # looks clear of the directory if the header length is ignored
+    raw = bytearray(path.read_bytes())
+    with zipfile.ZipFile(path) as zipf:
+        cd_start, zinfo = zipf.start_dir, zipf.infolist()[0]
+    grown = zinfo.compress_size + 29 + len(zinfo.filename)
+    struct.pack_into("<I", raw, cd_start + 20, grown)
+    path.write_bytes(bytes(raw))
+
+    result = verify_archive(path)
+    assert not result["ok"]
+    assert result["bad"][0] == ["DropZone/a.txt", "data overlaps the central directory"]
+
+
+def test_encrypted_archive_without_a_key_is_reported(tmp_path):
+    archive = EncryptedArchive(tmp_path / "BigSkyAg_Backup_2026-10-17.zip", os.urandom(32),
+                               EncryptionSettings(enabled=True, verify="none"))
+    archive.zipf.writestr("DropZone/a.txt", b"field notes")
+    archive.commit()
+
+    result = verify_archive(archive.final_path)
+    assert not result["ok"] and "key unavailable" in result["error"]